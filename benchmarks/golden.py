@@ -0,0 +1,307 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import pygame
+
+from src.settings import settings
+from src.controls import controls, KeyState
+
+
+# Render paths by their names: display backend, kept background flag and the default allowed difference of a pixel's
+# channel from the reference (the texture backend blends and tints with SDL's renderer)
+RENDERERS = {
+    "reference": {"backend": "surface", "background_cache": False, "tolerance": 0},
+    "background_cache": {"backend": "surface", "background_cache": True, "tolerance": 0},
+    "texture": {"backend": "texture", "background_cache": False, "tolerance": 3}
+}
+
+
+def pan(start, move, frames):
+    """Get camera positions going from the start by the move (in pixels) every frame"""
+    return [(start[0] + move[0] * frame, start[1] + move[1] * frame) for frame in range(frames)]
+
+
+class Scene:
+    """Deterministic scene, prepares a seeded headless level and then gets the camera positions it's seen from"""
+    # Name of the scene
+    name = ""
+
+    def setup(self, simulation):
+        """Prepare the level's state"""
+
+    def positions(self, level):
+        """Get the camera positions of the frames, the camera follows the player placed at them"""
+        return pan(level.player.pos, (23.5, 11.25), 8)
+
+
+class StartScene(Scene):
+    """Untouched level around the player's starting position"""
+    name = "start"
+
+
+class FarmScene(Scene):
+    """Farm hoed, planted and watered, with the plants grown for a few days"""
+    name = "farm"
+
+    def setup(self, simulation):
+        """Hoe, plant and water the Farmable layer, grow the plants"""
+        # Import the soil only after pygame is ready, like the level
+        from src.soil import FARMABLE, HIT
+        soil = simulation.level.soil
+
+        # Hoe every farmable tile at once, plant every other one
+        soil.grid[(soil.grid & FARMABLE) != 0] |= HIT
+        soil.handle_hit(soil.farmable_rects[0].center)
+        for index, rect in enumerate(soil.farmable_rects[::2]):
+            soil.plant(("corn", "tomato")[index % 2], rect.center)
+
+        # Grow them for a few days, keep the player alive and water the last day
+        simulation.level.player.health = 10
+        for _ in range(3):
+            soil.water_all()
+            simulation.advance_day(skip_night=True)
+        soil.water_all()
+
+    def positions(self, level):
+        """Pan over the farm"""
+        return pan(level.soil.farmable_rects[len(level.soil.farmable_rects) // 2].center, (-17.75, 9.5), 8)
+
+
+class RainScene(Scene):
+    """Player walking in heavy rain, with drops and puddles around"""
+    name = "rain"
+
+    def setup(self, simulation):
+        """Start the rain and walk in it"""
+        simulation.level.rain_active = True
+        simulation.level.soil.rain_active = True
+
+        # Walk right, then down
+        walk = (KeyState.to_mask([pygame.K_RIGHT]), KeyState.to_mask([pygame.K_DOWN]))
+        controls.script = lambda: walk[simulation.frames // 45 % 2]
+        simulation.step(90)
+        controls.script = None
+
+    def positions(self, level):
+        """Stay around the player"""
+        return pan(level.player.pos, (0, -6.5), 4)
+
+
+class TreeScene(Scene):
+    """Player in front of and behind trees, some of them chopped into stumps"""
+    name = "trees"
+
+    def setup(self, simulation):
+        """Chop every other tree"""
+        for tree in simulation.level.trees[::2]:
+            while tree.alive:
+                tree.handle_damage()
+
+    def positions(self, level):
+        """Move the player across the bottom of a standing tree, so the y-sort swaps them"""
+        tree = level.trees[1]
+        return pan((tree.rect.centerx, tree.rect.bottom - 60), (3.5, 15.25), 8)
+
+
+class HouseScene(Scene):
+    """Inside of the house, its floor, furniture and walls"""
+    name = "house"
+
+    def positions(self, level):
+        """Pan around the bed"""
+        bed = next(sprite for sprite in level.interactive_sprites if sprite.name == "Bed")
+        return pan(bed.rect.center, (-31.25, -7.5), 6)
+
+
+class ShopScene(Scene):
+    """Open shop in the evening, the menu over the tinted world"""
+    name = "shop"
+
+    def setup(self, simulation):
+        """Open the shop and darken the sky"""
+        level = simulation.level
+        level.shop = True
+        level.menu._update_amount()
+        level.sky.start_color = [120, 150, 210]
+
+    def positions(self, level):
+        """Stay at the trader"""
+        trader = next(sprite for sprite in level.interactive_sprites if sprite.name == "Trader")
+        return pan(trader.rect.center, (9.5, 0), 3)
+
+
+# All the scenes by their names
+SCENES = {scene.name: scene for scene in (StartScene, FarmScene, RainScene, TreeScene, HouseScene, ShopScene)}
+
+
+def render(level, positions, renderer):
+    """Draw the frames of the level from the positions with the renderer, get their pixels (None if the renderer
+    isn't available)"""
+    # Import the display only after pygame is ready
+    from pygame._sdl2.sdl2 import error as SDLError
+    from src.display import display
+    config = RENDERERS[renderer]
+
+    # Open the display with the renderer, skip it if it can't be opened
+    try:
+        display.open(config["backend"])
+    except (pygame.error, SDLError):
+        display.close()
+        return None
+    cache = settings.BACKGROUND_CACHE
+    settings.BACKGROUND_CACHE = config["background_cache"]
+
+    # Draw the frames in order, so the paths that keep state between frames are checked too
+    frames = []
+    for position in positions:
+        level.player.place(position)
+        level.draw()
+        frames.append(pygame.surfarray.array3d(display.screenshot()))
+
+    # Put everything back
+    settings.BACKGROUND_CACHE = cache
+    display.close()
+
+    return frames
+
+
+def compare(reference, frame, tolerance):
+    """Compare the frame with the reference, get the amount of differing pixels, the largest difference and the
+    diff image's pixels"""
+    # Largest difference of a channel of every pixel
+    difference = np.abs(reference.astype(np.int16) - frame).max(axis=2)
+    wrong = difference > tolerance
+
+    # Dimmed reference, with the wrong pixels in red, brighter the more they differ
+    diff = reference // 4
+    diff[wrong] = 0
+    diff[wrong, 0] = np.minimum(255, 96 + difference[wrong] * 8)
+
+    return int(wrong.sum()), int(difference.max()), diff
+
+
+def save(pixels, path):
+    """Save the pixels as an image"""
+    pygame.image.save(pygame.surfarray.make_surface(pixels), path)
+
+
+def run_scene(name, seed, renderers, tolerance=None, output="golden", golden=None, update=False):
+    """Render the scene with every renderer and compare them with the reference, get the results of every
+    renderer"""
+    # Create the seeded headless level and set the scene up
+    from src.headless import Simulation
+    scene = SCENES[name]()
+    simulation = Simulation(seed)
+    scene.setup(simulation)
+    positions = scene.positions(simulation.level)
+
+    # Render the reference
+    reference = render(simulation.level, positions, "reference")
+    results = {}
+
+    # Compare it with the golden frames, or write them
+    if golden:
+        os.makedirs(golden, exist_ok=True)
+        paths = [os.path.join(golden, f"{name}_{index:02}.png") for index in range(len(positions))]
+        if update:
+            for frame, path in zip(reference, paths):
+                save(frame, path)
+        elif all(os.path.exists(path) for path in paths):
+            stored = [pygame.surfarray.array3d(pygame.image.load(path)) for path in paths]
+            results["golden"] = check(name, "reference", stored, reference, 0, output, "golden")
+
+    # Compare every other renderer with the reference
+    for renderer in renderers:
+        if renderer == "reference":
+            continue
+
+        frames = render(simulation.level, positions, renderer)
+        allowed = RENDERERS[renderer]["tolerance"] if tolerance is None else tolerance
+        results[renderer] = None if frames is None else check(name, renderer, reference, frames, allowed, output)
+
+    return results
+
+
+def check(name, renderer, reference, frames, tolerance, output, reference_name="reference"):
+    """Compare the renderer's frames with the reference ones, write the frames that differ and their diffs"""
+    worst_pixels = worst_difference = 0
+    failed = 0
+
+    for index, (expected, frame) in enumerate(zip(reference, frames)):
+        pixels, difference, diff = compare(expected, frame, tolerance)
+        worst_pixels = max(worst_pixels, pixels)
+        worst_difference = max(worst_difference, difference)
+
+        # Write the frames and the diff if it differs
+        if pixels:
+            failed += 1
+            os.makedirs(output, exist_ok=True)
+            prefix = os.path.join(output, f"{name}_{index:02}")
+            save(expected, f"{prefix}_{reference_name}.png")
+            save(frame, f"{prefix}_{renderer}.png")
+            save(diff, f"{prefix}_{renderer}_diff.png")
+
+    return {"frames": len(frames), "failed": failed, "worst_pixels": worst_pixels,
+            "max_difference": worst_difference, "tolerance": tolerance}
+
+
+def main(args=None):
+    """Compare the render paths on the golden scenes from the command line"""
+    # Parse the arguments
+    parser = argparse.ArgumentParser(description="Compare PyValley's render paths with the reference one, "
+                                                 "frame by frame in deterministic scenes")
+    parser.add_argument("scenes", nargs="*", help=f"scenes to render, all of them by default ({', '.join(SCENES)})")
+    parser.add_argument("--renderers", nargs="+", choices=RENDERERS, default=list(RENDERERS),
+                        help="render paths to compare with the reference one")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the game's randomness")
+    parser.add_argument("--tolerance", type=int, default=None,
+                        help="allowed difference of a pixel's channel, instead of every renderer's own")
+    parser.add_argument("--quality", choices=settings.QUALITY_PRESETS,
+                        help="render with the given quality preset (its render scale)")
+    parser.add_argument("--output", metavar="DIR", default="golden",
+                        help="directory the differing frames and their diff images are written into")
+    parser.add_argument("--golden", metavar="DIR", help="also compare the reference frames with the ones stored here")
+    parser.add_argument("--update", action="store_true", help="store the reference frames into the golden directory")
+    options = parser.parse_args(args)
+
+    # Make sure the scenes exist
+    for name in options.scenes:
+        if name not in SCENES:
+            parser.error(f"unknown scene {name}")
+
+    # Render with the chosen quality preset
+    if options.quality:
+        from src.quality import quality
+        quality.pin(options.quality)
+
+    # Render and compare every scene
+    failed = False
+    for name in options.scenes or list(SCENES):
+        results = run_scene(name, options.seed, options.renderers, options.tolerance, options.output, options.golden,
+                            options.update)
+
+        # Print them
+        for renderer, result in results.items():
+            if result is None:
+                print(f"{name:>6} {renderer:>16}: not available, skipped")
+                continue
+
+            print(f"{name:>6} {renderer:>16}: {result['frames'] - result['failed']}/{result['frames']} frames match, "
+                  f"worst {result['worst_pixels']} pixels, max difference {result['max_difference']} "
+                  f"(tolerance {result['tolerance']})")
+            failed = failed or result["failed"]
+
+    # Fail if any frame differs
+    if failed:
+        print(f"MISMATCH differing frames and their diffs were written into {options.output}")
+        return 1
+    print("all render paths match the reference")
+
+    return 0
+
+
+# If it's the main file, run the comparison
+if __name__ == "__main__":
+    sys.exit(main())
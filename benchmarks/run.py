@@ -0,0 +1,198 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import multiprocessing
+
+import numpy as np
+
+from benchmarks.scenarios import SCENARIOS
+
+# Peak memory is read from the operating system where it's available
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Metrics compared against the baseline, whether higher values are better and which threshold they use
+METRICS = {
+    "p50_ms": (False, "time"),
+    "p95_ms": (False, "time"),
+    "p99_ms": (False, "time"),
+    "rate": (True, "time"),
+    "peak_memory_mb": (False, "memory")
+}
+
+
+def run_scenario(name, seed=0, scale=1.0, count_allocations=False):
+    """Run the scenario in this process and return its results, optionally with its allocations per unit"""
+    # Import the simulation here, so every scenario process prepares its own pygame
+    from src.headless import Simulation
+    from src.allocations import allocations
+
+    # Create the scenario and its level
+    scenario = SCENARIOS[name]()
+    simulation = Simulation(seed)
+    scenario.setup(simulation)
+    units = max(1, int(scenario.units * scale))
+
+    # Time every unit of work
+    times = np.empty(units)
+    start = time.perf_counter()
+    for index in range(units):
+        unit_start = time.perf_counter()
+        scenario.run_unit(simulation)
+        times[index] = time.perf_counter() - unit_start
+    elapsed = time.perf_counter() - start
+
+    # Peak memory of the process, Linux reports it in kilobytes and macOS in bytes
+    peak_memory = None
+    if resource:
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_memory /= 1024 ** 2 if sys.platform == "darwin" else 1024
+
+    # Digest of the final state, taken before any further units
+    digest = simulation.digest()
+
+    # Count the allocations of more units after the timed ones, so the counting doesn't slow them down
+    allocation_summary = None
+    if count_allocations:
+        allocations.start()
+        for _ in range(min(units, 300)):
+            allocations.begin_frame()
+            scenario.run_unit(simulation)
+            allocations.end_frame()
+        allocations.stop()
+        allocation_summary = allocations.summary()
+
+    # Summarize the distribution in milliseconds
+    p50, p95, p99 = np.percentile(times * 1000, (50, 95, 99)).tolist()
+    return {
+        "unit": scenario.unit,
+        "units": units,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "max_ms": float(times.max() * 1000),
+        "mean_ms": float(times.mean() * 1000),
+        "rate": units / elapsed,
+        "peak_memory_mb": peak_memory,
+        "digest": digest,
+        "allocations": allocation_summary
+    }
+
+
+def run_all(names, seed=0, scale=1.0, count_allocations=False):
+    """Run every given scenario in its own fresh process, so they don't share any state"""
+    # Spawn new processes instead of forking this one, each of them runs a single scenario
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        results = pool.starmap(run_scenario, [(name, seed, scale, count_allocations) for name in names], chunksize=1)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "scale": scale,
+        "scenarios": dict(zip(names, results))
+    }
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """Compare the results with the baseline, return descriptions of the regressions"""
+    thresholds = {"time": time_threshold, "memory": memory_threshold}
+    regressions = []
+
+    # Check every metric of every scenario that's in both
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+
+        for metric, (higher_better, kind) in METRICS.items():
+            # Skip metrics that weren't measured
+            if not result.get(metric) or not base.get(metric):
+                continue
+
+            # Relative change, positive when it got worse
+            change = (result[metric] - base[metric]) / base[metric]
+            if higher_better:
+                change = -change
+
+            # Report it if it's worse than allowed
+            if change > thresholds[kind]:
+                regressions.append(f"{name} {metric}: {base[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"({change:+.1%} worse, allowed {thresholds[kind]:.0%})")
+
+    return regressions
+
+
+def main(args=None):
+    """Run the benchmarks from the command line"""
+    # Parse the arguments
+    parser = argparse.ArgumentParser(description="Benchmark PyValley's headless level in scripted scenarios")
+    parser.add_argument("scenarios", nargs="*",
+                        help=f"scenarios to run, all of them by default ({', '.join(SCENARIOS)})")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the game's randomness")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the amount of units to run")
+    parser.add_argument("--output", metavar="PATH", help="write the results into the given JSON file")
+    parser.add_argument("--allocations", action="store_true",
+                        help="count the allocations per unit of every subsystem, after the timed units")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results with the given JSON results")
+    parser.add_argument("--time-threshold", type=float, default=0.10,
+                        help="allowed relative slowdown of times and rates (0.10 is 10%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.10,
+                        help="allowed relative growth of peak memory")
+    options = parser.parse_args(args)
+
+    # Make sure the scenarios exist
+    for name in options.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    # Run the scenarios
+    results = run_all(options.scenarios or list(SCENARIOS), options.seed, options.scale, options.allocations)
+
+    # Print them
+    for name, result in results["scenarios"].items():
+        memory = f"{result['peak_memory_mb']:.0f} MB" if result["peak_memory_mb"] else "n/a"
+        print(f"{name:>13}: {result['units']} {result['unit']}s, p50 {result['p50_ms']:.3f} ms, "
+              f"p95 {result['p95_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms, "
+              f"{result['rate']:.0f} {result['unit']}s/s, peak {memory}")
+        # Print the subsystems that allocated the most
+        if result["allocations"]:
+            counted = result["allocations"]["subsystems"]
+            print(" " * 15 + "allocated blocks per unit: " + (", ".join(
+                f"{subsystem} {values['blocks']:.1f}" for subsystem, values in list(counted.items())[:5]) or "none"))
+
+    # Save them if wanted
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    # Compare them with the baseline if wanted, fail if there are regressions
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+
+        # Scenarios whose final state changed don't measure the same work anymore
+        for name, result in results["scenarios"].items():
+            base = baseline["scenarios"].get(name)
+            if base and base["digest"] != result["digest"]:
+                print(f"NOTE {name} ended in a different state than in the baseline")
+
+        regressions = compare(results, baseline, options.time_threshold, options.memory_threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("no regressions against the baseline")
+
+    return 0
+
+
+# If it's the main file, run the benchmarks
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import pygame
+
+from src.controls import controls, KeyState
+
+
+class Scenario:
+    """Scripted benchmark scenario, prepares a headless level and then runs units of work on it"""
+    # Name of the scenario, amount of units it runs and what a unit is
+    name = ""
+    units = 1200
+    unit = "update"
+
+    def setup(self, simulation):
+        """Prepare the level before the timing starts"""
+
+    def run_unit(self, simulation):
+        """Run a single timed unit of work"""
+        simulation.step()
+
+
+class IdleFarm(Scenario):
+    """Untouched farm without any input"""
+    name = "idle"
+
+
+class PlantedFarm(Scenario):
+    """Every farmable tile hoed, planted and watered, with the player walking around"""
+    name = "planted"
+
+    def setup(self, simulation):
+        """Hoe, plant and water the whole Farmable layer"""
+        # Import the soil only after pygame is ready, like the level
+        from src.soil import FARMABLE, HIT
+        soil = simulation.level.soil
+
+        # Hoe every farmable tile at once, a single hit creates the soil tiles of all of them
+        soil.grid[(soil.grid & FARMABLE) != 0] |= HIT
+        soil.handle_hit(soil.farmable_rects[0].center)
+
+        # Plant both seeds in turns and water everything
+        for index, rect in enumerate(soil.farmable_rects):
+            soil.plant(("corn", "tomato")[index % 2], rect.center)
+        soil.water_all()
+
+        # Walk left and right in turns
+        walk = (KeyState.to_mask([pygame.K_LEFT]), KeyState.to_mask([pygame.K_RIGHT]))
+        controls.script = lambda: walk[simulation.frames // 120 % 2]
+
+
+class RainDay(Scenario):
+    """Whole day of heavy rain"""
+    name = "rain"
+
+    def setup(self, simulation):
+        """Start the rain"""
+        simulation.level.rain_active = True
+        simulation.level.soil.rain_active = True
+
+
+class ChoppedTrees(Scenario):
+    """Every tree chopped down into a stump"""
+    name = "chopped"
+
+    def setup(self, simulation):
+        """Chop all the trees"""
+        for tree in simulation.level.trees:
+            while tree.alive:
+                tree.handle_damage()
+
+
+class ShopLoop(Scenario):
+    """Open shop with the player browsing and trading"""
+    name = "shop"
+
+    def setup(self, simulation):
+        """Open the shop and script the browsing"""
+        simulation.level.shop = True
+
+        # Go down the items, trading every now and then
+        down = KeyState.to_mask([pygame.K_DOWN])
+        trade = KeyState.to_mask([pygame.K_SPACE])
+        controls.script = lambda: trade if simulation.frames % 90 == 45 else down
+
+
+class FastForward(Scenario):
+    """Thousand days skipped one after another"""
+    name = "fast_forward"
+    units = 1000
+    unit = "day"
+
+    def setup(self, simulation):
+        """Keep the player alive through all the days"""
+        simulation.level.player.health = self.units + 1
+
+    def run_unit(self, simulation):
+        """Skip a single day"""
+        simulation.advance_day(skip_night=True)
+
+
+# All the scenarios by their names
+SCENARIOS = {scenario.name: scenario for scenario in (IdleFarm, PlantedFarm, RainDay, ChoppedTrees, ShopLoop,
+                                                      FastForward)}
@@ -1,64 +1,260 @@
-import sys
+import gc
+import os
+import time
+import argparse
 
 import pygame
 
 from src.settings import settings
 from src.level import Level
+from src.rng import rng
+from src.controls import controls
+from src.save import saves
+from src.profiler import profiler
+from src.capture import capture, CAPTURE_MODES
+from src.allocations import allocations
+from src.quality import quality
+from src.display import display, BACKENDS
+from src.tasks import tasks
+from src.memory import memory
 
 
 class Game:
     """The main game class"""
-    def __init__(self):
-        """Initialize the entire game"""
+    def __init__(self, seed=None, record=None, replay=None, load=None, resume=False, profile=None,
+                 backend=settings.DISPLAY_BACKEND):
+        """Initialize the entire game, optionally seeded, recording or replaying the input, loaded or profiled"""
         # Prepare pygame
         pygame.init()
 
-        # Get the display surface
-        self.surface = pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
-        # Set its caption
-        pygame.display.set_caption("PyValley")
+        # Open the window with the chosen rendering backend
+        display.open(backend)
 
         # Get the timer for calculating FPS
         self.timer = pygame.time.Clock()
 
+        # Duration of a single simulation update
+        self.time_step = 1 / settings.UPDATE_RATE
+        # Time that passed, but wasn't simulated yet
+        self.accumulator = 0
+
+        # If there is a replay, play it with the seed of its session
+        if replay:
+            seed = controls.load_replay(replay)
+        # Seed the game's randomness
+        rng.seed(seed)
+
+        # Running flag, cleared when the user quits
+        self.running = True
+
+        # Path to save the recorded input to
+        self.record = record
+        # Start recording if wanted
+        if self.record:
+            controls.start_recording(rng.base_seed)
+
+        # Path to export the profiled frames to
+        self.profile = profile
+        # Start logging the frames if wanted
+        if self.profile:
+            profiler.start_logging()
+
+        # Spread the background tasks over the frames' spare time
+        tasks.enabled = True
+        # Start of the current frame, after waiting for the FPS cap, and the running quick save's task
+        self.frame_start = time.perf_counter()
+        self.save_task = None
+
         # Game's level
         self.level = Level()
+        # Load the saved game or continue the autosaved one if wanted, start a new game if there's no autosave yet
+        if load:
+            saves.load(self.level, load)
+        elif resume and os.path.exists(self.level.autosave.path):
+            self.level.autosave.load()
+
+        # Collect the garbage of the startup (like the map's data), then move the objects created at startup out of the
+        # garbage collector's sight, so collections stay short
+        gc.collect()
+        gc.freeze()
 
     def run(self):
-        """Run the game"""
-        # Game's loop
-        while True:
+        """Run the game until the user quits or the game is over, then shut it down"""
+        # Shut down even if the game crashes, so the recorded input and the saves aren't lost
+        try:
+            self._loop()
+        finally:
+            self._shutdown()
+
+    def _loop(self):
+        """Run the game's loop until the user quits or the game is over"""
+        while self.running:
+            # Start profiling the frame
+            profiler.begin_frame()
+            capture.begin_frame()
+            allocations.begin_frame()
+
             # Check and handle events
-            self._get_events()
+            with profiler.section("events"):
+                self._get_events()
+            # Stop if the user quit
+            if not self.running:
+                break
+
+            # Get the time of the last frame, cap the rendered FPS
+            with profiler.section("wait"):
+                self.accumulator += self.timer.tick(settings.MAX_FPS) / 1000
+            self.frame_start = time.perf_counter()
 
-            # Remain 60 FPS
-            delta_time = self.timer.tick(60) / 1000
+            # Let the quality governor react to the time the frame took, without waiting for the FPS cap and
+            # without the background tasks that only filled its spare time
+            quality.update(self.timer.get_rawtime() - tasks.spent)
+            profiler.count("quality_level", quality.level)
 
-            # Run the level
-            self.level.run(delta_time)
+            # Simulate the passed time in fixed steps, stop once the game is over
+            self._update_level()
+            if self.level.game_over:
+                break
+
+            # Draw the level between the last two updates
+            self.level.draw(self.accumulator / self.time_step)
+            # Draw the profiler's overlay
+            profiler.display(display)
 
             # Update the display surface
-            self._update_surface()
+            with profiler.section("flip"):
+                self._update_surface()
+
+            # Resume the background tasks in the time left of the frame's budget
+            with profiler.section("tasks"):
+                tasks.run(self.frame_start)
+
+            # Finish profiling the frame
+            profiler.end_frame()
+            capture.end_frame()
+            allocations.end_frame()
+
+    def _update_level(self):
+        """Update the level in fixed time steps to catch up with the passed time"""
+        # Count the updates in this frame
+        steps = 0
+
+        # Run updates while there is a whole step of time to simulate
+        while self.accumulator >= self.time_step and steps < settings.MAX_UPDATE_STEPS and not self.level.game_over:
+            # Update the level by one step
+            self.level.update(self.time_step)
+
+            # Consume the simulated time
+            self.accumulator -= self.time_step
+            steps += 1
+
+        # If the game can't keep up, drop the time it couldn't simulate, so it slows down instead of stalling
+        if self.accumulator >= self.time_step:
+            self.accumulator %= self.time_step
 
     def _get_events(self):
         """Get the input events and handle them"""
         # Check every event
         for event in pygame.event.get():
-            # If user wants to quit, let him do it
-            if event.type == pygame.QUIT:
-                # Free pygame's resources
-                pygame.quit()
-                # Exit the program
-                sys.exit()
+            # If the user wants to quit (or closes the texture backend's window), let them do it
+            if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
+                # Stop the game's loop, it shuts the game down
+                self.running = False
+                return
+
+            # Toggle the profiler's overlay on F3, capture a profile on F4, quick save on F5, switch the rendering
+            # backend on F6, print the surfaces' memory on F7 and quick load on F9
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                elif event.key == pygame.K_F4:
+                    capture.start()
+                elif event.key == pygame.K_F5:
+                    self._finish_save()
+                    self.save_task = saves.save_later(self.level, settings.SAVE_PATH)
+                elif event.key == pygame.K_F6:
+                    display.switch()
+                elif event.key == pygame.K_F7:
+                    print(memory.report())
+                elif event.key == pygame.K_F9:
+                    self._finish_save()
+                    if os.path.exists(settings.SAVE_PATH):
+                        saves.load(self.level, settings.SAVE_PATH)
+
+    def _shutdown(self):
+        """Save what the session leaves behind and free pygame's resources"""
+        # Save the recorded input
+        if self.record:
+            controls.save_recording(self.record)
+        # Let the quick save and the autosave finish writing
+        self._finish_save()
+        self.level.autosave.close()
+        # Export the profiled frames
+        if self.profile:
+            profiler.export(self.profile)
+        # Report the allocations counted in every frame
+        if allocations.running:
+            print(allocations.report(settings.ALLOCATIONS_WARMUP))
+
+        # Free pygame's resources
+        pygame.quit()
+
+    def _finish_save(self):
+        """Finish writing the quick save, if it's still being written"""
+        if self.save_task:
+            tasks.finish(self.save_task)
+            self.save_task = None
 
     def _update_surface(self):
         """Draw things onto the surface"""
-        # Update the display
-        pygame.display.update()
+        # Show the drawn frame
+        display.present()
+
+
+def parse_arguments():
+    """Parse the command line arguments"""
+    parser = argparse.ArgumentParser(description="PyValley, a little cozy farming game")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the game's randomness")
+    parser.add_argument("--record", metavar="PATH", help="record the input into the given log")
+    parser.add_argument("--replay", metavar="PATH", help="replay the input recorded in the given log")
+    parser.add_argument("--load", metavar="PATH", help="load the game saved in the given file")
+    parser.add_argument("--continue", dest="resume", action="store_true", help="continue the autosaved game")
+    parser.add_argument("--profile", metavar="PATH", help="profile every frame, export them into CSV or JSON on exit")
+    parser.add_argument("--quality", choices=settings.QUALITY_PRESETS,
+                        help="keep the given quality preset instead of adapting it to the frame times")
+    parser.add_argument("--backend", choices=BACKENDS, default=settings.DISPLAY_BACKEND,
+                        help="draw with software surfaces or with SDL's renderer and textures")
+    parser.add_argument("--allocations", action="store_true",
+                        help="count the memory allocated in every frame by every subsystem, report it on exit")
+    parser.add_argument("--capture-frames", type=int, metavar="N",
+                        help="capture a profile of the first N frames (F4 captures the next ones)")
+    parser.add_argument("--capture-mode", choices=CAPTURE_MODES, default=settings.CAPTURE_MODE,
+                        help="cprofile writes .pstats, sampling writes folded stacks for flame graphs")
+    parser.add_argument("--capture-output", metavar="PATH", help="file to write the first capture into")
+
+    return parser.parse_args()
 
 
 # If it's the main file, run it
 if __name__ == "__main__":
+    # Get the options
+    options = parse_arguments()
+
     # Create and run the game
-    game = Game()
+    game = Game(options.seed, options.record, options.replay, options.load, options.resume, options.profile,
+                options.backend)
+
+    # Count the allocations if wanted
+    if options.allocations:
+        allocations.start()
+
+    # Keep the chosen quality preset if there is one
+    if options.quality:
+        quality.pin(options.quality)
+
+    # Capture in the chosen mode, starting with the first frames if wanted
+    capture.default_mode = options.capture_mode
+    if options.capture_frames:
+        capture.start(options.capture_frames, path=options.capture_output)
+
     game.run()
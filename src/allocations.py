@@ -0,0 +1,90 @@
+import tracemalloc
+from os.path import basename, splitext
+
+from src.profiler import profiler
+
+
+class Allocations:
+    """Debug counters of memory allocated in every frame, by the subsystem (module) that allocated it"""
+    def __init__(self):
+        """Create the counters, they are off until started"""
+        # Flag of counting the allocations
+        self.running = False
+
+        # Blocks and bytes allocated in every frame and still alive at its end, by subsystem
+        self.frames = []
+        # Peak of memory allocated on top of the frame's start (catches blocks freed within the frame too)
+        self.peaks = []
+
+    def start(self):
+        """Start tracing the allocations"""
+        tracemalloc.start()
+        self.running = True
+
+    def stop(self):
+        """Stop tracing the allocations"""
+        tracemalloc.stop()
+        self.running = False
+
+    def begin_frame(self):
+        """Start counting the next frame, forgetting the blocks allocated before it"""
+        if not self.running:
+            return
+
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+
+    def end_frame(self):
+        """Count the blocks allocated in the frame by every subsystem"""
+        if not self.running:
+            return
+
+        # Take the peak first, the snapshot itself allocates
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, __file__),
+                                                              tracemalloc.Filter(False, tracemalloc.__file__)))
+
+        # Sum the blocks of every module
+        frame = {}
+        for statistic in snapshot.statistics("filename"):
+            name = splitext(basename(statistic.traceback[0].filename))[0]
+            blocks, size = frame.get(name, (0, 0))
+            frame[name] = (blocks + statistic.count, size + statistic.size)
+
+        self.frames.append(frame)
+        self.peaks.append(peak)
+
+        # Show them with the profiler's counters
+        for name, (blocks, _) in frame.items():
+            profiler.count(f"allocations_{name}", blocks)
+
+    def summary(self, skip=0):
+        """Get the average blocks and bytes per frame of every subsystem, without the first frames"""
+        frames = self.frames[skip:]
+        if not frames:
+            return {"frames": 0, "peak_bytes": 0, "subsystems": {}}
+
+        # Average the counts of every subsystem, frames without it count as zero
+        names = sorted({name for frame in frames for name in frame})
+        subsystems = {name: {"blocks": sum(frame.get(name, (0, 0))[0] for frame in frames) / len(frames),
+                             "bytes": sum(frame.get(name, (0, 0))[1] for frame in frames) / len(frames)}
+                      for name in names}
+
+        return {
+            "frames": len(frames),
+            "peak_bytes": sum(self.peaks[skip:]) / len(frames),
+            "subsystems": dict(sorted(subsystems.items(), key=lambda item: -item[1]["blocks"]))
+        }
+
+    def report(self, skip=0):
+        """Get a printable table of the summary"""
+        summary = self.summary(skip)
+        lines = [f"allocations in {summary['frames']} frames, peak {summary['peak_bytes']:.0f} bytes per frame"]
+        lines += [f"{name:>12}: {values['blocks']:8.1f} blocks {values['bytes']:10.0f} bytes per frame"
+                  for name, values in summary["subsystems"].items()]
+
+        return "\n".join(lines)
+
+
+# Create the game's allocation counters
+allocations = Allocations()
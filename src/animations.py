@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from src.settings import settings
+from src.utilities import utilities
+from src.memory import memory
+from src.profiler import profiler
+from src.tasks import tasks
+
+
+class AnimationStore:
+    """Animation frames loaded the first time they're needed, evicting the least recently used ones over a budget"""
+    def __init__(self, budget=settings.ANIMATION_BUDGET):
+        """Create the empty store with the given budget of the frames' memory (in bytes)"""
+        self.budget = budget
+
+        # Frames of the loaded animation folders, from the least to the most recently used, and their bytes
+        self.sets = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+
+        # Folders waiting to be loaded in the background
+        self.prefetching = set()
+
+    def get(self, path):
+        """Get the frames of the animation folder, loading them right now if they aren't loaded"""
+        frames = self.sets.get(path)
+
+        # Load them if they aren't loaded (or were evicted)
+        if frames is None:
+            frames = self._load(path)
+        # Otherwise mark them as the most recently used
+        else:
+            self.sets.move_to_end(path)
+
+        return frames
+
+    def prefetch(self, paths):
+        """Load the animation folders in the background, before they're needed"""
+        if not settings.ANIMATION_PREFETCH:
+            return
+
+        # Add a task for every folder that isn't loaded or waiting yet
+        for path in paths:
+            if path not in self.sets and path not in self.prefetching:
+                self.prefetching.add(path)
+                tasks.add(self._prefetch(path), settings.TASK_PRIORITIES["animations"], name="animation prefetch")
+
+    def _prefetch(self, path):
+        """Load the animation folder in a single step, unless it was needed and loaded before its turn"""
+        self.prefetching.discard(path)
+        if path not in self.sets:
+            self._load(path, prefetched=True)
+        yield
+
+    def _load(self, path, prefetched=False):
+        """Load the animation folder and store its frames, evicting the least recently used ones over the budget"""
+        frames = utilities.load_folder(path)
+        profiler.count("animation_loads")
+
+        # Store them as the most recently used, or as the least recently used ones if they were only prefetched,
+        # so they never evict the frames in use (and are evicted themselves if there's no room for them)
+        self.sets[path] = frames
+        if prefetched:
+            self.sets.move_to_end(path, last=False)
+        self.sizes[path] = sum(memory.size(frame) for frame in frames)
+        self.bytes += self.sizes[path]
+
+        # Evict the least recently used ones until the rest fits into the budget, always keeping the last used ones
+        while self.bytes > self.budget and len(self.sets) > 1:
+            evicted, _ = self.sets.popitem(last=False)
+            self.bytes -= self.sizes.pop(evicted)
+            profiler.count("animation_evictions")
+
+        return frames
+
+
+# Create the game's animation store
+animations = AnimationStore()
@@ -0,0 +1,210 @@
+import os
+import sys
+import zlib
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from src.settings import settings
+from src.timer import Timer
+from src.save import saves, Snapshot, SOIL_TYPES
+
+
+# Delta file header (magic, version, checksum of the base save it applies to), the rest of the file is compressed
+DELTA_MAGIC = b"PVDL"
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct("<4sHI")
+# Position (column and row) of a changed soil chunk, its arrays follow it
+DELTA_CHUNK = struct.Struct("<HH")
+# Amount of changed chunks
+DELTA_COUNT = struct.Struct("<I")
+
+
+class Autosave:
+    """Autosave that snapshots the game on the main thread and writes it on a background one"""
+    def __init__(self, level, path=settings.AUTOSAVE_PATH):
+        """Create the autosave and start its worker"""
+        # Level to save
+        self.level = level
+
+        # Path of the full base save and of the delta of soil chunks changed since it
+        self.path = path
+        self.delta_path = path + ".delta"
+
+        # Timer of the periodic autosave
+        self.timer = Timer(settings.AUTOSAVE_INTERVAL, self.request)
+        self.timer.start()
+
+        # Snapshot waiting to be written, only the newest one is kept
+        self.snapshots = queue.Queue(maxsize=1)
+
+        # Soil arrays and checksum of the base save, only the worker uses them
+        self.base = None
+        self.base_checksum = 0
+
+        # Start the worker
+        self.worker = threading.Thread(target=self._work, name="autosave", daemon=True)
+        self.worker.start()
+
+    def update(self):
+        """Update the periodic autosave timer"""
+        self.timer.update()
+
+        # Start the next period once the timer runs out
+        if not self.timer.active:
+            self.timer.start()
+
+    def request(self):
+        """Snapshot the level and let the worker save it"""
+        snapshot = saves.snapshot(self.level)
+
+        # Replace the waiting snapshot if the worker didn't take it yet
+        try:
+            self.snapshots.get_nowait()
+            self.snapshots.task_done()
+        except queue.Empty:
+            pass
+        self.snapshots.put_nowait(snapshot)
+
+    def close(self, timeout=settings.AUTOSAVE_CLOSE_TIMEOUT):
+        """Wait until the waiting snapshot is written, but at most the given time (in milliseconds), return whether
+        it was written"""
+        # Wait for the worker to mark every snapshot as done
+        with self.snapshots.all_tasks_done:
+            written = self.snapshots.all_tasks_done.wait_for(lambda: not self.snapshots.unfinished_tasks,
+                                                              timeout / 1000)
+
+        # Let the user know the game quit before the last autosave was written
+        if not written:
+            print("autosave: the last snapshot wasn't written in time", file=sys.stderr)
+
+        return written
+
+    def load(self):
+        """Load the base save with its delta applied into the level"""
+        # Read the base save and its checksum
+        snapshot = saves.read(self.path)
+        with open(self.path, "rb") as file:
+            checksum = zlib.crc32(file.read())
+
+        # Apply the delta if there is one for this base
+        if os.path.exists(self.delta_path):
+            self._apply_delta(snapshot, checksum)
+
+        # Restore the level
+        saves.apply(snapshot, self.level, self.path)
+
+    def _work(self):
+        """Write the requested snapshots in the background"""
+        while True:
+            snapshot = self.snapshots.get()
+            # Report a failed write and keep working, so the next snapshots are still written
+            try:
+                self._write(snapshot)
+            except Exception as error:
+                print(f"autosave: writing {self.path} failed: {error!r}", file=sys.stderr)
+                # Write a whole base save next time, the files on the disk may not match the known base anymore
+                self.base = None
+            # Mark it as done even if writing fails, so closing never waits for it
+            finally:
+                self.snapshots.task_done()
+
+    def _write(self, snapshot):
+        """Write the snapshot as a delta of its changed soil chunks, or as a new base save if too much changed"""
+        # If there is a base, get the chunks that changed since it
+        if self.base is not None:
+            changed = self._changed_chunks(snapshot.soil)
+
+            # If only some of them changed, write just the delta
+            if len(changed) <= settings.AUTOSAVE_COMPACT * self._chunk_count():
+                self._write_delta(snapshot, changed)
+                return
+
+        # Otherwise write the whole base save
+        self.base_checksum = saves.write(snapshot, self.path)
+        self.base = snapshot.soil
+        # Write an empty delta for it, replacing the old one
+        self._write_delta(snapshot, [])
+
+    def _changed_chunks(self, soil):
+        """Get the soil chunks (column and row) that differ from the base save"""
+        # Cells whose any soil array differs
+        changed = np.zeros(soil[0].shape, bool)
+        for array, base in zip(soil, self.base):
+            changed |= array != base
+
+        # Pad the cells to whole chunks and check every chunk at once
+        size = settings.CHUNK_SIZE
+        height, width = changed.shape
+        padded = np.zeros((-(-height // size) * size, -(-width // size) * size), bool)
+        padded[:height, :width] = changed
+        chunks = padded.reshape(padded.shape[0] // size, size, padded.shape[1] // size, size).any(axis=(1, 3))
+
+        return [(column, row) for row, column in np.argwhere(chunks).tolist()]
+
+    def _chunk_count(self):
+        """Get the amount of soil chunks"""
+        height, width = self.base[0].shape
+        return -(-height // settings.CHUNK_SIZE) * -(-width // settings.CHUNK_SIZE)
+
+    def _write_delta(self, snapshot, chunks):
+        """Write the snapshot's state and its given soil chunks into the delta file"""
+        # Pack the state and the amount of chunks
+        data = bytearray(snapshot.pack_state())
+        data += DELTA_COUNT.pack(len(chunks))
+
+        # Pack every chunk's position and its part of each soil array
+        for column, row in chunks:
+            data += DELTA_CHUNK.pack(column, row)
+            for array in snapshot.soil:
+                data += self._chunk_slice(array, column, row).tobytes()
+
+        # Write the file at once, so it's never left half-written
+        with open(self.delta_path + ".tmp", "wb") as file:
+            file.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, self.base_checksum))
+            file.write(zlib.compress(data, 1))
+        os.replace(self.delta_path + ".tmp", self.delta_path)
+
+    def _apply_delta(self, snapshot, checksum):
+        """Apply the delta file onto the snapshot of the base save with the given checksum"""
+        # Read the file
+        with open(self.delta_path, "rb") as file:
+            data = file.read()
+
+        # Read and check the header, a delta of an older base is ignored
+        magic, version, base_checksum = DELTA_HEADER.unpack_from(data)
+        if magic != DELTA_MAGIC or version != DELTA_VERSION:
+            raise ValueError(f"{self.delta_path} isn't a supported delta file")
+        if base_checksum != checksum:
+            return
+
+        # Decompress it
+        try:
+            data = zlib.decompress(data[DELTA_HEADER.size:])
+        except zlib.error as error:
+            raise ValueError(f"{self.delta_path} is corrupted") from error
+
+        # Take the newer state
+        snapshot.state, (snapshot.values, snapshot.tree_health, snapshot.apple_occupancy), offset = \
+            Snapshot.unpack_state(data, self.delta_path)
+        if snapshot.state[-4:-2] != snapshot.soil[0].shape:
+            raise ValueError(f"{self.delta_path} doesn't match its base save")
+
+        # Copy every changed chunk into the soil arrays
+        count, = DELTA_COUNT.unpack_from(data, offset)
+        offset += DELTA_COUNT.size
+        for _ in range(count):
+            column, row = DELTA_CHUNK.unpack_from(data, offset)
+            offset += DELTA_CHUNK.size
+
+            for array, dtype in zip(snapshot.soil, SOIL_TYPES):
+                target = self._chunk_slice(array, column, row)
+                target[:] = np.frombuffer(data, dtype, target.size, offset).reshape(target.shape)
+                offset += target.nbytes
+
+    def _chunk_slice(self, array, column, row):
+        """Get the part of the soil array covered by the chunk"""
+        size = settings.CHUNK_SIZE
+        return array[row * size:(row + 1) * size, column * size:(column + 1) * size]
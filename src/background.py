@@ -0,0 +1,129 @@
+import math
+
+import pygame
+
+from src.profiler import profiler
+from src.memory import memory
+
+
+class Background:
+    """Last frame's static ground-level layers, scrolled with the camera and redrawn only where they changed"""
+    def __init__(self, size):
+        """Create the background cache of the given screen size"""
+        # Size of the screen and the surface the layers are composited on
+        self.size = size
+        self.surface = None
+
+        # World position of the surface's top left corner (None if it has to be redrawn whole)
+        self.origin = None
+        # Image, world position and last drawn frame of every element drawn on it, and the current frame
+        self.entries = {}
+        self.frame = 0
+        # Screen rectangles of the elements, reused by every frame
+        self.rects = []
+
+    def invalidate(self):
+        """Redraw the whole background next frame"""
+        self.origin = None
+
+    def draw(self, target, elements, offset):
+        """Draw the elements (in drawing order) onto the target, seen from the camera's offset"""
+        # Create the surface once
+        if not self.surface:
+            self.surface = memory.track(pygame.Surface(self.size).convert(), "display")
+
+        # Static elements are placed a whole pixel apart, so the background only moves by whole pixels
+        origin = (math.ceil(offset.x), math.ceil(offset.y))
+        self.frame += 1
+
+        # Place the screen rectangles of the visible elements
+        rects = self.rects
+        del rects[len(elements):]
+        while len(rects) < len(elements):
+            rects.append(pygame.Rect(0, 0, 0, 0))
+        for rect, element in zip(rects, elements):
+            rect.update(element.rect)
+            rect.move_ip(-origin[0], -origin[1])
+
+        # Find the parts of the screen that changed, redraw everything if they are too big
+        dirty = self._scroll(origin)
+        self._update_entries(elements, origin, dirty)
+        screen = self.surface.get_rect()
+        if dirty is None or sum(rect.width * rect.height for rect in dirty) > screen.width * screen.height // 2:
+            dirty = [screen]
+
+        # Redraw the changed parts, only with the elements that reach them
+        for rect in dirty:
+            # Skip the parts outside of the screen
+            rect = rect.clip(screen)
+            if not rect.width or not rect.height:
+                continue
+
+            self.surface.set_clip(rect)
+            self.surface.fill("gray")
+            self.surface.blits([(elements[index].image, rects[index]) for index in rect.collidelistall(rects)],
+                               doreturn=False)
+            # Count the redrawn pixels
+            profiler.count("background_pixels", rect.width * rect.height)
+        self.surface.set_clip(None)
+
+        # Remember where it's drawn
+        self.origin = origin
+
+        # Copy it onto the target
+        target.blit(self.surface, (0, 0))
+
+    def _scroll(self, origin):
+        """Scroll the surface to the origin, get the screen strips it uncovered (None if all of it needs drawing)"""
+        if not self.origin:
+            return None
+
+        # Movement of the camera since the last frame, if it moved past the whole screen nothing can be reused
+        move_x = origin[0] - self.origin[0]
+        move_y = origin[1] - self.origin[1]
+        width, height = self.size
+        if abs(move_x) >= width or abs(move_y) >= height:
+            return None
+
+        # Shift the last frame's background, strips it uncovered need drawing
+        dirty = []
+        if move_x or move_y:
+            self.surface.scroll(-move_x, -move_y)
+            if move_x:
+                dirty.append(pygame.Rect(width - move_x if move_x > 0 else 0, 0, abs(move_x), height))
+            if move_y:
+                dirty.append(pygame.Rect(0, height - move_y if move_y > 0 else 0, width, abs(move_y)))
+
+        return dirty
+
+    def _update_entries(self, elements, origin, dirty):
+        """Update the entries of the elements, adding where the changed ones were and are to the dirty rectangles"""
+        # Elements that appeared or changed their image or position need redrawing where they were and where they are
+        for element in elements:
+            entry = self.entries.get(element)
+            if entry is None:
+                self.entries[element] = entry = [None, 0, 0, 0]
+            elif entry[0] is not element.image or entry[1] != element.rect.x or entry[2] != element.rect.y:
+                if dirty is not None:
+                    dirty.append(self._screen_rect(entry, origin))
+            else:
+                entry[3] = self.frame
+                continue
+
+            # Save the new entry and draw it
+            entry[0], entry[1], entry[2], entry[3] = element.image, element.rect.x, element.rect.y, self.frame
+            if dirty is not None:
+                dirty.append(self._screen_rect(entry, origin))
+
+        # Elements that disappeared need redrawing where they were
+        removed = [element for element, entry in self.entries.items() if entry[3] != self.frame]
+        for element in removed:
+            if dirty is not None:
+                dirty.append(self._screen_rect(self.entries[element], origin))
+            del self.entries[element]
+
+    @staticmethod
+    def _screen_rect(entry, origin):
+        """Get the screen rectangle of an element's entry"""
+        image, pos_x, pos_y, _ = entry
+        return pygame.Rect(pos_x - origin[0], pos_y - origin[1], *image.get_size())
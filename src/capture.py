@@ -0,0 +1,168 @@
+import sys
+import time
+import cProfile
+import threading
+from collections import Counter
+from os.path import basename
+
+from src.settings import settings
+
+
+# Capture modes and extensions of the files they write
+CAPTURE_MODES = {
+    "cprofile": ".pstats",
+    "sampling": ".folded"
+}
+
+
+class Capture:
+    """Profile capture of the next frames, with cProfile or a low-overhead sampling thread"""
+    def __init__(self):
+        """Create the capture"""
+        # Mode and amount of frames of captures started without them
+        self.default_mode = settings.CAPTURE_MODE
+        self.default_frames = settings.CAPTURE_FRAMES
+
+        # Mode of the requested capture (None if there isn't any) and flag of it running
+        self.mode = None
+        self.running = False
+
+        # Path to write the capture to, amount of frames to capture and index of the current one
+        self.path = None
+        self.frames = 0
+        self.frame = 0
+
+        # Start and duration (in milliseconds) of every captured frame
+        self.frame_times = []
+        self.frame_start = 0
+
+        # Profile of the cprofile mode
+        self.profile = None
+
+        # Sampled stacks (with the frame they were sampled in) and their counts, the sampling thread and the
+        # thread it samples
+        self.samples = Counter()
+        self.sampler = None
+        self.main_thread = threading.main_thread().ident
+        # Names of the sampled functions by their code
+        self.names = {}
+
+    def start(self, frames=None, mode=None, path=None):
+        """Capture the given amount of frames starting with the next one, return the path it's written to"""
+        # Don't start another capture while one is requested or running
+        if self.mode:
+            return self.path
+
+        # Use the defaults if the mode or amount of frames isn't given
+        mode = mode or self.default_mode
+        frames = frames or self.default_frames
+
+        # Check the mode
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"unknown capture mode {mode}")
+
+        # Save the request
+        self.mode = mode
+        self.frames = frames
+        self.path = path or time.strftime(f"capture-%Y%m%d-%H%M%S{CAPTURE_MODES[mode]}")
+
+        return self.path
+
+    def begin_frame(self):
+        """Start the next frame, starting the capture if it's requested"""
+        if not self.mode:
+            return
+
+        # Start capturing
+        if not self.running:
+            self._start()
+
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Finish the current frame, finishing the capture after the last one"""
+        if not self.running:
+            return
+
+        # Mark the frame's boundaries
+        self.frame_times.append((self.frame_start, (time.perf_counter() - self.frame_start) * 1000))
+        self.frame += 1
+
+        # Finish once all the frames are captured
+        if self.frame >= self.frames:
+            self._finish()
+
+    def _start(self):
+        """Start profiling or sampling"""
+        self.running = True
+        self.frame = 0
+        self.frame_times = []
+
+        # Run cProfile
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        # Or start the sampling thread
+        else:
+            self.samples = Counter()
+            self.sampler = threading.Thread(target=self._sample, name="sampler", daemon=True)
+            self.sampler.start()
+
+    def _finish(self):
+        """Stop profiling or sampling and write the results"""
+        # Stop it
+        self.running = False
+        if self.mode == "cprofile":
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+        else:
+            self.sampler.join()
+            self._write_folded()
+
+        # Write the frame markers
+        self._write_frames()
+
+        print(f"captured {self.frames} frames into {self.path}")
+        self.mode = None
+
+    def _sample(self):
+        """Sample the main thread's stack at set intervals while running"""
+        while self.running:
+            time.sleep(settings.CAPTURE_INTERVAL)
+
+            # Get the main thread's current frame
+            frame = sys._current_frames().get(self.main_thread)
+            if frame is None:
+                continue
+
+            # Walk the stack from the innermost function
+            stack = []
+            while frame:
+                code = frame.f_code
+                # Name functions once
+                if code not in self.names:
+                    self.names[code] = f"{basename(code.co_filename)}:{code.co_name}"
+                stack.append(self.names[code])
+                frame = frame.f_back
+
+            # Count the stack in the current game frame
+            self.samples[(self.frame, ";".join(reversed(stack)))] += 1
+
+    def _write_folded(self):
+        """Write the samples as folded stacks, rooted at a marker of the frame they were sampled in"""
+        with open(self.path, "w") as file:
+            for (frame, stack), count in sorted(self.samples.items()):
+                # Name the marker after the frame and its duration, so slow frames stand out
+                duration = self.frame_times[frame][1] if frame < len(self.frame_times) else 0
+                file.write(f"frame_{frame:05d}_{duration:.1f}ms;{stack} {count}\n")
+
+    def _write_frames(self):
+        """Write the start (relative to the first frame) and duration of every captured frame"""
+        with open(self.path + ".frames.csv", "w") as file:
+            file.write("frame,start_ms,duration_ms\n")
+            for index, (start, duration) in enumerate(self.frame_times):
+                file.write(f"{index},{(start - self.frame_times[0][0]) * 1000:.3f},{duration:.3f}\n")
+
+
+# Create the game's capture
+capture = Capture()
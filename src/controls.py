@@ -0,0 +1,160 @@
+import struct
+
+import pygame
+
+
+# Keys that the game reacts to, their index is their bit in the input mask
+KEYS = (
+    pygame.K_LEFT, pygame.K_a, pygame.K_RIGHT, pygame.K_d,
+    pygame.K_UP, pygame.K_w, pygame.K_DOWN, pygame.K_s,
+    pygame.K_l, pygame.K_c, pygame.K_f,
+    pygame.K_SPACE, pygame.K_k, pygame.K_x,
+    pygame.K_e, pygame.K_q, pygame.K_LCTRL,
+    pygame.K_RETURN, pygame.K_ESCAPE
+)
+# Bit of every key
+KEY_BITS = {key: bit for bit, key in enumerate(KEYS)}
+
+# Input log header (magic, version, seed, amount of updates) and a single run of the same input (mask, length)
+LOG_MAGIC = b"PVIN"
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct("<4sHQI")
+LOG_RUN = struct.Struct("<IH")
+
+
+class KeyState:
+    """State of the game's keys packed into a bit mask, indexed like pygame's pressed keys"""
+    def __init__(self, mask=0):
+        """Create the key state"""
+        self.mask = mask
+
+    def __getitem__(self, key):
+        """Check if the given key is pressed"""
+        # Get the key's bit, keys the game doesn't track are never pressed
+        bit = KEY_BITS.get(key)
+        if bit is None:
+            return False
+
+        # Check the bit
+        return bool(self.mask >> bit & 1)
+
+    @staticmethod
+    def to_mask(keys):
+        """Pack the given keys into a bit mask"""
+        mask = 0
+        # Set bit of every key
+        for key in keys:
+            mask |= 1 << KEY_BITS[key]
+
+        return mask
+
+
+class Controls:
+    """Input of the game, read once per update from the keyboard, a script or a recorded replay"""
+    def __init__(self):
+        """Create the controls"""
+        # Current state of the keys
+        self.state = KeyState()
+
+        # Masks recorded so far (None if not recording) and seed of the recorded session
+        self.recording = None
+        self.seed = 0
+
+        # Masks to replay and index of the next one
+        self.replay = None
+        self.replay_index = 0
+
+        # Function returning the next mask instead of the keyboard (used by scripted runs)
+        self.script = None
+
+    def poll(self):
+        """Read the input for the next update"""
+        # If there is a replay running, take its next mask
+        if self.replay is not None:
+            mask = self.replay[self.replay_index] if self.replay_index < len(self.replay) else 0
+            self.replay_index += 1
+        # Otherwise if the input is scripted, ask the script
+        elif self.script:
+            mask = self.script()
+        # Otherwise read the keyboard
+        else:
+            pressed = pygame.key.get_pressed()
+            mask = 0
+            for bit, key in enumerate(KEYS):
+                if pressed[key]:
+                    mask |= 1 << bit
+
+        # Record the mask if recording
+        if self.recording is not None:
+            self.recording.append(mask)
+
+        # Save the state
+        self.state.mask = mask
+
+    def get_pressed(self):
+        """Get the state of the keys in the current update"""
+        return self.state
+
+    def replay_finished(self):
+        """Check if the whole replay was played"""
+        return self.replay is not None and self.replay_index >= len(self.replay)
+
+    def start_recording(self, seed):
+        """Start recording the input of the session seeded with the given seed"""
+        self.recording = []
+        self.seed = seed
+
+    def save_recording(self, path):
+        """Save the recorded input into a compact binary log"""
+        # Write the header
+        data = bytearray(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, self.seed, len(self.recording)))
+
+        # Compress the masks into runs of the same input
+        run_mask, run_length = None, 0
+        for mask in self.recording:
+            # Continue the run if the mask is the same and the run isn't full
+            if mask == run_mask and run_length < 0xFFFF:
+                run_length += 1
+                continue
+
+            # Otherwise write the finished run and start a new one
+            if run_length:
+                data += LOG_RUN.pack(run_mask, run_length)
+            run_mask, run_length = mask, 1
+
+        # Write the last run
+        if run_length:
+            data += LOG_RUN.pack(run_mask, run_length)
+
+        # Save the log
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def load_replay(self, path):
+        """Load a recorded input log and start replaying it, return the seed of its session"""
+        # Read the log
+        with open(path, "rb") as file:
+            data = file.read()
+
+        # Read and check the header
+        magic, version, seed, count = LOG_HEADER.unpack_from(data)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} isn't a supported input log")
+
+        # Expand the runs into masks of every update
+        self.replay = []
+        for mask, length in LOG_RUN.iter_unpack(data[LOG_HEADER.size:]):
+            self.replay.extend([mask] * length)
+
+        # Make sure the whole log was read
+        if len(self.replay) != count:
+            raise ValueError(f"{path} is truncated")
+
+        # Start from the first update
+        self.replay_index = 0
+
+        return seed
+
+
+# Create the game's controls
+controls = Controls()
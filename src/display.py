@@ -0,0 +1,270 @@
+import weakref
+
+import pygame
+from pygame._sdl2.sdl2 import error as SDLError
+from pygame._sdl2.video import Window, Renderer, Texture
+
+from src.settings import settings
+from src.profiler import profiler
+from src.background import Background
+from src.memory import memory
+
+
+# Rendering backends: software blits onto the display surface, or SDL's renderer drawing textures
+BACKENDS = ("surface", "texture")
+
+# SDL's blend modes of textures, alpha blending and multiplying the target by the texture's color
+BLENDMODE_BLEND = 1
+BLENDMODE_MOD = 4
+
+
+class Display:
+    """Game's window, drawing the world, interface and tints with the chosen rendering backend"""
+    def __init__(self):
+        """Create the display, it's opened later"""
+        # Name of the current backend (None while closed)
+        self.backend = None
+        # Size of the window and its caption
+        self.size = (settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT)
+        self.caption = "PyValley"
+
+        # Display surface of the surface backend
+        self.surface = None
+        # Surface the world is drawn on when it's rendered in a lower scale, and images scaled to it
+        self.buffer = None
+        self.scaled_images = weakref.WeakKeyDictionary()
+        # Last frame's ground-level layers of the surface backend
+        self.background = Background(self.size)
+
+        # Window and renderer of the texture backend
+        self.window = None
+        self.renderer = None
+        # Textures of the drawn images, each image is uploaded only once while it's alive
+        self.textures = weakref.WeakKeyDictionary()
+        # White texture tinted by color modulation, target texture of the scaled world
+        self.tint_texture = None
+        self.world_texture = None
+        # Transparent surface the interface that's drawn with shapes goes on, its texture and a flag of it
+        # having been drawn on since the last upload
+        self.overlay = None
+        self.overlay_texture = None
+        self.overlay_dirty = False
+
+    def open(self, backend=settings.DISPLAY_BACKEND):
+        """Open the window with the given backend"""
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown display backend {backend}")
+        self.backend = backend
+
+        # Create the display surface
+        if backend == "surface":
+            self.surface = memory.track(pygame.display.set_mode(self.size), "display")
+            pygame.display.set_caption(self.caption)
+        # Or a window with a renderer
+        else:
+            self._open_renderer()
+
+    def switch(self, backend=None):
+        """Reopen the window with the given backend (the other one if none is given)"""
+        backend = backend or BACKENDS[1 - BACKENDS.index(self.backend)]
+        if backend == self.backend:
+            return
+
+        self.close()
+        self.open(backend)
+
+    def close(self):
+        """Close the current backend, forgetting everything it prepared"""
+        # Forget the scaled images
+        self.surface = None
+        self.buffer = None
+        self.scaled_images.clear()
+        self.background = Background(self.size)
+
+        # Destroy the textures and the window
+        if self.window:
+            self.textures.clear()
+            self.tint_texture = self.world_texture = self.overlay_texture = None
+            self.overlay = None
+            self.renderer = None
+            self.window.destroy()
+            self.window = None
+
+        self.backend = None
+
+    def clear(self, color):
+        """Fill the whole window with the given color"""
+        if self.backend == "surface":
+            self.surface.fill(color)
+        else:
+            self.renderer.draw_color = color
+            self.renderer.clear()
+
+    def blit(self, image, dest):
+        """Draw the image in the given position or rectangle"""
+        if self.backend == "surface":
+            self.surface.blit(image, dest)
+            return
+
+        # Put the interface drawn so far below it
+        self._flush_overlay()
+
+        # Draw the image's texture, in its own size
+        self._texture(image).draw(dstrect=(dest[0], dest[1], *image.get_size()))
+
+    def caches_background(self, scale):
+        """Check if the ground-level layers are kept between frames in the given render scale"""
+        return settings.BACKGROUND_CACHE and self.backend == "surface" and scale == 1
+
+    def draw_world(self, blits, scale=1.0, background=(), offset=None):
+        """Draw the world's images in order in the given render scale, over the kept ground-level sprites"""
+        if self.backend == "surface":
+            # Blit them onto the display, over the background scrolled since the last frame
+            if scale == 1:
+                if background:
+                    self.background.draw(self.surface, background, offset)
+                self.surface.blits(blits, doreturn=False)
+                return
+
+            # Or blit their scaled images in the scaled positions, then scale the lower resolution world up
+            self._prepare_buffer(scale)
+            self.buffer.blits([(self._scaled_image(image, scale), (round(rect.x * scale), round(rect.y * scale)))
+                               for image, rect in blits], doreturn=False)
+            pygame.transform.scale(self.buffer, self.size, self.surface)
+            return
+
+        # Draw the world into the smaller target texture, if it's rendered in a lower scale
+        if scale != 1:
+            self.renderer.target = self._world_target(scale)
+            self.renderer.draw_color = "gray"
+            self.renderer.clear()
+
+        # Draw the textures, the renderer scales them to the target's scale
+        for image, rect in blits:
+            self._texture(image).draw(dstrect=(round(rect.x * scale), round(rect.y * scale),
+                                               round(rect.width * scale), round(rect.height * scale)))
+
+        # Stretch the lower resolution world over the window
+        if scale != 1:
+            self.renderer.target = None
+            self.world_texture.draw(dstrect=(0, 0, *self.size))
+
+    def canvas(self):
+        """Get the surface to draw shapes and texts of the interface on, in the current frame"""
+        if self.backend == "surface":
+            return self.surface
+
+        # Clear the overlay once per its upload
+        if not self.overlay_dirty:
+            self.overlay.fill((0, 0, 0, 0))
+            self.overlay_dirty = True
+
+        return self.overlay
+
+    def tint(self, color):
+        """Multiply everything drawn so far by the given color"""
+        if self.backend == "surface":
+            # Multiply the screen by the color at once, without filling and blitting a whole surface
+            self.surface.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+            return
+
+        self._flush_overlay()
+
+        # Modulate the white texture by the color and multiply the whole window by it
+        self.tint_texture.color = color
+        self.tint_texture.draw(dstrect=(0, 0, *self.size))
+
+    def present(self):
+        """Show the drawn frame"""
+        if self.backend == "surface":
+            pygame.display.update()
+        else:
+            self._flush_overlay()
+            self.renderer.present()
+
+    def screenshot(self):
+        """Get a copy of the drawn frame as a surface"""
+        if self.backend == "surface":
+            return self.surface.copy()
+
+        self._flush_overlay()
+        return self.renderer.to_surface()
+
+    def _open_renderer(self):
+        """Create the window and its renderer, the software one if there isn't an accelerated one"""
+        # Images are converted to the format of the display mode, a hidden smallest one is enough
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+
+        # Create the window
+        self.window = Window(self.caption, self.size)
+
+        # Create the renderer, falling back to SDL's software renderer on machines without a GPU
+        try:
+            self.renderer = Renderer(self.window, accelerated=1 if settings.RENDERER_ACCELERATED else 0,
+                                     target_texture=True)
+        except SDLError:
+            self.renderer = Renderer(self.window, accelerated=0, target_texture=True)
+
+        # Prepare the white texture that tints by its color
+        white = pygame.Surface((1, 1))
+        white.fill("white")
+        self.tint_texture = Texture.from_surface(self.renderer, white)
+        self.tint_texture.blend_mode = BLENDMODE_MOD
+
+        # Prepare the overlay and its texture, streamed to every frame it's drawn on
+        self.overlay = memory.track(pygame.Surface(self.size, pygame.SRCALPHA), "display")
+        self.overlay_texture = Texture(self.renderer, self.size, streaming=True)
+        self.overlay_texture.blend_mode = BLENDMODE_BLEND
+        self.overlay_dirty = False
+
+    def _texture(self, image):
+        """Get the image's texture, uploading each image only once"""
+        # Upload it if it isn't yet, images that stop being used are forgotten together with it
+        if image not in self.textures:
+            self.textures[image] = Texture.from_surface(self.renderer, image)
+            # Count the uploads
+            profiler.count("texture_uploads")
+
+        return self.textures[image]
+
+    def _world_target(self, scale):
+        """Get the target texture for drawing the world in the given scale"""
+        # Create it if the scale changed
+        size = (round(self.size[0] * scale), round(self.size[1] * scale))
+        if not self.world_texture or self.world_texture.get_rect().size != size:
+            self.world_texture = Texture(self.renderer, size, target=True)
+
+        return self.world_texture
+
+    def _flush_overlay(self):
+        """Upload and draw the overlay, if it was drawn on"""
+        if not self.overlay_dirty:
+            return
+
+        self.overlay_texture.update(self.overlay)
+        self.overlay_texture.draw()
+        self.overlay_dirty = False
+
+    def _prepare_buffer(self, scale):
+        """Prepare an empty buffer for drawing in the given scale"""
+        # Create it if the scale changed
+        size = (round(self.size[0] * scale), round(self.size[1] * scale))
+        if not self.buffer or self.buffer.get_size() != size:
+            self.buffer = memory.track(pygame.Surface(size).convert(), "display")
+            self.scaled_images.clear()
+
+        # Clear it with the background color
+        self.buffer.fill("gray")
+
+    def _scaled_image(self, image, scale):
+        """Get the image scaled to the given scale, scaling each image only once"""
+        # Scale it if it isn't yet, images that stop being used are forgotten together with it
+        if image not in self.scaled_images:
+            size = (max(1, round(image.get_width() * scale)), max(1, round(image.get_height() * scale)))
+            self.scaled_images[image] = memory.track(pygame.transform.scale(image, size), "display")
+
+        return self.scaled_images[image]
+
+
+# Create the game's display
+display = Display()
@@ -0,0 +1,445 @@
+import os
+import sys
+import time
+import argparse
+from os.path import join as path_join
+
+import numpy as np
+from pytmx import TiledMap
+
+from src.settings import settings
+
+
+# Player's maximum health (he doesn't eat above it), starting health, money and seeds, like the Player
+MAX_HEALTH = 3
+START_HEALTH = 3
+START_MONEY = 10
+START_SEEDS = {"corn": 5, "tomato": 4}
+# Tomatoes the farming strategies keep for food, like the farmer in src.farms
+TOMATO_RESERVE = 3
+
+# Parameters of the model, by the setting (or setting's entry) they come from
+PARAMETERS = ("GROW_SPEED.corn", "GROW_SPEED.tomato", "PURCHASE_PRICES.corn", "PURCHASE_PRICES.tomato",
+              "SELL_PRICES.corn", "SELL_PRICES.tomato", "SELL_PRICES.wood", "apple_chance", "health", "money")
+
+# Items the player obtains and results of every played combination
+ITEMS = ("corn", "tomato", "apple", "wood")
+RESULTS = ("days_survived", "survived", "money", "profit") + tuple(f"harvests_{item}" for item in ITEMS)
+
+# Strategies the model plays by their name: whether they farm and whether they pick apples
+STRATEGIES = {
+    "idle": (False, False),
+    "forager": (False, True),
+    "farmer": (True, False),
+    "mixed": (True, True)
+}
+
+
+def default_parameters():
+    """Get the current values of the model's parameters from the settings"""
+    chances, rolls = settings.APPLE_ODDS
+    parameters = {"apple_chance": chances / rolls, "health": START_HEALTH, "money": START_MONEY}
+
+    # Read the settings' entries
+    for name in PARAMETERS:
+        if "." in name:
+            setting, key = name.split(".")
+            parameters[name] = getattr(settings, setting)[key]
+
+    return parameters
+
+
+class Layout:
+    """Parts of the map and graphics the economy depends on, read without loading any images"""
+    def __init__(self):
+        """Read the layout"""
+        # Load the map's data only
+        map_data = TiledMap(path_join(settings.BASE_PATH, "../data/map.tmx"))
+
+        # Amount of farmable tiles
+        self.tiles = sum(1 for _ in map_data.get_layer_by_name("Farmable").tiles())
+        # Amounts of apple positions trees have and amount of trees with each of them
+        self.apple_positions, self.trees = np.unique([len(settings.APPLE_POS[tree.name])
+                                                      for tree in map_data.get_layer_by_name("Trees")],
+                                                     return_counts=True)
+
+        # Maximum growth stage of every plant, one less than the amount of its frames
+        self.max_stages = {plant: len(os.listdir(path_join(settings.BASE_PATH, f"../graphics/fruit/{plant}"))) - 1
+                           for plant in START_SEEDS}
+
+
+class EconomyModel:
+    """Vectorized model of the farming strategies' economy, playing many combinations of parameters at once"""
+    def __init__(self, layout=None):
+        """Create the model of the given layout"""
+        self.layout = layout or Layout()
+
+    def evaluate(self, parameters, days, strategy="mixed", chunk=1 << 14):
+        """Play the strategy for the given amount of days with every combination in the parameter arrays"""
+        # Fill in the missing parameters and broadcast all of them to the same shape
+        values = default_parameters()
+        values.update(parameters)
+        arrays = np.broadcast_arrays(*(np.asarray(values[name], float) for name in PARAMETERS))
+        shape = arrays[0].shape
+        arrays = [array.ravel() for array in arrays]
+
+        # Play the combinations in chunks, so the harvest schedules stay small
+        size = arrays[0].size
+        results = {}
+        for start in range(0, size, chunk):
+            part = self._play({name: array[start:start + chunk] for name, array in zip(PARAMETERS, arrays)},
+                              days, strategy)
+            for name, result in part.items():
+                results.setdefault(name, np.empty(size, result.dtype))[start:start + chunk] = result
+
+        return {name: result.reshape(shape) for name, result in results.items()}
+
+    def grow_days(self, speed, plant, limit):
+        """Get the amount of watered days (up to the limit) the plants with given speeds need to be harvestable"""
+        max_stage = self.layout.max_stages[plant]
+        stages = np.zeros_like(speed)
+        # Plants that don't get harvestable in time stay at the limit
+        days = np.full(speed.shape, limit)
+
+        # Add the speed every day, the same way the soil does
+        growing = speed > 0
+        day = 0
+        while growing.any() and day < limit:
+            day += 1
+            stages[growing] = np.minimum(stages + speed, max_stage)[growing]
+            grown = growing & (stages >= max_stage)
+            days[grown] = day
+            growing &= ~grown
+
+        return days
+
+    def _play(self, parameters, days, strategy):
+        """Play a chunk of combinations day by day, in the order the strategies in src.farms act"""
+        farm, forage = STRATEGIES[strategy]
+        size = parameters["health"].size
+
+        # Results of every combination, filled in once it dies or the days run out
+        results = {name: np.zeros(size) for name in RESULTS}
+
+        # Days plants need and the length of a ring of the next days' harvests long enough for the slowest plant
+        grow_days = {plant: self.grow_days(parameters[f"GROW_SPEED.{plant}"], plant, days) for plant in START_SEEDS}
+        ring = max(int(plant_days.max()) for plant_days in grow_days.values()) + 1
+        # Plants needing the same days in all the combinations are scheduled faster
+        uniform = {plant: plant_days.min() == plant_days.max() for plant, plant_days in grow_days.items()}
+
+        # State of the combinations still playing, dead ones are dropped from all the arrays
+        state = {
+            # Index of the combination
+            "index": np.arange(size),
+            # Player
+            "health": parameters["health"].copy(),
+            "money": parameters["money"].copy(),
+            "start_money": parameters["money"].copy(),
+            "days_survived": np.zeros(size),
+            **{f"seeds_{plant}": np.full(size, float(amount)) for plant, amount in START_SEEDS.items()},
+            **{item: np.zeros(size) for item in ITEMS},
+            **{f"harvests_{item}": np.zeros(size) for item in ITEMS},
+            # Plants becoming harvestable at the start of the next days, occupied tiles and days the plants need
+            **{f"due_{plant}": np.zeros((size, ring)) for plant in START_SEEDS},
+            "occupied": np.zeros(size),
+            **{f"grow_days_{plant}": grow_days[plant] for plant in START_SEEDS},
+            # Remaining health of each group of trees with the same amount of apple positions (they all lose the
+            # same health) and chance of an apple at each position
+            **{f"tree_health_{group}": np.full(size, float(settings.TREE_HEALTH))
+               for group in range(self.layout.trees.size)},
+            "apple_chance": parameters["apple_chance"],
+            # Prices
+            **{name: parameters[name] for name in PARAMETERS if "PRICES" in name}
+        }
+
+        for day in range(days):
+            # Hit the standing trees until their apples are picked, every hit picks one and damages the tree
+            if forage:
+                for group, (positions, trees) in enumerate(zip(self.layout.apple_positions, self.layout.trees)):
+                    tree_health = state[f"tree_health_{group}"]
+                    picked = np.minimum(state["apple_chance"] * positions, tree_health)
+                    broken = (tree_health > 0) & (tree_health - picked <= 1e-9)
+                    state[f"tree_health_{group}"] = (tree_health - picked) * ~broken
+                    self._obtain(state, "apple", picked * trees)
+                    self._obtain(state, "wood", broken * trees)
+
+            # Harvest the grown plants
+            if farm:
+                for plant in START_SEEDS:
+                    due = state[f"due_{plant}"]
+                    harvested = due[:, day % ring].copy()
+                    due[:, day % ring] = 0
+                    self._obtain(state, plant, harvested)
+                    state["occupied"] -= harvested
+
+            # Eat two apples while there are some, then a tomato, until the health is full
+            meals = np.maximum(MAX_HEALTH - state["health"], 0)
+            apple_meals = np.minimum(meals, np.floor(state["apple"] * 0.5))
+            tomato_meals = np.minimum(meals - apple_meals, state["tomato"])
+            state["apple"] -= 2 * apple_meals
+            state["tomato"] -= tomato_meals
+            state["health"] += apple_meals + tomato_meals
+
+            if farm:
+                # Sell the corn and the tomatoes above the reserve
+                state["money"] += state["corn"] * state["SELL_PRICES.corn"]
+                state["corn"][:] = 0
+                sold = np.maximum(state["tomato"] - TOMATO_RESERVE, 0)
+                state["money"] += sold * state["SELL_PRICES.tomato"]
+                state["tomato"] -= sold
+
+                # Buy seeds for the free tiles, then plant them
+                free = self.layout.tiles - state["occupied"]
+                self._buy_seeds(state, free - state["seeds_corn"] - state["seeds_tomato"])
+                planted = self._plant(state, free)
+                for plant, amount in planted.items():
+                    self._schedule(state, plant, amount, day, ring, uniform[plant])
+                    state["occupied"] += amount
+
+            # Sell the wood
+            if forage:
+                state["money"] += state["wood"] * state["SELL_PRICES.wood"]
+                state["wood"][:] = 0
+
+            # Sleep through the night, losing health
+            state["health"] -= 1
+            state["days_survived"] += 1
+
+            # Save the results of the dead ones and stop playing them
+            dead = state["health"] <= 0
+            if dead.any():
+                self._save_results(results, state, dead, False)
+                state = {name: array[~dead] for name, array in state.items()}
+                if not state["index"].size:
+                    break
+
+        # Save the results of the survivors
+        self._save_results(results, state, np.ones(state["index"].size, bool), True)
+
+        results["days_survived"] = results["days_survived"].astype(int)
+        results["survived"] = results["survived"].astype(bool)
+        return results
+
+    @staticmethod
+    def _schedule(state, plant, amount, day, ring, uniform):
+        """Schedule the harvest of the planted amount of the plant"""
+        due = state[f"due_{plant}"]
+        grow_days = state[f"grow_days_{plant}"]
+
+        # Add all of them to the same day
+        if uniform:
+            due[:, (day + grow_days[0]) % ring] += amount
+            return
+
+        # Or every combination to its own day
+        target = grow_days + day % ring
+        target -= ring * (target >= ring)
+        np.add.at(due.reshape(-1), np.arange(grow_days.size) * ring + target, amount)
+
+    @staticmethod
+    def _save_results(results, state, finished, survived):
+        """Save the results of the finished combinations"""
+        index = state["index"][finished]
+        results["survived"][index] = survived
+        results["profit"][index] = state["money"][finished] - state["start_money"][finished]
+        for name in RESULTS:
+            if name in state:
+                results[name][index] = state[name][finished]
+
+    @staticmethod
+    def _obtain(state, item, amount):
+        """Obtain the amount of the item"""
+        state[item] += amount
+        state[f"harvests_{item}"] += amount
+
+    @staticmethod
+    def _buy_seeds(state, needed):
+        """Buy the needed seeds, taking turns between corn and tomato while there's money, like the farmer"""
+        corn, tomato = state["PURCHASE_PRICES.corn"], state["PURCHASE_PRICES.tomato"]
+        money = state["money"]
+        needed = np.maximum(needed, 0)
+
+        # Free seeds divide by zero, they are limited only by the amount needed
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Buy pairs of corn and tomato while both are needed and affordable
+            pair = corn + tomato
+            pairs = np.fmin(np.floor(needed * 0.5), np.floor(money / pair))
+            state["seeds_corn"] += pairs
+            state["seeds_tomato"] += pairs
+            money -= pairs * pair
+            needed -= 2 * pairs
+
+            # Then corn while both still are affordable, after it only one of them can be left affordable
+            step = (needed > 0) & (money >= np.maximum(corn, tomato))
+            state["seeds_corn"] += step
+            money -= step * corn
+            needed -= step
+
+            # Buy as many of the cheaper seed as needed and affordable
+            corn_cheaper = corn <= tomato
+            price = np.minimum(corn, tomato)
+            bought = np.fmin(needed, np.floor(money / price))
+            state["seeds_corn"] += bought * corn_cheaper
+            state["seeds_tomato"] += bought - bought * corn_cheaper
+            money -= bought * price
+
+    @staticmethod
+    def _plant(state, free):
+        """Plant the seeds on the free tiles, taking turns by the amount of plants like the farmer"""
+        corn, tomato = state["seeds_corn"], state["seeds_tomato"]
+        # Plant on every free tile there's a seed for
+        planting = np.minimum(free, corn + tomato)
+
+        # The turns start with corn when there's an even amount of plants, otherwise with tomato
+        occupied = state["occupied"]
+        tomato_first = occupied - 2 * np.floor(occupied * 0.5)
+        first = corn + tomato_first * (tomato - corn)
+        second = corn + tomato - first
+
+        # Take turns until one of the seeds runs out, then plant only the other one
+        turns = np.clip(np.minimum(2 * first - 1, 2 * second), 0, planting)
+        second_used = np.floor(turns * 0.5)
+        first_used = turns - second_used
+        rest = planting - turns
+        first_rest = np.minimum(rest, first - first_used)
+        first_used += first_rest
+        second_used += np.minimum(rest - first_rest, second - second_used)
+
+        # Use the seeds
+        corn_used = first_used + tomato_first * (second_used - first_used)
+        planted = {"corn": corn_used, "tomato": first_used + second_used - corn_used}
+        for plant, amount in planted.items():
+            state[f"seeds_{plant}"] -= amount
+
+        return planted
+
+
+def validate(model, parameters, days, strategy, seeds=4, workers=None):
+    """Play the combinations in the headless game with src.farms, return the model's and game's average days
+    survived and final money of every combination"""
+    from fractions import Fraction
+    from src.farms import run_farms, create_jobs
+
+    # Create jobs of every combination, overriding the settings and player's values the same way
+    jobs = []
+    played = []
+    for combination in parameters:
+        overrides = {}
+        values = {}
+        for name, value in combination.items():
+            # Apple chance is set as odds
+            if name == "apple_chance":
+                odds = Fraction(value).limit_denominator(1000)
+                overrides["APPLE_ODDS"] = (odds.numerator, odds.denominator)
+                values[name] = float(odds)
+            # Speeds are fractions, prices, health and money are whole numbers in the game
+            else:
+                values[name] = overrides[name] = float(value) if name.startswith("GROW_SPEED") else round(value)
+        jobs += [dict(job, overrides=overrides) for job in create_jobs([strategy], range(seeds), days, 60, {})]
+        played.append(values)
+
+    # Play them
+    results = run_farms(jobs, workers)
+
+    # Compare the averages of every combination, the model plays the values the game got
+    comparison = []
+    for index, values in enumerate(played):
+        games = results[index * seeds:(index + 1) * seeds]
+        predicted = model.evaluate({name: [value] for name, value in values.items()}, days, strategy)
+        comparison.append({
+            "parameters": values,
+            "model_days": float(predicted["days_survived"][0]),
+            "game_days": float(np.mean([game["days_survived"] for game in games])),
+            "model_money": float(predicted["money"][0]),
+            "game_money": float(np.mean([game["money"][-1] if game["money"] else 0 for game in games]))
+        })
+
+    return comparison
+
+
+def _parse_sweep(text):
+    """Parse a sweep like SELL_PRICES.corn=1:20:20 (start, stop and amount of values) or one like
+    GROW_SPEED.corn=0.5,0.8,1 into its parameter and values"""
+    name, _, values = text.partition("=")
+    if name not in PARAMETERS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name}, expected one of {', '.join(PARAMETERS)}")
+
+    try:
+        # Evenly spaced values
+        if ":" in values:
+            start, stop, count = values.split(":")
+            return name, np.linspace(float(start), float(stop), int(count))
+        # Listed values
+        return name, np.array([float(value) for value in values.split(",")])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid values in {text}")
+
+
+def main(args=None):
+    """Sweep the economy's parameters from the command line"""
+    # Parse the arguments
+    parser = argparse.ArgumentParser(description="Sweep PyValley's economy with a vectorized model of the farming")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="mixed", help="strategy the player follows")
+    parser.add_argument("--days", type=int, default=100, help="maximum amount of days played")
+    parser.add_argument("--sweep", type=_parse_sweep, action="append", default=[],
+                        metavar="PARAMETER=START:STOP:COUNT",
+                        help=f"values of a parameter to sweep, or a comma separated list of them "
+                             f"({', '.join(PARAMETERS)})")
+    parser.add_argument("--output", metavar="PATH", help="save the swept values and surfaces into a .npz file")
+    parser.add_argument("--validate", type=int, default=0, metavar="N",
+                        help="play N of the combinations in the headless game and compare them with the model")
+    parser.add_argument("--seeds", type=int, default=4, help="seeds every validated combination is played with")
+    options = parser.parse_args(args)
+
+    # Create the grid of all the combinations
+    sweeps = dict(options.sweep)
+    grid = dict(zip(sweeps, np.meshgrid(*sweeps.values(), indexing="ij")))
+
+    # Evaluate it and time it
+    model = EconomyModel()
+    start = time.perf_counter()
+    surfaces = model.evaluate(grid, options.days, options.strategy)
+    elapsed = time.perf_counter() - start
+
+    # Print the summary
+    size = surfaces["money"].size
+    survived = surfaces["survived"]
+    print(f"{size} combinations in {elapsed:.2f}s ({size / elapsed:.0f}/s)")
+    print(f"survived {options.days} days: {survived.mean():.1%}, days survived: "
+          f"{surfaces['days_survived'].min()}-{surfaces['days_survived'].max()}, profit: "
+          f"{surfaces['profit'].min():.0f} to {surfaces['profit'].max():.0f}")
+
+    # Print the profit surface of a sweep of two parameters, at most 10 values of each
+    if len(sweeps) == 2:
+        (first, first_values), (second, second_values) = sweeps.items()
+        rows = np.unique(np.linspace(0, first_values.size - 1, 10).astype(int))
+        columns = np.unique(np.linspace(0, second_values.size - 1, 10).astype(int))
+        print(f"profit ('x' didn't survive), {first} down, {second} across")
+        print(" " * 8 + "".join(f"{second_values[column]:>9.3g}" for column in columns))
+        for row in rows:
+            print(f"{first_values[row]:>8.3g}" + "".join(
+                f"{surfaces['profit'][row, column]:>9.0f}" if survived[row, column] else f"{'x':>9}"
+                for column in columns))
+
+    # Save the surfaces if wanted
+    if options.output:
+        np.savez_compressed(options.output, **{f"sweep_{name}": values for name, values in sweeps.items()},
+                            **surfaces)
+
+    # Compare evenly chosen combinations with the game if wanted
+    if options.validate:
+        indexes = np.unique(np.linspace(0, size - 1, options.validate).astype(int))
+        combinations = [{name: float(values.ravel()[index]) for name, values in grid.items()} for index in indexes]
+        comparison = validate(model, combinations, options.days, options.strategy, options.seeds)
+
+        for entry in comparison:
+            values = " ".join(f"{name}={value:.3g}" for name, value in entry["parameters"].items())
+            print(f"{values}: days {entry['model_days']:.1f} (game {entry['game_days']:.1f}), "
+                  f"money {entry['model_money']:.0f} (game {entry['game_money']:.0f})")
+
+    return 0
+
+
+# If it's the main file, run the sweep
+if __name__ == "__main__":
+    sys.exit(main())
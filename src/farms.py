@@ -0,0 +1,431 @@
+import os
+import ast
+import sys
+import csv
+import copy
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from src.settings import settings
+
+
+# Player's attributes that can be overridden next to the settings
+PLAYER_OVERRIDES = ("health", "money")
+
+
+class Strategy:
+    """Scripted way of playing a farm, acting on the level once at the start of every day"""
+    # Name of the strategy
+    name = ""
+
+    def __init__(self, level):
+        """Create the strategy playing the given level"""
+        self.level = level
+        self.player = level.player
+        self.soil = level.soil
+
+        # Items harvested, picked and chopped during the game
+        self.harvests = Counter()
+
+        # Stay in the bed between the actions, the starting position is on the farmable tiles and would trample
+        # the plants there
+        bed = next(sprite for sprite in level.interactive_sprites if sprite.name == "Bed")
+        self.player.place(bed.rect.center)
+
+    def play_day(self):
+        """Act on the level before the day passes"""
+
+    def harvest(self):
+        """Harvest every fully grown plant"""
+        for plant in list(self.soil.harvestable_plants.values()):
+            self.level.harvest(plant)
+            self.harvests[plant.plant_type] += 1
+
+    def pick_apples(self):
+        """Hit every standing tree until it has no apples left, chopping the ones that break"""
+        # Remember the items, to count the new ones
+        items = dict(self.player.items)
+
+        for tree in self.level.trees:
+            while tree.alive and any(tree.apples):
+                tree.handle_damage()
+
+        # Count what was obtained
+        for item in ("apple", "wood"):
+            self.harvests[item] += self.player.items[item] - items[item]
+
+    def eat(self):
+        """Eat until the health is full or there is nothing left to eat"""
+        while self.player.eat():
+            pass
+
+    def sell(self, item, keep=0):
+        """Sell the item, keeping the given amount of it"""
+        while self.player.items[item] > keep and self.player.sell(item):
+            pass
+
+    def hoe(self):
+        """Hoe every farmable tile that isn't hoed yet"""
+        # Import the soil flags only after pygame is ready, like the level
+        from src.soil import FARMABLE, HIT
+        grid = self.soil.grid
+
+        # Hit all of them at once, a single hit creates the soil tiles of all of them
+        farmable = (grid & FARMABLE) != 0
+        if not (grid[farmable] & HIT).all():
+            grid[farmable] |= HIT
+            self.soil.handle_hit(self.soil.farmable_rects[0].center)
+
+    def free_tiles(self):
+        """Get the centers of hoed tiles without any plant"""
+        from src.soil import PLANTED
+        return [((column + 0.5) * settings.TILE_SIZE, (row + 0.5) * settings.TILE_SIZE)
+                for row, column in self.soil.soil_tiles if not self.soil.grid[row, column] & PLANTED]
+
+    def buy_seeds(self, amount):
+        """Buy up to the given amount of seeds, taking turns between the seed types while there is money"""
+        seeds = itertools.cycle(settings.PURCHASE_PRICES)
+        while amount > sum(self.player.current_seeds.values()):
+            # Stop once no seed is affordable
+            if self.player.money < min(settings.PURCHASE_PRICES.values()):
+                break
+            self.player.buy(next(seeds))
+
+    def plant(self):
+        """Plant the seeds on the free tiles, taking turns between the seed types"""
+        for center in self.free_tiles():
+            # Get a seed that's left
+            seeds = [seed for seed, amount in self.player.current_seeds.items() if amount > 0]
+            if not seeds:
+                break
+
+            # Plant it
+            seed = seeds[len(self.soil.plants) % len(seeds)]
+            self.soil.plant(seed, center)
+            self.player.current_seeds[seed] -= 1
+
+    def water(self):
+        """Water every hoed tile"""
+        self.soil.water_all()
+
+
+class Idle(Strategy):
+    """Player that doesn't do anything"""
+    name = "idle"
+
+
+class Forager(Strategy):
+    """Player living off the apples and selling the wood of broken trees"""
+    name = "forager"
+
+    def play_day(self):
+        """Pick the apples, eat and sell the wood"""
+        self.pick_apples()
+        self.eat()
+        self.sell("wood")
+
+
+class Farmer(Strategy):
+    """Player growing crops on every farmable tile, keeping some tomatoes to eat and selling the rest"""
+    name = "farmer"
+    # Tomatoes kept for food
+    reserve = 3
+
+    def play_day(self):
+        """Harvest, eat, trade and tend the soil"""
+        self.harvest()
+        self.eat()
+
+        # Sell the crops and buy seeds for the free tiles
+        self.sell("corn")
+        self.sell("tomato", self.reserve)
+        self.hoe()
+        self.buy_seeds(len(self.free_tiles()))
+
+        # Plant and water them
+        self.plant()
+        self.water()
+
+
+class Mixed(Farmer):
+    """Farmer that also picks the apples"""
+    name = "mixed"
+
+    def play_day(self):
+        """Pick the apples, then farm"""
+        self.pick_apples()
+        super().play_day()
+        self.sell("wood")
+
+
+# All the strategies by their names
+STRATEGIES = {strategy.name: strategy for strategy in (Idle, Forager, Farmer, Mixed)}
+
+
+def _override(overrides):
+    """Apply the settings overrides, return the original values of the changed settings"""
+    originals = {}
+    for path, value in overrides.items():
+        # Player's attributes are set on the level
+        if path in PLAYER_OVERRIDES:
+            continue
+
+        # Remember the whole setting before the first change of it
+        name, *keys = path.split(".")
+        if name not in originals:
+            originals[name] = copy.deepcopy(getattr(settings, name))
+
+        # Set the setting, or its entry (like GROW_SPEED.corn)
+        if keys:
+            getattr(settings, name)[keys[0]] = value
+        else:
+            setattr(settings, name, value)
+
+    return originals
+
+
+def run_farm(job):
+    """Simulate a single farm and return its results"""
+    # Import the simulation here, so only the worker processes prepare pygame
+    from src.headless import Simulation
+
+    # Apply the overrides of the job, the worker runs other jobs afterwards
+    originals = _override(job["overrides"])
+    try:
+        simulation = Simulation(job["seed"])
+        level = simulation.level
+        for attribute in PLAYER_OVERRIDES:
+            if attribute in job["overrides"]:
+                setattr(level.player, attribute, job["overrides"][attribute])
+
+        # Play the days, remembering the money at the end of each of them
+        strategy = STRATEGIES[job["strategy"]](level)
+        money = []
+        for _ in range(job["days"]):
+            if level.game_over:
+                break
+            strategy.play_day()
+            simulation.run_days(1, job["frames_per_day"], skip_night=True)
+            money.append(level.player.money)
+    # Put the settings back
+    finally:
+        for name, value in originals.items():
+            setattr(settings, name, value)
+
+    return dict(job, status="ok", days_survived=level.day, survived=not level.game_over, money=money,
+                harvests=dict(strategy.harvests), digest=simulation.digest())
+
+
+def _failed(job, status, error):
+    """Get the results of a farm that didn't finish"""
+    return dict(job, status=status, error=error, days_survived=0, survived=False, money=[], harvests={})
+
+
+def run_farms(jobs, workers=None):
+    """Simulate the farms in a pool of worker processes, restarting it when a worker crashes"""
+    workers = workers or os.cpu_count()
+    results = [None] * len(jobs)
+
+    # Jobs waiting to run, ones that were running while a worker crashed (run alone to find the cause) and
+    # attempts of the jobs that crashed on their own
+    waiting = deque(range(len(jobs)))
+    suspects = deque()
+    attempts = Counter()
+
+    # Spawn fresh workers instead of forking this process
+    context = multiprocessing.get_context("spawn")
+    while waiting or suspects:
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            running = {}
+            crashed = False
+
+            while (waiting or suspects or running) and not crashed:
+                # Run suspects one at a time, so a crash points at a single job
+                if suspects:
+                    if not running:
+                        index = suspects.popleft()
+                        running[executor.submit(run_farm, jobs[index])] = index
+                # Otherwise keep every worker busy, without queueing much more, so a crash loses only a few jobs
+                else:
+                    while waiting and len(running) < workers * 2:
+                        index = waiting.popleft()
+                        running[executor.submit(run_farm, jobs[index])] = index
+
+                # Collect the finished farms
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running[future]
+                    try:
+                        results[index] = future.result()
+                    # A worker died, every unfinished job in the pool is lost
+                    except BrokenProcessPool:
+                        crashed = True
+                        continue
+                    # The simulation itself failed
+                    except Exception as error:
+                        results[index] = _failed(jobs[index], "error", repr(error))
+                    del running[future]
+
+        # After a crash, a single lost job is the one that crashed, retry it a few times
+        if len(running) == 1:
+            index = next(iter(running.values()))
+            attempts[index] += 1
+            if attempts[index] >= settings.FARM_ATTEMPTS:
+                results[index] = _failed(jobs[index], "crashed", "worker process crashed")
+            else:
+                suspects.append(index)
+        # Otherwise any of them could have crashed it
+        else:
+            suspects.extend(running.values())
+
+    return results
+
+
+def create_jobs(strategies, seeds, days, frames_per_day, sweeps):
+    """Create a job for every combination of the strategies, seeds and swept overrides"""
+    # Every combination of the swept values
+    paths = list(sweeps)
+    variants = [dict(zip(paths, values)) for values in itertools.product(*sweeps.values())]
+
+    return [{"strategy": strategy, "seed": seed, "days": days, "frames_per_day": frames_per_day,
+             "overrides": overrides, "variant": " ".join(f"{path}={value}" for path, value in overrides.items())}
+            for overrides in variants for strategy in strategies for seed in seeds]
+
+
+def summarize(results):
+    """Aggregate the results of every strategy and variant into rows of a table"""
+    # Group the results
+    groups = {}
+    for result in results:
+        groups.setdefault((result["strategy"], result["variant"]), []).append(result)
+
+    rows = []
+    for (strategy, variant), group in groups.items():
+        finished = [result for result in group if result["status"] == "ok"]
+        days = np.array([result["days_survived"] for result in finished] or [0])
+
+        # Money curves of different lengths, padded with the last amount after the game ended
+        length = max((len(result["money"]) for result in finished), default=0)
+        curves = np.array([result["money"] + result["money"][-1:] * (length - len(result["money"]))
+                           for result in finished if result["money"]]) if length else np.zeros((1, 0))
+        # Harvested items
+        harvests = Counter()
+        for result in finished:
+            harvests.update(result["harvests"])
+
+        rows.append({
+            "strategy": strategy,
+            "variant": variant,
+            "runs": len(group),
+            "failed": len(group) - len(finished),
+            "survived": sum(result["survived"] for result in finished) / max(len(finished), 1),
+            "days_mean": float(days.mean()),
+            "days_min": int(days.min()),
+            "days_max": int(days.max()),
+            "money_mean": float(curves[:, -1].mean()) if curves.size else 0.0,
+            "money_peak": float(curves.max()) if curves.size else 0.0,
+            "money_curve": curves.mean(axis=0).round(2).tolist(),
+            "harvests": {item: count / max(len(finished), 1) for item, count in sorted(harvests.items())}
+        })
+
+    return rows
+
+
+def _parse_sweep(text):
+    """Parse an override like GROW_SPEED.corn=0.8,1.0 into its path and swept values"""
+    path, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected PATH=VALUE[,VALUE...], got {text}")
+
+    # Check the path
+    name = path.split(".")[0]
+    if path not in PLAYER_OVERRIDES and not hasattr(settings, name):
+        raise argparse.ArgumentTypeError(f"unknown setting {name}")
+
+    # Values are Python literals separated by commas, or by semicolons if they contain commas themselves
+    try:
+        if ";" in values:
+            return path, [ast.literal_eval(value) for value in values.split(";")]
+        value = ast.literal_eval(values)
+        return path, list(value) if isinstance(value, tuple) else [value]
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError(f"invalid value in {text}")
+
+
+def main(args=None):
+    """Run the farm simulations from the command line"""
+    # Parse the arguments
+    parser = argparse.ArgumentParser(description="Simulate many independent PyValley farms in parallel")
+    parser.add_argument("strategies", nargs="*",
+                        help=f"strategies to play, all of them by default ({', '.join(STRATEGIES)})")
+    parser.add_argument("--seeds", type=int, default=10, help="amount of seeds every variant is played with")
+    parser.add_argument("--first-seed", type=int, default=0, help="first of the seeds")
+    parser.add_argument("--days", type=int, default=100, help="maximum amount of days of every farm")
+    parser.add_argument("--frames-per-day", type=int, default=60, help="updates simulated during each day")
+    parser.add_argument("--set", dest="sweeps", type=_parse_sweep, action="append", default=[],
+                        metavar="PATH=VALUE[,VALUE...]",
+                        help="override a setting, its entry (GROW_SPEED.corn) or player's health or money, "
+                             "several values sweep them")
+    parser.add_argument("--workers", type=int, default=None, help="amount of worker processes (all cores)")
+    parser.add_argument("--output", metavar="PATH",
+                        help="write the table into CSV, or the table and every farm into JSON (.json)")
+    options = parser.parse_args(args)
+
+    # Make sure the strategies exist
+    for name in options.strategies:
+        if name not in STRATEGIES:
+            parser.error(f"unknown strategy {name}")
+
+    # Create the jobs
+    seeds = range(options.first_seed, options.first_seed + options.seeds)
+    jobs = create_jobs(options.strategies or list(STRATEGIES), seeds, options.days, options.frames_per_day,
+                       dict(options.sweeps))
+
+    # Run and time them
+    start = time.perf_counter()
+    results = run_farms(jobs, options.workers)
+    elapsed = time.perf_counter() - start
+
+    # Print the table
+    rows = summarize(results)
+    print(f"{'strategy':>8} {'variant':<30} {'runs':>4} {'fail':>4} {'alive':>6} {'days':>6} {'min':>4} "
+          f"{'max':>4} {'money':>8}  harvests")
+    for row in rows:
+        harvests = " ".join(f"{item} {count:.1f}" for item, count in row["harvests"].items())
+        print(f"{row['strategy']:>8} {row['variant'] or '-':<30} {row['runs']:>4} {row['failed']:>4} "
+              f"{row['survived']:>6.0%} {row['days_mean']:>6.1f} {row['days_min']:>4} {row['days_max']:>4} "
+              f"{row['money_mean']:>8.1f}  {harvests}")
+    print(f"{len(jobs)} farms in {elapsed:.1f}s, {len(jobs) / elapsed:.1f} farms/s")
+
+    # Save them if wanted
+    if options.output:
+        # Save the table and every farm as JSON
+        if options.output.endswith(".json"):
+            with open(options.output, "w") as file:
+                json.dump({"table": rows, "farms": results}, file, indent=1)
+        # Or the table as CSV, without the money curves (an empty file if no farm was played)
+        else:
+            with open(options.output, "w", newline="") as file:
+                writer = csv.writer(file)
+                columns = [column for column in rows[0] if column not in ("money_curve", "harvests")] if rows else []
+                items = sorted({item for row in rows for item in row["harvests"]})
+                if rows:
+                    writer.writerow(columns + items)
+                for row in rows:
+                    writer.writerow([row[column] for column in columns] +
+                                    [row["harvests"].get(item, 0) for item in items])
+
+    return 0
+
+
+# If it's the main file, run the farms
+if __name__ == "__main__":
+    sys.exit(main())
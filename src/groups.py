@@ -1,7 +1,14 @@
+from math import floor
+from operator import attrgetter
+
 import pygame
 from pygame.math import Vector2 as Vector
 
 from src.settings import settings
+from src.tiles import TileStore
+from src.profiler import profiler
+from src.quality import quality
+from src.display import display
 
 
 class CameraGroup(pygame.sprite.Group):
@@ -10,28 +17,134 @@ class CameraGroup(pygame.sprite.Group):
         """Initialize the camera group of sprites"""
         super().__init__()
 
-        # Get game's display surface
-        self.surface = pygame.display.get_surface()
-
         # Camera's offset
         self.offset = Vector()
 
-    def custom_draw(self, player):
-        """Draw the sprites with an offset"""
-        # Calculate the offset based off player's position
-        self.offset.x = player.rect.centerx - settings.SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - settings.SCREEN_HEIGHT / 2
+        # Part of the world seen by the camera, and a bit bigger part that sprites outside of aren't drawn (so
+        # sprites moving between updates don't pop in at the edges)
+        self.view = pygame.Rect(0, 0, settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT)
+        self.cull_rect = self.view.inflate(settings.TILE_SIZE * 2, settings.TILE_SIZE * 2)
+
+        # Images with their rectangles on the screen and ground-level sprites of the current frame, rectangles are
+        # kept for reuse by the next frames
+        self.blits = []
+        self.background = []
+        self.screen_rects = []
+
+        # Key sorting sprites by their vertical position
+        self.depth_key = attrgetter("rect.centery")
+
+        # Static tiles drawn together with the sprites
+        self.tiles = TileStore()
+        # Depths of the ground-level layers that the display can keep between frames
+        self.background_layers = {settings.DEPTHS[layer] for layer in settings.BACKGROUND_LAYERS}
+
+        # Sprites that have per-frame work and need updates (dictionary keeps their order)
+        self.awake_sprites = {}
+
+    def add_internal(self, sprite, layer=None):
+        """Add the sprite to the group, schedule its updates if it's awake"""
+        super().add_internal(sprite, layer)
+
+        # If the sprite has per-frame work, update it
+        if getattr(sprite, "awake", False):
+            self.awake_sprites[sprite] = None
+
+    def remove_internal(self, sprite):
+        """Remove the sprite from the group and its updates"""
+        super().remove_internal(sprite)
+
+        # Stop updating it
+        self.awake_sprites.pop(sprite, None)
+
+    def wake(self, sprite):
+        """Start updating the given sprite every frame"""
+        # Only sprites of this group can be updated
+        if sprite in self.spritedict:
+            self.awake_sprites[sprite] = None
+
+    def sleep(self, sprite):
+        """Stop updating the given sprite, until it's woken up"""
+        self.awake_sprites.pop(sprite, None)
+
+    def update(self, delta_time):
+        """Update only the awake sprites"""
+        # Go through a copy, sprites can kill themselves or fall asleep while updating
+        for sprite in tuple(self.awake_sprites):
+            sprite.update(delta_time)
+
+    def custom_draw(self, player, alpha=1.0):
+        """Draw the sprites with an offset, interpolating moving ones by the given fraction of a time step"""
+        # Calculate the offset based off player's position interpolated between the last two updates
+        self.offset.x = player.previous_pos.x + (player.pos.x - player.previous_pos.x) * alpha - settings.SCREEN_WIDTH / 2
+        self.offset.y = player.previous_pos.y + (player.pos.y - player.previous_pos.y) * alpha - settings.SCREEN_HEIGHT / 2
+
+        # Move the view and the culling rectangle with the camera
+        self.view.topleft = self.offset
+        self.cull_rect.x = self.view.x - settings.TILE_SIZE
+        self.cull_rect.y = self.view.y - settings.TILE_SIZE
+
+        # Sort the tiles of the chunks in view and the visible sprites into their depth layers
+        layers = self.tiles.layers_in(self.view)
+        for sprite in self.spritedict:
+            if self.cull_rect.colliderect(sprite.rect):
+                layers[sprite.pos_z].append(sprite)
+                # Count the drawn sprites
+                profiler.count("sprites_drawn")
+
+        # Count the blits of all the tiles and sprites
+        profiler.count("blits", sum(len(elements) for elements in layers.values()))
+
+        # Get the current render scale, a lower one is drawn smaller and scaled up to the screen
+        scale = quality.render_scale
+        # Check if the display keeps the ground-level layers from the last frame
+        cached = display.caches_background(scale)
+
+        # Images of the sprites in drawing order with their rectangles on the screen, and the static ground-level
+        # sprites in drawing order if the display keeps them
+        blits = self.blits
+        blits.clear()
+        background = self.background
+        background.clear()
+
+        # Offset and the part of a time step moving sprites are drawn behind their position
+        offset_x, offset_y = self.offset
+        behind = 1 - alpha
 
         # Check every depth layer, to draw sprites in order depending on the depth
         for layer in settings.DEPTHS.values():
-            # Go through each sprite sorted by the vertical position
-            for sprite in sorted(self.sprites(), key=lambda element: element.rect.centery):
-                # If sprite is on the current layer, draw it
-                if sprite.pos_z == layer:
-                    # Get the rectangle of sprite
-                    offset_rect = sprite.rect.copy()
-                    # Apply offset
-                    offset_rect.center -= self.offset
-
-                    # Blit it with the calculated offset
-                    self.surface.blit(sprite.image, offset_rect)
+            # Sort the sprites on the current layer by the vertical position
+            elements = layers[layer]
+            elements.sort(key=self.depth_key)
+
+            # Leave the ground-level ones to the display's background
+            if cached and layer in self.background_layers:
+                background += elements
+                continue
+
+            for sprite in elements:
+                # Reuse a rectangle for the sprite
+                if len(blits) == len(self.screen_rects):
+                    self.screen_rects.append(pygame.Rect(0, 0, 0, 0))
+                offset_rect = self.screen_rects[len(blits)]
+
+                # Copy the sprite's rectangle and apply the offset, rounded down (rectangles would truncate it towards
+                # zero, moving sprites past the screen's top left edges by a pixel against the rest and against the kept
+                # background)
+                offset_rect.update(sprite.rect)
+                center_x = offset_rect.centerx - offset_x
+                center_y = offset_rect.centery - offset_y
+
+                # If sprite moves, draw it between its previous and current position
+                if hasattr(sprite, "previous_pos"):
+                    center_x = floor(center_x) - (sprite.pos.x - sprite.previous_pos.x) * behind
+                    center_y = floor(center_y) - (sprite.pos.y - sprite.previous_pos.y) * behind
+
+                offset_rect.centerx = floor(center_x)
+                offset_rect.centery = floor(center_y)
+
+                # Draw it with the calculated offset
+                blits.append((sprite.image, offset_rect))
+
+        # Draw them all in the current render scale
+        display.draw_world(blits, scale, background, self.offset)
@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+
+import pygame
+
+from src.settings import settings
+from src.rng import rng
+from src.controls import controls
+from src.save import saves
+from src.memory import memory
+
+
+class Simulation:
+    """Level simulation that runs without a window, rendering or sound, as fast as possible"""
+    def __init__(self, seed=None, replay=None, load=None):
+        """Prepare pygame with dummy drivers and create a headless level, optionally seeded, replaying or loaded"""
+        # Use SDL dummy drivers, so no display or audio device is needed
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+        # Prepare pygame
+        pygame.init()
+        # Images still need a display mode to be converted, the smallest one is enough
+        pygame.display.set_mode((1, 1))
+
+        # If there is a replay, play it with the seed of its session
+        if replay:
+            seed = controls.load_replay(replay)
+        # Seed the game's randomness
+        rng.seed(seed)
+
+        # Import the level only after pygame is ready, its modules load images
+        from src.level import Level
+        # Create the headless level
+        self.level = Level(headless=True)
+        # Load the saved game if wanted
+        if load:
+            saves.load(self.level, load)
+
+        # Duration of a single simulation update
+        self.time_step = 1 / settings.UPDATE_RATE
+        # Amount of simulated updates
+        self.frames = 0
+
+    def step(self, count=1):
+        """Simulate the given amount of updates"""
+        for _ in range(count):
+            # Stop simulating once the game is over
+            if self.level.game_over:
+                break
+
+            # Update the level by one time step
+            self.level.update(self.time_step)
+            self.frames += 1
+
+    def run_replay(self):
+        """Simulate until the whole replayed input was played"""
+        while not controls.replay_finished() and not self.level.game_over:
+            self.step()
+
+    def digest(self):
+        """Get a hash of the level's state, identical simulations have identical digests"""
+        level = self.level
+        player = level.player
+
+        # Gather the state of the player, the world and the plants
+        state = [
+            level.day, level.rain_active,
+            tuple(player.pos), player.health, player.money, player.items, player.current_seeds,
+            level.soil.grid.tobytes(), level.soil.plant_stages.tobytes(),
+            [(plant.plant_type, int(plant.stage), plant.health, tuple(plant.rect))
+             for plant in level.soil.plant_sprites],
+            [(tree.health, [bool(apple) for apple in tree.apples]) for tree in level.tree_sprites]
+        ]
+
+        # Hash its representation
+        return hashlib.sha256(repr(state).encode()).hexdigest()
+
+    def advance_day(self, skip_night=False):
+        """Send the player to sleep and simulate until the next day starts, or skip the night entirely"""
+        # If the night is skipped, reset the day right away without playing the transition
+        if skip_night:
+            self.level.transition.reset_day()
+            return
+
+        # Put the player to sleep
+        self.level.player.sleep = True
+
+        # Run the night transition until the player wakes up
+        while self.level.player.sleep and not self.level.game_over:
+            self.step()
+
+    def run_days(self, days, frames_per_day=0, skip_night=False):
+        """Simulate the given amount of days, playing the given amount of updates during each of them"""
+        for _ in range(days):
+            # Stop once the game is over
+            if self.level.game_over:
+                break
+
+            # Play the day, then sleep through the night
+            self.step(frames_per_day)
+            self.advance_day(skip_night)
+
+
+def main(args=None):
+    """Run a headless simulation from the command line"""
+    # Parse the arguments
+    parser = argparse.ArgumentParser(description="Run PyValley's level without a display")
+    parser.add_argument("--days", type=int, default=100, help="amount of days to simulate")
+    parser.add_argument("--frames-per-day", type=int, default=0, help="updates simulated during each day")
+    parser.add_argument("--skip-night", action="store_true", help="reset days without the sleep transition")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the game's randomness")
+    parser.add_argument("--replay", metavar="PATH", help="replay the input recorded in the given log")
+    parser.add_argument("--health", type=int, default=None, help="player's starting health")
+    parser.add_argument("--load", metavar="PATH", help="start from the game saved in the given file")
+    parser.add_argument("--save", metavar="PATH", help="save the final game into the given file")
+    parser.add_argument("--memory", action="store_true", help="print the memory of the surfaces by their owners")
+    options = parser.parse_args(args)
+
+    # Create the simulation
+    simulation = Simulation(options.seed, options.replay, options.load)
+    # Override the player's health if wanted
+    if options.health is not None:
+        simulation.level.player.health = options.health
+
+    # Run and time it
+    start = time.perf_counter()
+    # Play the replay if there is one, otherwise simulate the days
+    if options.replay:
+        simulation.run_replay()
+    else:
+        simulation.run_days(options.days, options.frames_per_day, options.skip_night)
+    elapsed = time.perf_counter() - start
+
+    # Save the final game if wanted
+    if options.save:
+        saves.save(simulation.level, options.save)
+
+    # Print the summary
+    level = simulation.level
+    print(f"days: {level.day}, updates: {simulation.frames}, game over: {level.game_over}")
+    print(f"state digest: {simulation.digest()}")
+    print(f"time: {elapsed:.2f}s, {simulation.frames / elapsed:.0f} updates/s, "
+          f"{level.day / elapsed * 60:.0f} days/min")
+    # Print the surfaces' memory if wanted
+    if options.memory:
+        print(memory.report())
+
+
+# If it's the main file, run the simulation
+if __name__ == "__main__":
+    sys.exit(main())
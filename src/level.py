@@ -1,29 +1,42 @@
-import random
-import sys
 from os.path import join as path_join
 
+import numpy as np
 import pygame
 from pytmx.util_pygame import load_pygame
 
 from src.player import Player
 from src.ui import UI
 from src.groups import CameraGroup
-from src.sprites import Sprite, Water, Flower, Tree, InteractiveSprite, Particle
+from src.sprites import Water, WaterAnimation, Tree, InteractiveSprite, Particle, spawn_particle
 from src.utilities import utilities
 from src.settings import settings
+from src.timer import clock
+from src.rng import rng
+from src.controls import controls
 from src.transition import Transition
-from src.soil import Soil
+from src.soil import Soil, Plant, PLANT_TYPES
 from src.weather import Rain
+from src.world import World
+from src.autosave import Autosave
+from src.profiler import profiler
 from src.sky import Sky
 from src.menu import Menu
+from src.display import display
+from src.tasks import tasks
+from src.memory import memory
 
 
 class Level:
     """Level - the main part of the game"""
-    def __init__(self):
-        """Initialize the level"""
-        # Get the game's display
-        self.surface = pygame.display.get_surface()
+    def __init__(self, headless=False):
+        """Initialize the level, headless one only simulates and never draws or plays sounds"""
+        # Headless flag
+        self.headless = headless
+        # Game over flag
+        self.game_over = False
+
+        # Count of passed days
+        self.day = 0
 
         # Group of all sprites
         self.sprites = CameraGroup()
@@ -35,20 +48,32 @@ class Level:
         # Tree sprites
         self.tree_sprites = pygame.sprite.Group()
 
+        # Load tmx map data, sharing its tile images that have the same pixels, it's dropped after the level's set up,
+        # together with the images no tile uses
+        map_data = load_pygame(path_join(settings.BASE_PATH, "../data/map.tmx"))
+        map_data.images = [memory.intern(image, "map") if image else image for image in map_data.images]
+
+        # Ground and static map tiles of the world, loaded in chunks around the camera
+        self.world = World(self.sprites.tiles)
+
         # Soil layer
-        self.soil = Soil(self.sprites, self.collision_sprites)
+        self.soil = Soil(self.sprites, self.collision_sprites, map_data)
 
         # Set up the level
-        self._initialize()
+        self._initialize(map_data)
+
+        # Prepare the apple occupancy of the trees and grow the first apples
+        self._initialize_apples()
+        self._grow_apples()
 
         # Day-skip transition
         self.transition = Transition(self._reset_day, self.player)
 
         # Rain weather
-        self.rain = Rain(self.sprites)
+        self.rain = Rain(self.sprites, (self.world.width, self.world.height))
 
         # Rain flag
-        self.rain_active = random.randint(0, 10) > 6
+        self.rain_active = rng.stream("weather").randint(0, 10) > 6
         # Update the soil's flag
         self.soil.rain_active = self.rain_active
 
@@ -77,60 +102,106 @@ class Level:
         self.music = pygame.mixer.Sound(path_join(settings.BASE_PATH, "../audio/music.mp3"))
         # Set its volume
         self.music.set_volume(0.2)
-        # Play it in loops
-        self.music.play(-1)
+        # Play it in loops, unless the level is headless
+        if not self.headless:
+            self.music.play(-1)
 
-    def run(self, delta_time):
-        """Run the level"""
-        # Update the surface
-        self._update_surface(delta_time)
+        # Background autosave, headless level doesn't save
+        self.autosave = None if self.headless else Autosave(self)
 
-        # Update elements positions
-        self._update_positions(delta_time)
+        # Prepare the assets first needed in the middle of the game in the background, headless level doesn't draw
+        if not self.headless:
+            tasks.add(self._warm_up(), settings.TASK_PRIORITIES["warm_up"], name="warm-up")
 
-    def _update_surface(self, delta_time):
-        """Update the level's surface, draw the elements"""
-        # Fill the surface with a color
-        self.surface.fill("gray")
+    def update(self, delta_time):
+        """Update the level's simulation by a single fixed time step"""
+        # Advance the simulation clock used by the timers
+        clock.advance(delta_time)
 
-        # Draw all the sprites
-        self.sprites.custom_draw(self.player)
+        # Read the input for this update
+        controls.poll()
 
-        # Draw the user's interface
-        self.ui.display(delta_time)
+        # Place the static map tiles around the player, even if the level isn't drawn, the player collides with them
+        self.world.place(self.player.pos)
 
-    def _update_positions(self, delta_time):
-        """Update positions of level's elements"""
-        # If shop is open, update and show the menu
+        # If shop is open, update the menu
         if self.shop:
-            self.menu.update()
+            with profiler.section("menu"):
+                self.menu.update()
         # Otherwise update the sprites that aren't active in the menu
         else:
-            # Update all sprites
-            self.sprites.update(delta_time)
+            # Update the awake sprites
+            with profiler.section("sprites"):
+                self.sprites.update(delta_time)
+            # Animate the water
+            with profiler.section("water"):
+                self.water_animation.update(delta_time)
 
             # Check the plants condition
-            self.soil.check_plants(self.player)
+            with profiler.section("soil"):
+                self.soil.check_plants(self.player)
             # Check collisions with them
-            self._plant_collision()
+            with profiler.section("plant_collisions"):
+                self._plant_collision()
 
             # If it's raining, update the rain weather
             if self.rain_active:
-                self.rain.update()
+                with profiler.section("rain"):
+                    self.rain.update()
 
             # If player sleeps, run the day skip transition
             if self.player.sleep:
+                with profiler.section("transition"):
+                    self.transition.update()
+
+        # Update the daytime sky
+        with profiler.section("sky"):
+            self.sky.update(delta_time)
+
+        # Update the user's interface, headless level doesn't show it
+        if not self.headless:
+            with profiler.section("ui"):
+                self.ui.update(delta_time)
+
+        # Update the periodic autosave
+        if self.autosave:
+            with profiler.section("autosave"):
+                self.autosave.update()
+
+    def draw(self, alpha=1.0):
+        """Draw the level, interpolating moving sprites by the given fraction of a time step"""
+        # Fill the display with a color
+        display.clear("gray")
+
+        # Load the ground chunks and the map tiles around the camera
+        self.world.update(self.player.pos)
+
+        # Draw all the sprites
+        with profiler.section("camera"):
+            self.sprites.custom_draw(self.player, alpha)
+
+        # Draw the user's interface
+        with profiler.section("ui"):
+            self.ui.display()
+
+        # If shop is open, show the menu
+        if self.shop:
+            with profiler.section("menu"):
+                self.menu.display()
+        # Otherwise if player sleeps, show the day skip transition
+        elif self.player.sleep:
+            with profiler.section("transition"):
                 self.transition.display()
 
         # Display the daytime sky
-        self.sky.display(delta_time)
+        with profiler.section("sky"):
+            self.sky.display()
 
     def _check_game_over(self):
         """Check and handle game over"""
-        # If player doesn't have any health left, exit the game
+        # If player doesn't have any health left, end the game, its runner stops and shuts it down
         if self.player.health <= 0:
-            pygame.quit()
-            sys.exit()
+            self.game_over = True
 
     def _obtain_item(self, item):
         """Obtain one more of the given item"""
@@ -142,15 +213,15 @@ class Level:
 
     def _reset_day(self):
         """Reset everything that happens in a one-day cycle"""
-        # Update amount of hearts
-        self.ui.create_hearts(self.player.health)
+        # Count the day
+        self.day += 1
+
+        # Update amount of hearts, headless level doesn't show them
+        if not self.headless:
+            self.ui.create_hearts(self.player.health)
 
-        # Destroy apples from every tree on the map
-        for tree in self.tree_sprites.sprites():
-            # Destroy apples
-            tree.destroy_apples()
-            # Create new ones
-            tree.create_apples()
+        # Grow new apples on every tree on the map
+        self._grow_apples()
 
         # Grow the plants
         self.soil.update_plants()
@@ -165,44 +236,89 @@ class Level:
         self.soil.remove_water()
 
         # Set the weather to raining randomly
-        self.rain_active = random.randint(0, 10) > 6
+        self.rain_active = rng.stream("weather").randint(0, 10) > 6
         # Update the soil's raining flag
         self.soil.rain_active = self.rain_active
 
         # Reset the sky color
         self.sky.start_color = [255, 255, 255]
 
+        # Save the new day, unless the game is over (continuing it would end right away)
+        if self.autosave and not self.game_over:
+            self.autosave.request()
+
+    def _initialize_apples(self):
+        """Prepare the occupancy array of apple positions of all the trees"""
+        # Save the trees in a fixed order, every tree has its own row
+        self.trees = self.tree_sprites.sprites()
+        # Amount of apple positions of a tree with the most of them
+        positions = max(len(tree.apple_pos) for tree in self.trees)
+
+        # Apple positions that exist on each tree
+        self.apple_positions = np.array([[index < len(tree.apple_pos) for index in range(positions)]
+                                         for tree in self.trees])
+        # Apple positions that have an apple
+        self.apple_occupancy = np.zeros_like(self.apple_positions)
+
+        # Let every tree keep its row updated, when it loses an apple
+        for index, tree in enumerate(self.trees):
+            tree.apple_occupancy = self.apple_occupancy[index]
+
+    def _grow_apples(self):
+        """Randomly grow apples on all the trees, touching sprites of only trees whose apples changed"""
+        # Roll every apple position of every tree at once, each has the same chance for an apple
+        chances, rolls = settings.APPLE_ODDS
+        occupancy = (rng.numpy_stream("trees").integers(0, rolls, self.apple_occupancy.shape) < chances) & \
+            self.apple_positions
+
+        # Update trees that have different apples than before
+        for index in np.flatnonzero(np.any(occupancy != self.apple_occupancy, axis=1)):
+            self.trees[index].grow_apples(occupancy[index])
+
+    def _warm_up(self):
+        """Import the plants' frames and create the particle masks before they are first needed, one per step"""
+        # Import the frames of every plant type, masks of the grown plants are made when they're harvested
+        for plant_type in PLANT_TYPES:
+            Particle.mask(Plant.load_frames(plant_type)[-1])
+            yield
+
+        # Create the masks of the trees and apples, made when they're chopped and picked
+        for tree in self.trees:
+            Particle.mask(tree.tree_surface)
+            yield
+            Particle.mask(tree.apple_surface)
+            yield
+
     def _plant_collision(self):
         """Check and handle collisions with plants"""
-        # Check if there are any plants
-        if self.soil.plant_sprites:
-            # If there are, check every one of them
-            for plant in self.soil.plant_sprites.sprites():
-                # If it's harvestable and collides with player, remove it
-                if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
-                    # Add plant harvests to the player's items
-                    self._obtain_item(plant.plant_type)
-
-                    # Remove it from the soil
-                    plant.remove_plant(plant.rect.center)
-                    # Destroy the plant
-                    plant.kill()
-
-                    # Make a particle
-                    Particle(plant.rect.topleft, plant.image, self.sprites, settings.DEPTHS["main"])
+        # Check every harvestable plant near the player
+        for plant in self.soil.plants_near(self.player.hitbox, harvestable=True):
+            # If it collides with player, harvest it
+            if plant.rect.colliderect(self.player.hitbox):
+                self.harvest(plant)
+
+    def harvest(self, plant):
+        """Harvest the plant into the player's items"""
+        # Add plant harvests to the player's items
+        self._obtain_item(plant.plant_type)
+
+        # Remove it from the soil
+        plant.remove_plant(plant.rect.center)
+        # Destroy the plant
+        plant.kill()
+
+        # Make a particle
+        spawn_particle(plant.rect.topleft, plant.image, self.sprites, settings.DEPTHS["main"])
 
     def _activate_shop(self):
         """Activate Trader's shop"""
         # Switch on or off the shop flag
         self.shop = not self.shop
 
-    def _initialize(self):
-        """Initialize and set up the entire level"""
-        # Create ground
-        Sprite((0, 0), utilities.load("../graphics/world/ground.png"), self.sprites, settings.DEPTHS["ground"])
-
-        # Load tmx map data
-        map_data = load_pygame(path_join(settings.BASE_PATH, "../data/map.tmx"))
+    def _initialize(self, map_data):
+        """Initialize and set up the entire level from the tmx map data"""
+        # Static tiles of the world, placed by their chunks only while they are near
+        tiles = self.world
 
         # BUILD A HOUSE
         # Go through each layer of bottom of the house
@@ -210,40 +326,41 @@ class Level:
             # Check where are these layers placed
             for pos_x, pos_y, surface in map_data.get_layer_by_name(layer).tiles():
                 # Place them in the game
-                Sprite((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface, self.sprites,
-                       settings.DEPTHS["house_bottom"])
+                tiles.add((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface,
+                          settings.DEPTHS["house_bottom"])
         # Go through each top layer of house
         for layer in ["HouseWalls", "HouseFurnitureTop"]:
             # Check placement of layers
             for pos_x, pos_y, surface in map_data.get_layer_by_name(layer).tiles():
                 # Place the objects
-                Sprite((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface, self.sprites)
+                tiles.add((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface)
 
         # Build fences
         for pos_x, pos_y, surface in map_data.get_layer_by_name("Fence").tiles():
             # Place the fences
-            Sprite((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface,
-                   [self.sprites, self.collision_sprites])
+            tiles.add((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface, hitbox=True)
 
-        # Get the frames of water animation
+        # Get the frames of water animation, shared by all the water
         water_frames = utilities.load_folder("../graphics/water")
+        self.water_animation = WaterAnimation(water_frames)
         # Place water
         for pos_x, pos_y, surface in map_data.get_layer_by_name("Water").tiles():
-            Water((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), water_frames,
-                  [self.sprites, self.collision_sprites])
+            water = Water((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), water_frames,
+                          [self.sprites, self.collision_sprites])
+            self.water_animation.sprites.append(water)
 
         # Create trees
         for tree in map_data.get_layer_by_name("Trees"):
             Tree((tree.x, tree.y), tree.image,
                  [self.sprites, self.tree_sprites, self.collision_sprites], tree.name, self._obtain_item)
 
-        # Create flowers
+        # Create flowers, with hitboxes a lot smaller vertically
         for flower in map_data.get_layer_by_name("Decoration"):
-            Flower((flower.x, flower.y), flower.image, [self.sprites, self.collision_sprites])
+            tiles.add((flower.x, flower.y), flower.image, hitbox=(-20, -flower.image.get_height() * 0.9))
 
-        # Place the invisible collision sprites
+        # Place the invisible collision tiles
         for pos_x, pos_y, surface in map_data.get_layer_by_name("Collision").tiles():
-            Sprite((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface, self.collision_sprites)
+            tiles.add((pos_x * settings.TILE_SIZE, pos_y * settings.TILE_SIZE), surface, hitbox=True, visible=False)
 
         # Create the player related tiles
         for player in map_data.get_layer_by_name("Player"):
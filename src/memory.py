@@ -0,0 +1,91 @@
+import hashlib
+import weakref
+
+import pygame
+
+from src.settings import settings
+
+
+class SurfaceMemory:
+    """Accounting of the memory of the game's surfaces by their owner subsystem, sharing pixel-identical ones"""
+    def __init__(self):
+        """Create the accounting"""
+        # Owner subsystem of every tracked surface, surfaces that stop being used are forgotten on their own
+        self.owners = weakref.WeakKeyDictionary()
+        # Interned surfaces by their format and a hash of their pixels
+        self.interned = weakref.WeakValueDictionary()
+
+        # Amount and bytes of the duplicates every owner got shared surfaces instead of
+        self.duplicates = {}
+
+    def track(self, surface, owner):
+        """Count the surface's memory to the owner, get the surface"""
+        self.owners[surface] = owner
+        return surface
+
+    def intern(self, surface, owner):
+        """Get the already known surface with the same pixels and format, or track and remember this one"""
+        # Hashing the pixels of big unique surfaces (like the whole ground) isn't worth it, only track them
+        if self.size(surface) > settings.INTERN_MAX_BYTES:
+            return self.track(surface, owner)
+
+        # Share the known surface if there is one
+        key = self._key(surface)
+        known = self.interned.get(key)
+        if known is not None:
+            # Count the duplicate
+            amount, size = self.duplicates.get(owner, (0, 0))
+            self.duplicates[owner] = (amount + 1, size + self.size(surface))
+            return known
+
+        # Remember this one
+        self.interned[key] = surface
+        return self.track(surface, owner)
+
+    @staticmethod
+    def size(surface):
+        """Get the bytes of the surface's pixels, subsurfaces share the pixels of their parent"""
+        return 0 if surface.get_parent() else surface.get_pitch() * surface.get_height()
+
+    def summary(self):
+        """Get the amount and bytes of the alive surfaces, and the shared duplicates of every owner"""
+        # Sum the surfaces of every owner
+        owners = {}
+        for surface, owner in list(self.owners.items()):
+            values = owners.setdefault(owner, {"surfaces": 0, "bytes": 0, "duplicates": 0, "saved_bytes": 0})
+            values["surfaces"] += 1
+            values["bytes"] += self.size(surface)
+
+        # Add the duplicates they didn't have to keep
+        for owner, (amount, size) in self.duplicates.items():
+            values = owners.setdefault(owner, {"surfaces": 0, "bytes": 0, "duplicates": 0, "saved_bytes": 0})
+            values["duplicates"] = amount
+            values["saved_bytes"] = size
+
+        return {
+            "bytes": sum(values["bytes"] for values in owners.values()),
+            "saved_bytes": sum(values["saved_bytes"] for values in owners.values()),
+            "owners": dict(sorted(owners.items(), key=lambda item: -item[1]["bytes"]))
+        }
+
+    def report(self):
+        """Get a printable table of the summary"""
+        summary = self.summary()
+        lines = [f"surfaces {summary['bytes'] / 2 ** 20:.1f} MB, "
+                 f"interning shared {summary['saved_bytes'] / 2 ** 20:.1f} MB of duplicates"]
+        lines += [f"{owner:>12}: {values['surfaces']:5} surfaces {values['bytes'] / 2 ** 20:8.2f} MB, "
+                  f"{values['duplicates']:4} duplicates {values['saved_bytes'] / 2 ** 20:6.2f} MB shared"
+                  for owner, values in summary["owners"].items()]
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def _key(surface):
+        """Get the key of the surface's format and pixels"""
+        return (surface.get_size(), surface.get_bitsize(), surface.get_flags() & pygame.SRCALPHA, surface.get_masks(),
+                surface.get_colorkey(), surface.get_alpha(),
+                hashlib.blake2b(pygame.image.tobytes(surface, "RGBA"), digest_size=16).digest())
+
+
+# Create the game's surface memory accounting
+memory = SurfaceMemory()
@@ -4,14 +4,16 @@ import pygame
 
 from src.settings import settings
 from src.timer import Timer
+from src.controls import controls
+from src.display import display
 
 
 class Menu:
     """Interactive menu class"""
     def __init__(self, player, activate_menu):
         """Initialize the menu"""
-        # Get game's display
-        self.surface = pygame.display.get_surface()
+        # Surface the menu is drawn on, the display's canvas of the current frame
+        self.surface = None
         # Store the reference to the player
         self.player = player
 
@@ -55,13 +57,10 @@ class Menu:
         # Get the amount of entries
         self._update_amount()
 
-        # Show the menu
-        self._display()
-
     def _handle_input(self):
         """Check and handle menu's input"""
         # Get keys that are pressed
-        keys = pygame.key.get_pressed()
+        keys = controls.get_pressed()
 
         # If user pressed escape, close the menu
         if keys[pygame.K_ESCAPE]:
@@ -100,8 +99,11 @@ class Menu:
 
 
 
-    def _display(self):
+    def display(self):
         """Display the menu"""
+        # Get the canvas of this frame
+        self.surface = display.canvas()
+
         # Check every text surface and blit it
         for index, text_surface in enumerate(self.text_surfaces):
             # Calculate the top position
@@ -169,29 +171,12 @@ class Menu:
 
     def _shop(self, entry):
         """Allow player to buy and sell items"""
-        # If player is buying
+        # If player is buying, try to buy it
         if self.index > self.sell_count:
-            # Get the price of an item
-            price = settings.PURCHASE_PRICES[entry]
-
-            # Check if user has enough money, if so, buy the item
-            if self.player.money >= price:
-                # Add item to the inventory
-                self.player.current_seeds[entry] += 1
-                # Decrease his amount of money
-                self.player.money -= price
-
-        # Otherwise, if player is selling
+            self.player.buy(entry)
+        # Otherwise, if player is selling, try to sell it
         else:
-            # If player has this item, sell it
-            if self.player.items[entry] > 0:
-                # Get the price of an item
-                price = settings.SELL_PRICES[entry]
-
-                # Decrease amount of it from his items
-                self.player.items[entry] -= 1
-                # Increase his amount of money
-                self.player.money += price
+            self.player.sell(entry)
 
     def _initialize(self):
         """Initialize components of the menu"""
@@ -1,15 +1,21 @@
 from os.path import join as path_join
+from itertools import chain
 
 import pygame
 from pygame.math import Vector2 as Vector
 
-from src.utilities import utilities
 from src.settings import settings
 from src.timer import Timer
+from src.controls import controls
+from src.profiler import profiler
+from src.animations import animations
 
 
 class Player(pygame.sprite.Sprite):
     """Player of the game"""
+    # Player is always updated
+    awake = True
+
     def __init__(self, pos, group, collision_sprites, tree_sprites, interactive_sprites, soil, activate_shop):
         """Initialize the player"""
         super().__init__(group)
@@ -24,7 +30,9 @@ class Player(pygame.sprite.Sprite):
         self.frame = 0
 
         # Set his image to the current frame animation of state he's in
-        self.image = self.frames[self.state][self.frame]
+        self.image = animations.get(self.paths[self.state])[self.frame]
+        # State the animation was last updated in
+        self.animated_state = None
 
         # Get his rectangle, center him around given position
         self.rect = self.image.get_rect(center=pos)
@@ -36,13 +44,19 @@ class Player(pygame.sprite.Sprite):
 
         # Player's direction
         self.direction = Vector()
+        # Position which the tool is used on
+        self.target = Vector()
         # Set his position
         self.pos = Vector(self.rect.center)
+        # Position from the previous update, used to interpolate the drawing
+        self.previous_pos = self.pos.copy()
         # Depth position of the player
         self.pos_z = settings.DEPTHS["main"]
 
         # List of sprites that player can collide with
         self.collision_sprites = collision_sprites
+        # Static tiles, some of which player can collide with too
+        self.tiles = group.tiles
         # Sprites that player can interact with
         self.interactive_sprites = interactive_sprites
         # Get the trees
@@ -107,6 +121,9 @@ class Player(pygame.sprite.Sprite):
 
     def update(self, delta_time):
         """Update the player"""
+        # Remember the position before the update
+        self.previous_pos.update(self.pos)
+
         # Update timers
         self._update_timers()
 
@@ -127,7 +144,7 @@ class Player(pygame.sprite.Sprite):
     def _handle_input(self):
         """Check and handle the player's input"""
         # Get the keys pressed
-        keys = pygame.key.get_pressed()
+        keys = controls.get_pressed()
 
         # If player isn't using a tool and isn't sleeping, allow for input
         if not self.timers["tool"].active and not self.sleep:
@@ -162,7 +179,7 @@ class Player(pygame.sprite.Sprite):
                 # Turn on the seed timer
                 self.timers["seed"].start()
                 # Stop the movement
-                self.direction = Vector()
+                self.direction.update(0, 0)
 
             # When user's pressing SPACE or K or X, use a tool
             if keys[pygame.K_SPACE] or keys[pygame.K_k] or keys[pygame.K_x]:
@@ -170,7 +187,7 @@ class Player(pygame.sprite.Sprite):
                 self.timers["tool"].start()
 
                 # Stop the movement
-                self.direction = Vector()
+                self.direction.update(0, 0)
                 # Reset the animation frame
                 self.frame = 0
 
@@ -213,32 +230,70 @@ class Player(pygame.sprite.Sprite):
 
                 # If there isn't a Trader nearby, try to eat
                 else:
-                    # If player has at least two apples
-                    if self.items["apple"] > 1:
-                        # If player doesn't have already max health, eat them
-                        if self.health < 3:
-                            # Decrease the count of apples
-                            self.items["apple"] -= 2
-
-                            # Increase the health
-                            self.health += 1
-
-                    # Otherwise if player has a tomato, eat it
-                    elif self.items["tomato"] > 0:
-                        # Check if he doesn't have max health yet
-                        if self.health < 3:
-                            # Decrease the tomato count
-                            self.items["tomato"] -= 1
-
-                            # Increase his health
-                            self.health += 1
+                    self.eat()
+
+    def place(self, pos):
+        """Move the player to the given position right away"""
+        self.pos.update(pos)
+        self.previous_pos.update(self.pos)
+        self.rect.center = round(self.pos.x), round(self.pos.y)
+        self.hitbox.center = self.rect.center
+
+    def eat(self):
+        """Eat two apples or a tomato to heal, return whether player ate anything"""
+        # Don't eat with max health
+        if self.health >= 3:
+            return False
+
+        # If player has at least two apples, eat them
+        if self.items["apple"] > 1:
+            # Decrease the count of apples
+            self.items["apple"] -= 2
+        # Otherwise if player has a tomato, eat it
+        elif self.items["tomato"] > 0:
+            # Decrease the tomato count
+            self.items["tomato"] -= 1
+        # Nothing to eat
+        else:
+            return False
+
+        # Increase the health
+        self.health += 1
+        return True
+
+    def buy(self, seed):
+        """Buy a seed if player has enough money, return whether he bought it"""
+        # Get the price of the seed
+        price = settings.PURCHASE_PRICES[seed]
+
+        # Check if user has enough money, if so, buy the seed
+        if self.money < price:
+            return False
+
+        # Add seed to the inventory
+        self.current_seeds[seed] += 1
+        # Decrease his amount of money
+        self.money -= price
+        return True
+
+    def sell(self, item):
+        """Sell an item if player has it, return whether he sold it"""
+        # If player doesn't have this item, he can't sell it
+        if self.items[item] <= 0:
+            return False
+
+        # Decrease amount of it from his items
+        self.items[item] -= 1
+        # Increase his amount of money
+        self.money += settings.SELL_PRICES[item]
+        return True
 
     def _move(self, delta_time):
         """Move the player in given direction"""
         # If length of the vector is higher than 0, meaning player moves
         if self.direction.magnitude() > 0:
             # Normalize player's direction, to prevent speed up when moving in two directions at once
-            self.direction = self.direction.normalize()
+            self.direction.normalize_ip()
 
         # Set a new horizontal position
         self.pos.x += self.direction.x * self.speed * delta_time
@@ -269,17 +324,21 @@ class Player(pygame.sprite.Sprite):
         # If player isn't moving (his direction's vector length is equal to 0)
         if self.direction.magnitude() == 0:
             # Set the state to current direction idle one
-            self.state = self.state.split('_')[0] + "_idle"
+            self.state = self.states[self.facings[self.state]]["idle"]
 
         # If tool is being use (the tool timer's active)
         if self.timers["tool"].active:
             # Set the state to the given tool usage
-            self.state = self.state.split('_')[0] + '_' + self.tool
+            self.state = self.states[self.facings[self.state]][self.tool]
 
     def _collisions(self, direction):
         """Check and handle collisions"""
-        # Go through each collide-able sprite
-        for sprite in self.collision_sprites.sprites():
+        # Count the collision tests
+        tests = 0
+
+        # Go through each collide-able sprite and then each tile near the player, without copying them into a list
+        for sprite in chain(self.collision_sprites.spritedict, self.tiles.colliders_near(self.hitbox)):
+            tests += 1
             # If it has a hitbox, check for collisions
             if hasattr(sprite, "hitbox"):
                 # If it collides with player, handle it
@@ -310,9 +369,12 @@ class Player(pygame.sprite.Sprite):
                         self.rect.centery = self.hitbox.centery
                         self.pos.y = self.hitbox.centery
 
+        profiler.count("collision_tests", tests)
+
     def _update_tool_target(self):
         """Get the target position which the tool is used on"""
-        self.target = self.rect.center + settings.TOOL_OFFSETS[self.state.split('_')[0]]
+        self.target.update(self.rect.centerx, self.rect.centery)
+        self.target += settings.TOOL_OFFSETS[self.facings[self.state]]
 
     def _use_tool(self):
         """Use a selected tool"""
@@ -360,6 +422,8 @@ class Player(pygame.sprite.Sprite):
 
         # Switch the tool
         self.tool = self.tools[self.tool_index]
+        # Prepare its animation
+        self._prefetch_animations()
 
     def _change_seed(self, amount):
         """Change the current seed by the given amount"""
@@ -375,29 +439,41 @@ class Player(pygame.sprite.Sprite):
 
     def _animate(self, delta_time):
         """Animate the player"""
+        # Get the frames of the current state, loaded the first time it's entered
+        frames = animations.get(self.paths[self.state])
+
+        # When the state changes, prepare the ones likely to come next
+        if self.state != self.animated_state:
+            self.animated_state = self.state
+            self._prefetch_animations()
+
         # Increase the current frame
         self.frame += settings.ANIMATION_SPEED * delta_time
 
         # Make sure the current frame is correct, otherwise set it back to 0
-        if self.frame >= len(self.frames[self.state]):
+        if self.frame >= len(frames):
             self.frame = 0
 
         # Set the new image based off the current frame
-        self.image = self.frames[self.state][int(self.frame)]
+        self.image = frames[int(self.frame)]
+
+    def _prefetch_animations(self):
+        """Load the animations of walking, standing and using the current tool in the current direction in the
+        background"""
+        facing = self.states[self.facings[self.state]]
+        animations.prefetch([self.paths[facing[action]] for action in ("", "idle", self.tool)])
 
     def _load_assets(self):
-        """Load the player's assets"""
-        # Prepare the dictionary with animations
-        self.frames = { }
-        # Go through each animation type
+        """Prepare the player's assets, animations are loaded only when they're first needed"""
+        # Folder of the animation of every state, walking, idle and using every tool in every direction
+        self.paths = {}
         for animation_type in ['', "_idle", "_hoe", "_axe", "_water"]:
-            # Check and prepare empty list of animations for every direction of it
             for direction in ["up", "down", "left", "right"]:
-                self.frames[direction + animation_type] = []
-
-        # Go through all the animations that were prepared
-        for animation in self.frames.keys():
-            # Get the full path to a file
-            full_path = "../graphics/character/" + animation
-            # Save the animation frames in animations variable
-            self.frames[animation] = utilities.load_folder(full_path)
+                self.paths[direction + animation_type] = "../graphics/character/" + direction + animation_type
+
+        # Direction the player faces in every state, and the state of facing every direction while walking, idle
+        # or using every tool, so states are looked up instead of built from strings every update
+        self.facings = {state: state.split('_')[0] for state in self.paths}
+        self.states = {facing: {} for facing in ["up", "down", "left", "right"]}
+        for state, facing in self.facings.items():
+            self.states[facing][state[len(facing) + 1:]] = state
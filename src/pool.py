@@ -0,0 +1,28 @@
+class Pool:
+    """Pool of objects that are recycled instead of being created and destroyed all the time"""
+    def __init__(self, create, size):
+        """Create the pool, keeping at most the given amount of free objects"""
+        # Function creating a new object from the acquire arguments
+        self.create = create
+        # Maximum amount of free objects
+        self.size = size
+
+        # Objects waiting to be reused
+        self.free = []
+
+    def acquire(self, *args):
+        """Get an object set up with the given arguments, reusing a free one if possible"""
+        # If there is a free object, reset it
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+
+            return obj
+
+        # Otherwise create a new one
+        return self.create(*args)
+
+    def release(self, obj):
+        """Give the object back to the pool, it's dropped if the pool is full"""
+        if len(self.free) < self.size:
+            self.free.append(obj)
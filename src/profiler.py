@@ -0,0 +1,217 @@
+import csv
+import json
+import time
+from collections import deque
+from os.path import join as path_join
+
+import numpy as np
+import pygame
+
+from src.settings import settings
+
+
+class Section:
+    """Timed section of a frame, used as a context manager"""
+    def __init__(self, profiler, name):
+        """Create the section"""
+        self.profiler = profiler
+        self.name = name
+        # Time the section was entered
+        self.start = 0
+
+    def __enter__(self):
+        """Start timing the section"""
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+        """Add the time spent in the section to the current frame"""
+        timings = self.profiler.timings
+        timings[self.name] = timings.get(self.name, 0) + time.perf_counter() - self.start
+
+
+class NullSection:
+    """Section that doesn't time anything, used while the profiler is off"""
+    def __enter__(self):
+        """Do nothing"""
+
+    def __exit__(self, *exception):
+        """Do nothing"""
+
+
+class Profiler:
+    """Profiler breaking every frame into the game's subsystems, with an overlay and exports of the results"""
+    def __init__(self):
+        """Create the profiler"""
+        # Enabled flag, the overlay is shown only when visible
+        self.enabled = False
+        self.visible = False
+        # Flag of keeping every frame for exporting (instead of only the recent ones)
+        self.logging = False
+
+        # Sections of the game, created once, and one that does nothing
+        self.sections = {}
+        self.null_section = NullSection()
+
+        # Timings (in seconds) and counters of the current frame
+        self.timings = {}
+        self.counters = {}
+        # Time the current frame started
+        self.frame_start = 0
+
+        # Recent frames (timings, counters and total time in milliseconds) for the overlay
+        self.history = deque(maxlen=settings.PROFILER_HISTORY)
+        # Every frame since logging started
+        self.log = []
+
+        # Overlay's font (loaded when it's first shown)
+        self.font = None
+        # Overlay's surface and frames left until it's redrawn
+        self.overlay = None
+        self.overlay_frames = 0
+
+    def toggle(self):
+        """Show or hide the overlay"""
+        self.visible = not self.visible
+        self.enabled = self.visible or self.logging
+
+    def start_logging(self):
+        """Start keeping every frame for exporting"""
+        self.logging = True
+        self.enabled = True
+
+    def section(self, name):
+        """Get the context manager timing the given section of the current frame"""
+        # Don't time anything if disabled
+        if not self.enabled:
+            return self.null_section
+
+        # Create the section once
+        if name not in self.sections:
+            self.sections[name] = Section(self, name)
+
+        return self.sections[name]
+
+    def count(self, name, amount=1):
+        """Add the amount to the given counter of the current frame"""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def begin_frame(self):
+        """Start a new frame"""
+        self.timings = {}
+        self.counters = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Finish the current frame and remember it"""
+        if not self.enabled:
+            return
+
+        # Save the frame's times in milliseconds
+        frame = {
+            "total": (time.perf_counter() - self.frame_start) * 1000,
+            "timings": {name: duration * 1000 for name, duration in self.timings.items()},
+            "counters": self.counters
+        }
+        self.history.append(frame)
+        if self.logging:
+            self.log.append(frame)
+
+    def percentiles(self, name=None, frames=None):
+        """Get p50, p95 and p99 of the section's times (or total frame times) in milliseconds"""
+        values = self._values(name, frames if frames is not None else self.history)
+        if not values:
+            return 0, 0, 0
+
+        return tuple(np.percentile(values, (50, 95, 99)).tolist())
+
+    def histogram(self, frames=None):
+        """Get amounts of frames whose total time falls into each bucket of the frame time histogram"""
+        counts, _ = np.histogram(self._values(None, frames if frames is not None else self.history),
+                                 settings.PROFILER_BUCKETS)
+        return counts.tolist()
+
+    def summary(self, frames=None):
+        """Get percentiles of every section, average counters and the frame time histogram"""
+        frames = frames if frames is not None else self.history
+
+        # Names of all the sections and counters in the frames
+        sections = sorted({name for frame in frames for name in frame["timings"]})
+        counters = sorted({name for frame in frames for name in frame["counters"]})
+
+        return {
+            "frames": len(frames),
+            "total": dict(zip(("p50", "p95", "p99"), self.percentiles(None, frames))),
+            "sections": {name: dict(zip(("p50", "p95", "p99"), self.percentiles(name, frames)))
+                         for name in sections},
+            "counters": {name: sum(frame["counters"].get(name, 0) for frame in frames) / max(len(frames), 1)
+                         for name in counters},
+            "histogram": {"buckets": settings.PROFILER_BUCKETS, "counts": self.histogram(frames)}
+        }
+
+    def export(self, path):
+        """Export the logged frames, into JSON summary if the path ends with .json, otherwise into CSV rows"""
+        # Export the summary and every frame as JSON
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump({"summary": self.summary(self.log), "frames": self.log}, file, indent=1)
+            return
+
+        # Export a row of every frame as CSV
+        sections = sorted({name for frame in self.log for name in frame["timings"]})
+        counters = sorted({name for frame in self.log for name in frame["counters"]})
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "total"] + sections + counters)
+            for index, frame in enumerate(self.log):
+                writer.writerow([index, round(frame["total"], 4)] +
+                                [round(frame["timings"].get(name, 0), 4) for name in sections] +
+                                [frame["counters"].get(name, 0) for name in counters])
+
+    def _values(self, name, frames):
+        """Get times of the section (or total frame times if there isn't any) in the frames"""
+        if name is None:
+            return [frame["total"] for frame in frames]
+
+        return [frame["timings"].get(name, 0) for frame in frames]
+
+    def display(self, surface):
+        """Draw the overlay with the recent percentiles and counters"""
+        if not self.visible or not self.history:
+            return
+
+        # Redraw the overlay only once in a while, so it doesn't cost much itself
+        self.overlay_frames -= 1
+        if not self.overlay or self.overlay_frames <= 0:
+            self.overlay = self._draw_overlay()
+            self.overlay_frames = settings.PROFILER_REFRESH
+
+        # Show it in the top right corner
+        surface.blit(self.overlay, (settings.SCREEN_WIDTH - self.overlay.get_width() - 10, 10))
+
+    def _draw_overlay(self):
+        """Draw the overlay's surface"""
+        # Load the font once
+        if not self.font:
+            self.font = pygame.font.Font(path_join(settings.BASE_PATH, "../font/LycheeSoda.ttf"), 20)
+
+        # Prepare the lines of the overlay
+        summary = self.summary()
+        lines = ["frame ms  p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}".format(**summary["total"])]
+        lines += [f"{name}  {values['p50']:.2f}  {values['p95']:.2f}  {values['p99']:.2f}"
+                  for name, values in summary["sections"].items()]
+        lines += [f"{name}: {value:.0f}" for name, value in summary["counters"].items()]
+        lines.append("histogram: " + " ".join(str(count) for count in summary["histogram"]["counts"]))
+
+        # Draw them on a dark background
+        height = self.font.get_linesize()
+        background = pygame.Surface((360, height * len(lines) + 10), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        for index, line in enumerate(lines):
+            background.blit(self.font.render(line, False, "white"), (8, 5 + index * height))
+
+        return background
+
+
+# Create the game's profiler
+profiler = Profiler()
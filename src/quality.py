@@ -0,0 +1,80 @@
+from collections import deque
+
+import numpy as np
+
+from src.settings import settings
+
+
+class Quality:
+    """Quality governor, stepping through the quality presets depending on the recent frame times"""
+    def __init__(self, preset=settings.QUALITY_PRESET):
+        """Create the governor starting with the given preset"""
+        # Names of the presets from the lowest to the highest quality
+        self.presets = list(settings.QUALITY_PRESETS)
+        # Index of the current preset
+        self.level = self.presets.index(preset)
+
+        # Flag of reacting to the frame times, a chosen preset is kept
+        self.adaptive = True
+
+        # Recent frame times in milliseconds
+        self.frame_times = deque(maxlen=settings.QUALITY_WINDOW)
+        # Amount of fast windows in a row
+        self.fast_windows = 0
+
+        # Apply the preset
+        self._apply()
+
+    def pin(self, preset):
+        """Keep the given preset no matter the frame times"""
+        self.level = self.presets.index(preset)
+        self.adaptive = False
+        self._apply()
+
+    def update(self, frame_time):
+        """Remember the frame time (in milliseconds), step the quality once a window of frames is full"""
+        if not self.adaptive:
+            return
+
+        # Wait until the window is full
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return
+
+        # Judge the window by its slow frames
+        slow_time = np.percentile(self.frame_times, 95)
+        self.frame_times.clear()
+
+        # If the frames are too slow, lower the quality right away
+        if slow_time > settings.QUALITY_DOWN_MS:
+            self.fast_windows = 0
+            if self.level > 0:
+                self.level -= 1
+                self._apply()
+        # If they are fast enough for a few windows in a row, try a higher quality
+        elif slow_time < settings.QUALITY_UP_MS:
+            self.fast_windows += 1
+            if self.fast_windows >= settings.QUALITY_UP_WINDOWS and self.level < len(self.presets) - 1:
+                self.fast_windows = 0
+                self.level += 1
+                self._apply()
+        # Frames between the limits keep the current quality
+        else:
+            self.fast_windows = 0
+
+    def _apply(self):
+        """Set the values of the current preset"""
+        # Name of the preset
+        self.preset = self.presets[self.level]
+        values = settings.QUALITY_PRESETS[self.preset]
+
+        # Rain drops and puddles created per update, particles flag, water animation speed multiplier and scale
+        # of the world's rendering
+        self.rain_density = values["rain_density"]
+        self.particles = values["particles"]
+        self.water_rate = values["water_rate"]
+        self.render_scale = values["render_scale"]
+
+
+# Create the game's quality governor
+quality = Quality()
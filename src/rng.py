@@ -0,0 +1,47 @@
+import random
+import hashlib
+
+import numpy as np
+
+
+class RandomService:
+    """Seedable source of all the game's randomness, split into independent named streams"""
+    def __init__(self, seed=None):
+        """Create the random service"""
+        # Seed it right away
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Seed the service, forgetting all the current streams"""
+        # If there isn't any seed given, pick a random one
+        self.base_seed = seed if seed is not None else random.randrange(2 ** 32)
+
+        # Random generators of the streams
+        self.streams = {}
+        # NumPy random generators of the streams
+        self.numpy_streams = {}
+
+    def stream(self, name):
+        """Get the random generator of the given stream"""
+        # If the stream doesn't exist yet, create it
+        if name not in self.streams:
+            # Seed it from the base seed and its name, so streams don't affect each other
+            self.streams[name] = random.Random(f"{self.base_seed}:{name}")
+
+        # Return the generator
+        return self.streams[name]
+
+    def numpy_stream(self, name):
+        """Get the NumPy random generator of the given stream, for drawing many values at once"""
+        # If the stream doesn't exist yet, create it
+        if name not in self.numpy_streams:
+            # Seed it from the base seed and its name
+            digest = hashlib.sha256(f"{self.base_seed}:{name}".encode()).digest()
+            self.numpy_streams[name] = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+        # Return the generator
+        return self.numpy_streams[name]
+
+
+# Create the game's random service
+rng = RandomService()
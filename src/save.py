@@ -0,0 +1,196 @@
+import os
+import zlib
+import struct
+
+import numpy as np
+
+from src.settings import settings
+from src.tasks import tasks, complete
+
+
+# Save file header (magic, version), the rest of the file is compressed
+SAVE_MAGIC = b"PVSV"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sH")
+# Game's state (day, rain, player's position, health, money, tool and seed, sky color, amount of items,
+# amount of seeds, grid's height and width, amount of trees and apple positions of a tree)
+SAVE_STATE = struct.Struct("<I?2diiBB3dHHHHHH")
+
+# Player's items and seeds in the order they are saved in
+ITEMS = ("wood", "corn", "tomato", "apple")
+SEEDS = ("corn", "tomato")
+
+# Types of the soil arrays (grid, plant types, plant stages, plant health) in the order they are saved in
+SOIL_TYPES = (np.uint8, np.uint8, np.float64, np.int8)
+
+
+class Snapshot:
+    """Copy of the game state, taken on the main thread and safe to write from any other"""
+    def __init__(self, state, values, soil, tree_health, apple_occupancy):
+        """Create the snapshot"""
+        # Single values packed like the save state
+        self.state = state
+        # Player's items followed by his seeds
+        self.values = values
+        # Soil grid, plant types, plant stages and plant health
+        self.soil = soil
+        # Trees' health and apples
+        self.tree_health = tree_health
+        self.apple_occupancy = apple_occupancy
+
+    def pack_state(self):
+        """Pack everything besides the soil arrays"""
+        return (SAVE_STATE.pack(*self.state) + self.values.tobytes() + self.tree_health.tobytes() +
+                self.apple_occupancy.tobytes())
+
+    @staticmethod
+    def unpack_state(data, path):
+        """Unpack everything besides the soil arrays, return it and the offset right after it"""
+        # Read the single values
+        state = SAVE_STATE.unpack_from(data)
+        items, seeds, height, width, trees, apples = state[-6:]
+
+        # Make sure the items are known
+        if (items, seeds) != (len(ITEMS), len(SEEDS)):
+            raise ValueError(f"{path} has unsupported items")
+
+        # Read the arrays after them
+        offset = SAVE_STATE.size
+        arrays = []
+        for dtype, shape in ((np.int32, items + seeds), (np.int16, trees), (np.bool_, (trees, apples))):
+            arrays.append(np.frombuffer(data, dtype, int(np.prod(shape)), offset).reshape(shape))
+            offset += arrays[-1].nbytes
+
+        return state, arrays, offset
+
+
+class Saves:
+    """Saving and loading the whole game state into a compact versioned binary file"""
+    def snapshot(self, level):
+        """Copy the state of the given level, only cheap array copies are made"""
+        # Get the level's parts
+        player = level.player
+        soil = level.soil
+
+        # Single values
+        state = (level.day, level.rain_active, player.pos.x, player.pos.y, player.health, player.money,
+                 player.tool_index, player.seed_index, *level.sky.start_color, len(ITEMS), len(SEEDS),
+                 *soil.grid.shape, *level.apple_occupancy.shape)
+        # Player's items and seeds
+        values = np.array([player.items[item] for item in ITEMS] +
+                          [player.current_seeds[seed] for seed in SEEDS], np.int32)
+
+        # Soil and plant arrays
+        soil_arrays = (soil.grid.copy(), soil.plant_types(), soil.plant_stages.copy(), soil.plant_health())
+
+        # Trees' health and apples
+        tree_health = np.array([tree.health for tree in level.trees], np.int16)
+
+        return Snapshot(state, values, soil_arrays, tree_health, level.apple_occupancy.copy())
+
+    def save(self, level, path):
+        """Save the state of the given level into the file"""
+        self.write(self.snapshot(level), path)
+
+    def save_later(self, level, path, callback=None):
+        """Save the state the given level has now into the file in the background, get the task writing it"""
+        return tasks.add(self.writing(self.snapshot(level), path), settings.TASK_PRIORITIES["save"], callback,
+                         "save")
+
+    def write(self, snapshot, path):
+        """Write the snapshot into the file at once, so it's never left half-written, return the file's checksum"""
+        return complete(self.writing(snapshot, path))
+
+    def writing(self, snapshot, path):
+        """Compress the snapshot an array per step, then write it into the file at once, return the file's checksum"""
+        # Compress the state, then the soil arrays
+        compressor = zlib.compressobj(1)
+        content = bytearray(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION))
+        content += compressor.compress(snapshot.pack_state())
+        for array in snapshot.soil:
+            yield
+            content += compressor.compress(array.tobytes())
+        content += compressor.flush()
+        yield
+
+        # Write the whole file into a temporary file
+        with open(path + ".tmp", "wb") as file:
+            file.write(content)
+
+        # Replace the old file with it
+        os.replace(path + ".tmp", path)
+
+        return zlib.crc32(content)
+
+    def read(self, path):
+        """Read a snapshot from the file"""
+        # Read the file
+        with open(path, "rb") as file:
+            data = file.read()
+
+        # Read and check the header
+        magic, version = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            raise ValueError(f"{path} isn't a supported save file")
+
+        # Decompress the state
+        try:
+            data = zlib.decompress(data[SAVE_HEADER.size:])
+        except zlib.error as error:
+            raise ValueError(f"{path} is corrupted") from error
+
+        # Read everything besides the soil
+        state, (values, tree_health, apple_occupancy), offset = Snapshot.unpack_state(data, path)
+        height, width = state[-4:-2]
+
+        # Read the soil arrays one after another, copy them, so they can be changed
+        soil = []
+        for dtype in SOIL_TYPES:
+            soil.append(np.frombuffer(data, dtype, height * width, offset).reshape(height, width).copy())
+            offset += soil[-1].nbytes
+
+        return Snapshot(state, values, tuple(soil), tree_health, apple_occupancy)
+
+    def load(self, level, path):
+        """Load the state from the file into the given level, rebuilding its sprites"""
+        self.apply(self.read(path), level, path)
+
+    def apply(self, snapshot, level, path):
+        """Restore the snapshot (read from the given path) into the level, rebuilding its sprites"""
+        (day, rain_active, pos_x, pos_y, health, money, tool_index, seed_index, *sky_color,
+         items, seeds, height, width, trees, apples) = snapshot.state
+
+        # Make sure the save was made on the same map
+        if (height, width) != level.soil.grid.shape or (trees, apples) != level.apple_occupancy.shape:
+            raise ValueError(f"{path} was saved on a different map")
+
+        # Restore the level
+        level.day = day
+        level.rain_active = rain_active
+        level.soil.rain_active = rain_active
+        level.sky.start_color = sky_color
+
+        # Restore the player
+        player = level.player
+        player.place((pos_x, pos_y))
+        player.health = health
+        player.money = money
+        player.tool_index, player.seed_index = tool_index, seed_index
+        player.tool = player.tools[tool_index]
+        player.seed = player.seeds[seed_index]
+        # Update the existing dictionaries, the menu and the user's interface read them
+        player.items.update(zip(ITEMS, snapshot.values[:items].tolist()))
+        player.current_seeds.update(zip(SEEDS, snapshot.values[items:].tolist()))
+
+        # Rebuild the soil and plants
+        level.soil.restore(*snapshot.soil)
+
+        # Restore the trees and their apples
+        for tree, health in zip(level.trees, snapshot.tree_health.tolist()):
+            tree.restore(health)
+        for index in np.flatnonzero(np.any(snapshot.apple_occupancy != level.apple_occupancy, axis=1)):
+            level.trees[index].set_apples(snapshot.apple_occupancy[index])
+
+
+# Create the game's saves
+saves = Saves()
@@ -14,11 +14,99 @@ class Settings:
         # Size of one tile
         self.TILE_SIZE = 64
 
+        # Size of a world chunk in tiles and in pixels
+        self.CHUNK_SIZE = 16
+        self.CHUNK_PIXELS = self.CHUNK_SIZE * self.TILE_SIZE
+        # Amount of chunks around the screen kept loaded
+        self.CHUNK_LOAD_RANGE = 1
+        # Bytes of a chunk's pixels decompressed in a single step of its background baking
+        self.CHUNK_BAKE_STEP = 262144
+
         # Animation speed
         self.ANIMATION_SPEED = 4
 
+        # Simulation updates per second (fixed time step)
+        self.UPDATE_RATE = 60
+        # Maximum amount of simulation updates to catch up on in one rendered frame
+        self.MAX_UPDATE_STEPS = 5
+        # Rendered frames per second cap (0 means uncapped)
+        self.MAX_FPS = 120
+
+        # Priorities of the background tasks (lower ones are resumed first), time of every frame's budget left to
+        # the loop itself (in milliseconds) and frames after which waiting tasks are resumed even without time left
+        self.TASK_PRIORITIES = {"chunk": 0, "animations": 1, "soil": 2, "apples": 3, "save": 4, "warm_up": 5}
+        self.TASK_BUDGET_MARGIN = 1
+        self.TASK_STARVATION_FRAMES = 30
+
+        # Maximum amount of free objects kept for reuse by the object pools
+        self.POOL_SIZES = {
+            "particle": 32,
+            "rain_drop": 256,
+            "apple": 128
+        }
+
+        # Amount of recent frames the profiler's overlay shows, frames between its redraws and edges of its
+        # frame time histogram buckets (in milliseconds)
+        self.PROFILER_HISTORY = 300
+        self.PROFILER_REFRESH = 15
+        self.PROFILER_BUCKETS = [0, 4, 8, 12, 16.7, 20, 25, 33.3, 50, 100, 1000]
+
+        # Default mode and amount of frames of profile captures, and interval between stack samples (in seconds)
+        self.CAPTURE_MODE = "sampling"
+        self.CAPTURE_FRAMES = 300
+        self.CAPTURE_INTERVAL = 0.002
+
+        # Frames left out of the allocation counters' reports, while the caches and pools fill up
+        self.ALLOCATIONS_WARMUP = 60
+
+        # Bytes of the biggest surface shared by the surface memory accounting, bigger ones are only counted
+        self.INTERN_MAX_BYTES = 1048576
+        # Bytes of animation frames kept loaded before the least recently used ones are evicted, and a flag of
+        # loading the animations likely to be needed next in the background
+        self.ANIMATION_BUDGET = 3145728
+        self.ANIMATION_PREFETCH = True
+
+        # Quality presets from the lowest to the highest: rain drops and puddles created per update, particles
+        # flag, water animation speed multiplier and scale of the world's rendering
+        self.QUALITY_PRESETS = {
+            "low": {"rain_density": 0.3, "particles": False, "water_rate": 0.0, "render_scale": 0.5},
+            "medium": {"rain_density": 0.6, "particles": True, "water_rate": 0.5, "render_scale": 0.75},
+            "high": {"rain_density": 1.0, "particles": True, "water_rate": 1.0, "render_scale": 1.0}
+        }
+        # Starting preset of the quality governor
+        self.QUALITY_PRESET = "high"
+        # Frames the governor judges at once, slow frame time (95th percentile in milliseconds) above which it lowers
+        # the quality, one below which it raises it and amount of fast windows in a row needed to raise it
+        self.QUALITY_WINDOW = 90
+        self.QUALITY_DOWN_MS = 18.0
+        self.QUALITY_UP_MS = 12.0
+        self.QUALITY_UP_WINDOWS = 4
+
+        # Rendering backend of the window (surface or texture) and flag of the texture backend asking for an
+        # accelerated renderer, it falls back to SDL's software one if there isn't any
+        self.DISPLAY_BACKEND = "surface"
+        self.RENDERER_ACCELERATED = True
+        # Flag of the surface backend keeping the lowest, static ground-level layers between frames and scrolling
+        # them with the camera, and the layers it keeps (none of them is sorted with the moving sprites)
+        self.BACKGROUND_CACHE = True
+        self.BACKGROUND_LAYERS = ("water", "ground", "soil", "soil_water", "rain_floor", "house_bottom")
+
+        # Attempts of a farm simulation whose worker process crashes, before it's reported as crashed
+        self.FARM_ATTEMPTS = 2
+
         # File's base path
         self.BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+        # Path of the quick save file
+        self.SAVE_PATH = os.path.join(self.BASE_PATH, "../save.bin")
+        # Folder the ground's chunks are cut into once, so only the ones near the camera are ever read
+        self.WORLD_CACHE_PATH = os.path.join(self.BASE_PATH, "../cache/world")
+        # Path of the autosave file, time between autosaves (in milliseconds) and share of changed soil chunks
+        # after which the whole autosave is rewritten instead of its delta
+        self.AUTOSAVE_PATH = os.path.join(self.BASE_PATH, "../autosave.bin")
+        self.AUTOSAVE_INTERVAL = 60000
+        self.AUTOSAVE_COMPACT = 0.25
+        # Longest time quitting waits for the last autosave to be written (in milliseconds)
+        self.AUTOSAVE_CLOSE_TIMEOUT = 5000
 
         # User's interface icon positions
         self.ICON_POSITIONS = {
@@ -41,6 +129,10 @@ class Settings:
             "rain_drops": 10
         }
 
+        # Chance of an apple growing at each apple position every day (2 in 12) and health of a tree
+        self.APPLE_ODDS = (2, 12)
+        self.TREE_HEALTH = 5
+
         # Apple positions
         self.APPLE_POS = {
             "Small": [(18, 17), (30, 37), (12, 50), (30, 45), (20, 30), (30, 10)],
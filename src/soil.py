@@ -1,29 +1,44 @@
-import random
 from os.path import join as path_join
 
+import numpy as np
 import pygame
 from pygame.math import Vector2 as Vector
-from pytmx.util_pygame import load_pygame
 
 from src.utilities import utilities
 from src.settings import settings
 from src.timer import Timer
+from src.rng import rng
+from src.tasks import tasks
+
+
+# Flags of a soil grid cell
+FARMABLE = 1
+HIT = 2
+WATERED = 4
+PLANTED = 8
+
+# Types of plants, their index plus one is their code in saved plant arrays (zero means no plant)
+PLANT_TYPES = ("corn", "tomato")
 
 
 class Soil:
     """Class that represents soil path"""
 
-    def __init__(self, sprites, collision_sprites):
-        """Initialize the soil"""
-        # Get all the game's visible sprites
+    def __init__(self, sprites, collision_sprites, map_data):
+        """Initialize the soil on the given tmx map"""
+        # Get all the game's visible sprites and static tiles
         self.sprites = sprites
+        self.tiles = sprites.tiles
         # Access the collision sprites
         self.collision_sprites = collision_sprites
 
-        # Soil sprites
-        self.soil_sprites = pygame.sprite.Group()
-        # Watered soil sprites
-        self.watered_soil_sprites = pygame.sprite.Group()
+        # Soil tiles by their tile (row and column)
+        self.soil_tiles = {}
+        # Tiles whose soil type has to be picked again (ordered set) and the task picking them
+        self.retile_cells = {}
+        self.retile_task = None
+        # Watered soil tiles
+        self.water_tiles = []
         # Plant sprites
         self.plant_sprites = pygame.sprite.Group()
 
@@ -32,7 +47,7 @@ class Soil:
         self.water_surfaces = utilities.load_folder("../graphics/soil_water")
 
         # Create the grid
-        self._create_grid()
+        self._create_grid(map_data)
         # Create farmable rectangles based off the grid
         self._create_farmable_rects()
 
@@ -44,42 +59,44 @@ class Soil:
         self.hoe_sound.set_volume(0.1)
         self.plant_sound.set_volume(0.4)
 
-    def _create_grid(self):
+    def _create_grid(self, map_data):
         """Create a grid of soil"""
-        # Get map's surface to get the size
-        map_surface = utilities.load("../graphics/world/ground.png")
         # Dimensions of the map in tiles
-        width = map_surface.get_width() // settings.TILE_SIZE
-        height = map_surface.get_height() // settings.TILE_SIZE
+        width = map_data.width
+        height = map_data.height
+
+        # Create the map grid, every cell holds the flags of its tile
+        self.grid = np.zeros((height, width), np.uint8)
 
-        # Create the map grid list (list of rows with empty list of columns)
-        self.grid = [[[] for column in range(width)] for row in range(height)]
+        # Plant's growth stage, growth speed and maximum stage at every tile
+        self.plant_stages = np.zeros((height, width))
+        self.plant_speeds = np.zeros((height, width))
+        self.plant_max_stages = np.zeros((height, width))
+        # Plant sprites by their tile (row and column)
+        self.plants = {}
+        # Plants ready to harvest by their tile
+        self.harvestable_plants = {}
 
         # Set which grid tiles are farmable by going through the map
-        for pos_x, pos_y, surface in (load_pygame(path_join(settings.BASE_PATH,
-                                      "../data/map.tmx")).get_layer_by_name("Farmable").tiles()):
-            # Set the tile as farmable, by appending 'x' to indicate that
-            self.grid[pos_y][pos_x].append('x')
+        for pos_x, pos_y, surface in map_data.get_layer_by_name("Farmable").tiles():
+            # Set the tile as farmable
+            self.grid[pos_y, pos_x] |= FARMABLE
 
     def _create_farmable_rects(self):
         """Create a list of farmable tile rectangles"""
         # Prepare the list
         self.farmable_rects = []
 
-        # Go through each row in the grid
-        for row_index, row in enumerate(self.grid):
-            # Check every column
-            for column_index, cell in enumerate(row):
-                # If the cell is farmable, append it
-                if 'x' in cell:
-                    # Calculate its position in pixels
-                    pos_x = column_index * settings.TILE_SIZE
-                    pos_y = row_index * settings.TILE_SIZE
-                    # Create a rectangle with that position
-                    rect = pygame.Rect(pos_x, pos_y, settings.TILE_SIZE, settings.TILE_SIZE)
-
-                    # Append it to the list
-                    self.farmable_rects.append(rect)
+        # Go through each farmable cell in the grid
+        for row_index, column_index in np.argwhere(self.grid & FARMABLE):
+            # Calculate its position in pixels
+            pos_x = column_index * settings.TILE_SIZE
+            pos_y = row_index * settings.TILE_SIZE
+            # Create a rectangle with that position
+            rect = pygame.Rect(pos_x, pos_y, settings.TILE_SIZE, settings.TILE_SIZE)
+
+            # Append it to the list
+            self.farmable_rects.append(rect)
 
     def handle_hit(self, point):
         """Handle farmable tile getting hit"""
@@ -91,9 +108,9 @@ class Soil:
                 pos_y = rect.y // settings.TILE_SIZE
 
                 # Check if the hit point is still farmable
-                if 'x' in self.grid[pos_y][pos_x]:
+                if self.grid[pos_y, pos_x] & FARMABLE:
                     # Change the tile into hit one
-                    self.grid[pos_y][pos_x].append("H")
+                    self.grid[pos_y, pos_x] |= HIT
 
                     # Play the hit sound effect
                     self.hoe_sound.play()
@@ -106,132 +123,239 @@ class Soil:
                         self.water_all()
 
     def _create_soil_tiles(self):
-        """Create soil tiles in places where the player hit with a hoe"""
-        # Clean the current soil sprites
-        self.soil_sprites.empty()
-
-        # Check every row and column in the grid
-        for row_index, row in enumerate(self.grid):
-            for column_index, cell in enumerate(row):
-                # If cell was hit
-                if 'H' in cell:
-                    soil_type = self._get_soil_type(row_index, row, column_index)
-                    
-                    # Calculate position in pixels
-                    pos_x = column_index * settings.TILE_SIZE
-                    pos_y = row_index * settings.TILE_SIZE
-                    # Create the soil tile
-                    SoilTile((pos_x, pos_y), self.surfaces[soil_type],
-                             [self.sprites, self.soil_sprites])
+        """Create soil tiles in places where the player hit with a hoe, picking their and their neighbours' types
+        in the background"""
+        # Check every cell in the grid that was hit, but doesn't have a tile yet
+        for row_index, column_index in np.argwhere(self.grid & HIT):
+            if (row_index, column_index) in self.soil_tiles:
+                continue
+
+            # Calculate position in pixels
+            pos_x = column_index * settings.TILE_SIZE
+            pos_y = row_index * settings.TILE_SIZE
+            # Create the soil tile, with the lone tile's type until its type is picked
+            self.soil_tiles[(row_index, column_index)] = self.tiles.add((pos_x, pos_y), self.surfaces['o'],
+                                                                        settings.DEPTHS["soil"])
+
+            # Pick the types of it and the tiles next to it again
+            for offset_y, offset_x in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                self.retile_cells[(row_index + offset_y, column_index + offset_x)] = None
+
+        # Start picking the types, if they aren't being picked already
+        if self.retile_cells and not (self.retile_task and self.retile_task.pending):
+            self.retile_task = tasks.add(self._retile(), settings.TASK_PRIORITIES["soil"], name="soil retiling")
+
+    def _retile(self):
+        """Pick the soil types of the waiting tiles, one tile per step"""
+        while self.retile_cells:
+            # Take the oldest waiting tile
+            cell = next(iter(self.retile_cells))
+            del self.retile_cells[cell]
+
+            # Change its image if it exists, the type depends only on the grid, so tiles can be picked in any order
+            tile = self.soil_tiles.get(cell)
+            if tile:
+                tile.image = self.surfaces[self._get_soil_type(*cell)]
+                yield
 
     def plant(self, seed, target):
         """Plant the specified seed at the target position"""
-        # Search for a soil that is the target
-        for soil in self.soil_sprites.sprites():
-            if soil.rect.collidepoint(target):
-                # Get the soil's position in tiles
-                pos_x = soil.rect.x // settings.TILE_SIZE
-                pos_y = soil.rect.y // settings.TILE_SIZE
+        # Get the soil tile at the target position
+        pos_x = int(target[0]) // settings.TILE_SIZE
+        pos_y = int(target[1]) // settings.TILE_SIZE
+        soil = self.soil_tiles.get((pos_y, pos_x))
 
-                # If there isn't any plant at this tile, plant it
-                if 'P' not in self.grid[pos_y][pos_x]:
-                    # Append the plant flag to the soil
-                    self.grid[pos_y][pos_x].append('P')
+        # If there is a soil without any plant at this tile, plant it
+        if soil and not self.grid[pos_y, pos_x] & PLANTED:
+            # Set the plant flag of the soil
+            self.grid[pos_y, pos_x] |= PLANTED
 
-                    # Play the plant sound effect
-                    self.plant_sound.play()
+            # Play the plant sound effect
+            self.plant_sound.play()
 
-                    # Create a plant
-                    Plant(seed, [self.sprites, self.plant_sprites, self.collision_sprites], soil,
-                          self._watered, self._remove_plant)
+            # Create a plant
+            plant = Plant(seed, [self.sprites, self.plant_sprites, self.collision_sprites], soil,
+                          self._remove_plant)
 
-    def update_plants(self):
-        """Update plant stages"""
-        for plant in self.plant_sprites:
-            plant.grow()
+            # Save it and its growth parameters at its tile
+            self.plants[plant.tile] = plant
+            self.plant_stages[plant.tile] = 0
+            self.plant_speeds[plant.tile] = plant.growth_speed
+            self.plant_max_stages[plant.tile] = plant.max_stage
 
-    def check_plants(self, player_hitbox):
-        """Check if plants are fine"""
-        # Check every plant
-        for plant in self.plant_sprites.sprites():
+    def update_plants(self):
+        """Grow all the watered plants at once, update sprites of only those whose visible stage changed"""
+        # Plants that are watered and not fully grown yet
+        growing = ((self.grid & (PLANTED | WATERED)) == (PLANTED | WATERED)) & \
+                  (self.plant_stages < self.plant_max_stages)
+
+        # Remember the current visible stages
+        old_stages = self.plant_stages.astype(int)
+
+        # Grow them, don't let them grow past the maximum stage
+        self.plant_stages[growing] = np.minimum(self.plant_stages + self.plant_speeds,
+                                                self.plant_max_stages)[growing]
+
+        # Plants whose frame changed (reaching the maximum stage always changes it)
+        changed = growing & (self.plant_stages.astype(int) != old_stages)
+
+        # Update only these plant sprites
+        for row, column in np.argwhere(changed):
+            plant = self.plants[(row, column)]
+            plant.set_stage(self.plant_stages[row, column])
+
+            # Remember it if it's ready to harvest
+            if plant.harvestable:
+                self.harvestable_plants[plant.tile] = plant
+
+    def check_plants(self, player):
+        """Check if plants near the player are fine"""
+        # Check every plant in the tiles around the player
+        for plant in self.plants_near(player.hitbox):
             # Update it
-            plant.check(player_hitbox)
+            plant.check(player)
+
+    def plants_near(self, rect, harvestable=False):
+        """Get the plants (or only the harvestable ones) in the tiles the rectangle touches and around them"""
+        # Plants to search through
+        plants = self.harvestable_plants if harvestable else self.plants
+
+        # Range of tiles touched by the rectangle, with one neighbouring tile on each side
+        left = rect.left // settings.TILE_SIZE - 1
+        right = rect.right // settings.TILE_SIZE + 1
+        top = rect.top // settings.TILE_SIZE - 1
+        bottom = rect.bottom // settings.TILE_SIZE + 1
+
+        # Collect the plants in these tiles
+        return [plants[(row, column)] for row in range(top, bottom + 1) for column in range(left, right + 1)
+                if (row, column) in plants]
 
     def _remove_plant(self, pos):
         """Remove plant from specified position"""
         # Calculate tile position
         pos_x = pos[0] // settings.TILE_SIZE
         pos_y = pos[1] // settings.TILE_SIZE
-        # Get soil at the calculated position
-        soil = self.grid[pos_y][pos_x]
 
         # Remove the plant from the soil
-        soil.remove('P')
+        self.grid[pos_y, pos_x] &= ~np.uint8(PLANTED)
+
+        # Forget it and its growth
+        del self.plants[(pos_y, pos_x)]
+        self.harvestable_plants.pop((pos_y, pos_x), None)
+        self.plant_stages[pos_y, pos_x] = 0
+        self.plant_speeds[pos_y, pos_x] = 0
+        self.plant_max_stages[pos_y, pos_x] = 0
+
+    def plant_types(self):
+        """Get an array of plant type codes at every tile"""
+        types = np.zeros(self.grid.shape, np.uint8)
+        # Set the code of every plant
+        for tile, plant in self.plants.items():
+            types[tile] = PLANT_TYPES.index(plant.plant_type) + 1
+
+        return types
+
+    def plant_health(self):
+        """Get an array of plant health at every tile"""
+        health = np.zeros(self.grid.shape, np.int8)
+        # Set the health of every plant
+        for tile, plant in self.plants.items():
+            health[tile] = plant.health
+
+        return health
+
+    def restore(self, grid, plant_types, plant_stages, plant_health):
+        """Replace the whole soil state, rebuilding its tiles and plant sprites in bulk"""
+        # Destroy the current plants
+        for plant in self.plant_sprites.sprites():
+            plant.kill()
+        self.plants = {}
+        self.harvestable_plants = {}
+
+        # Copy the arrays, plants' growth parameters are set while creating them
+        self.grid[:] = grid
+        self.plant_stages[:] = plant_stages
+        self.plant_speeds[:] = 0
+        self.plant_max_stages[:] = 0
+
+        # Rebuild the soil tiles
+        self.tiles.remove_all(self.soil_tiles.values())
+        self.soil_tiles = {}
+        self._create_soil_tiles()
+
+        # Rebuild the soil water tiles
+        self.tiles.remove_all(self.water_tiles)
+        self.water_tiles = [self.tiles.add((column_index * settings.TILE_SIZE, row_index * settings.TILE_SIZE),
+                                           rng.stream("soil").choice(self.water_surfaces),
+                                           settings.DEPTHS["soil_water"])
+                            for row_index, column_index in np.argwhere((self.grid & (HIT | WATERED)) ==
+                                                                       (HIT | WATERED))]
+
+        # Rebuild the plants
+        for row_index, column_index in np.argwhere(plant_types):
+            tile = (row_index, column_index)
+            plant = Plant(PLANT_TYPES[plant_types[tile] - 1], [self.sprites, self.plant_sprites,
+                          self.collision_sprites], self.soil_tiles[tile], self._remove_plant)
+
+            # Set its growth and health
+            plant.set_stage(plant_stages[tile])
+            plant.health = int(plant_health[tile])
+
+            # Save it
+            self.plants[plant.tile] = plant
+            self.plant_speeds[tile] = plant.growth_speed
+            self.plant_max_stages[tile] = plant.max_stage
+            if plant.harvestable:
+                self.harvestable_plants[plant.tile] = plant
 
     def water(self, target):
         """Water the soil in the given position"""
-        # Go through each of the soil tiles, check which one is the target
-        for soil in self.soil_sprites.sprites():
-            if soil.rect.collidepoint(target):
-                # Get the position in tiles
-                pos_x = soil.rect.x // settings.TILE_SIZE
-                pos_y = soil.rect.y // settings.TILE_SIZE
-                # Mark the soil as watered
-                self.grid[pos_y][pos_x].append("W")
-
-                # Get position from the soil
-                pos = soil.rect.topleft
-                # Set a random surface
-                surface = random.choice(self.water_surfaces)
-
-                # Create the soil water tile
-                SoilWaterTile(pos, surface, [self.sprites, self.watered_soil_sprites])
+        # Get the soil tile at the target position
+        pos_x = int(target[0]) // settings.TILE_SIZE
+        pos_y = int(target[1]) // settings.TILE_SIZE
+        soil = self.soil_tiles.get((pos_y, pos_x))
+
+        # If there is a soil that isn't watered already, water it
+        if soil and not self.grid[pos_y, pos_x] & WATERED:
+            # Mark the soil as watered
+            self.grid[pos_y, pos_x] |= WATERED
+
+            # Get position from the soil
+            pos = soil.rect.topleft
+            # Set a random surface
+            surface = rng.stream("soil").choice(self.water_surfaces)
+
+            # Create the soil water tile
+            self.water_tiles.append(self.tiles.add(pos, surface, settings.DEPTHS["soil_water"]))
 
     def water_all(self):
         """Water all the soil tiles"""
-        # Go through each soil tile
-        for row_index, row in enumerate(self.grid):
-            for column_index, cell in enumerate(row):
-                # If the soil is hit and isn't watered already, water it
-                if 'H' in cell and 'W' not in cell:
-                    # Set the watered flag
-                    cell.append('W')
-                    # Create the soil water tile
-                    SoilWaterTile((column_index * settings.TILE_SIZE, row_index * settings.TILE_SIZE),
-                                  random.choice(self.water_surfaces),
-                                  [self.sprites, self.watered_soil_sprites])
+        # Go through each soil tile that is hit and isn't watered already
+        for row_index, column_index in np.argwhere((self.grid & (HIT | WATERED)) == HIT):
+            # Create the soil water tile
+            self.water_tiles.append(self.tiles.add((column_index * settings.TILE_SIZE, row_index * settings.TILE_SIZE),
+                                                   rng.stream("soil").choice(self.water_surfaces),
+                                                   settings.DEPTHS["soil_water"]))
+
+        # Set the watered flag of all hit tiles
+        self.grid[(self.grid & HIT) != 0] |= WATERED
 
     def remove_water(self):
         """Remove the water from soil tiles"""
-        # Go through each of soil sprite and destroy it
-        for water_sprite in self.watered_soil_sprites.sprites():
-            water_sprite.kill()
-
-        # Check the grid
-        for row in self.grid:
-            for cell in row:
-                # If there is a watered tile, remove the water flag
-                if 'W' in cell:
-                    cell.remove('W')
-
-    def _watered(self, pos):
-        """Return if the soil from the given position is watered"""
-        # Calculate position in tiles
-        pos_x = pos[0] // settings.TILE_SIZE
-        pos_y = pos[1] // settings.TILE_SIZE
-        # Get soil at this position
-        soil = self.grid[pos_y][pos_x]
+        # Destroy all the soil water tiles
+        self.tiles.remove_all(self.water_tiles)
+        self.water_tiles = []
 
-        # Return if the soil has a watered flag
-        return 'W' in soil
+        # Remove the water flag from the whole grid
+        self.grid &= ~np.uint8(WATERED)
 
-    def _get_soil_type(self, row_index, row, column_index):
+    def _get_soil_type(self, row_index, column_index):
         """Get the type of soil to place depending on the near hit farmable tiles"""
         # Get the near hit tiles
-        top = 'H' in self.grid[row_index - 1][column_index]
-        bottom = 'H' in self.grid[row_index + 1][column_index]
-        left = 'H' in row[column_index - 1]
-        right = 'H' in row[column_index + 1]
+        top = bool(self.grid[row_index - 1, column_index] & HIT)
+        bottom = bool(self.grid[row_index + 1, column_index] & HIT)
+        left = bool(self.grid[row_index, column_index - 1] & HIT)
+        right = bool(self.grid[row_index, column_index + 1] & HIT)
 
         # Current soil type
         soil_type = 'o'
@@ -294,53 +418,31 @@ class Soil:
         return soil_type
 
 
-class SoilTile(pygame.sprite.Sprite):
-    """A single soil tile"""
-    def __init__(self, pos, surface, group):
-        """Initialize the soil tile"""
-        super().__init__(group)
-
-        # Get the image and its rectangle, place it in the correct position
-        self.image = surface
-        self.rect = self.image.get_rect(topleft=pos)
-
-        # Set the depth position as soil value
-        self.pos_z = settings.DEPTHS["soil"]
-
-
-class SoilWaterTile(pygame.sprite.Sprite):
-    """Tile of soil that has been watered"""
-    def __init__(self, pos, surface, group):
-        """Initialize the watered soil"""
-        super().__init__(group)
-
-        # Set the image and its rectangle, place it correctly
-        self.image = surface
-        self.rect = self.image.get_rect(topleft=pos)
-
-        # Set the depth position
-        self.pos_z = settings.DEPTHS["soil_water"]
-
-
 class Plant(pygame.sprite.Sprite):
     """Plant that can be planted on the soil"""
-    def __init__(self, plant_type, group, soil, watered, remove_plant):
+    # Animation frames of every plant type
+    frames_by_type = {}
+
+    def __init__(self, plant_type, group, soil, remove_plant):
         """Initialize the plant"""
         super().__init__(group)
 
         # Save the plant type
         self.plant_type = plant_type
-        # Save the soil that plant's on
+        # Save the soil that plant's on and its tile (row and column)
         self.soil = soil
+        self.tile = (soil.rect.y // settings.TILE_SIZE, soil.rect.x // settings.TILE_SIZE)
 
         # Harvestable flag
         self.harvestable = False
+        # Grown flag (grown plants have hitboxes and can't be stepped on)
+        self.grown = False
 
         # Depth position of it
         self.pos_z = settings.DEPTHS["plant"]
 
-        # Import animation frames based off the type
-        self.frames = utilities.load_folder(f"../graphics/fruit/{plant_type}")
+        # Import animation frames based off the type, once for all the plants of the type
+        self.frames = self.load_frames(plant_type)
 
         # Plant's growth stage
         self.stage = 0
@@ -359,50 +461,57 @@ class Plant(pygame.sprite.Sprite):
         # Health of a plant depending on the type
         self.health = 1 if plant_type == "corn" else 2
 
-        # Check if the soil is watered function
-        self.watered = watered
         # Remove plant function
         self.remove_plant = remove_plant
 
+        # Time the plant can't be stepped on again, it's awake and updated only while it runs
         self.damage_cooldown = Timer(1000)
 
-    def grow(self):
-        """Grow the plant if conditions are true"""
-        # Check if plant soil was watered
-        if self.watered(self.rect.center):
-            # If plant isn't yet ready for harvest
-            if not self.harvestable:
-                # Increase the stage of growth
-                self.stage += self.growth_speed
-
-                # If plant started to grow, change its depth
-                if int(self.stage) > 0:
-                    self.pos_z = settings.DEPTHS["main"]
-                    # Set its hitboxes
-                    self.hitbox = self.rect.copy().inflate(-25, -self.rect.height * 0.4)
-
-                # If plant is already fully grown, don't grow it anymore
-                if self.stage >= self.max_stage:
-                    self.stage = self.max_stage
-                    # Indicate that the plant is ready to harvest
-                    self.harvestable = True
-
-                # If there are still frames left
-                if int(self.stage) <= len(self.frames) - 1:
-                    # Try to get a new image depending on the stage, and update the rectangle
-                    self.image = self.frames[int(self.stage)]
-                    self.rect = self.image.get_rect(midbottom=self.soil.rect.midbottom + Vector(0, self.offset_y))
-
-    def check(self, player_hitbox):
+    @classmethod
+    def load_frames(cls, plant_type):
+        """Get the animation frames of the plant type, importing them only the first time"""
+        if plant_type not in cls.frames_by_type:
+            cls.frames_by_type[plant_type] = utilities.load_folder(f"../graphics/fruit/{plant_type}")
+
+        return cls.frames_by_type[plant_type]
+
+    def set_stage(self, stage):
+        """Set the plant's growth stage, updating its image"""
+        # Save the stage
+        self.stage = float(stage)
+
+        # Get a new image depending on the stage, and update the rectangle
+        self.image = self.frames[int(self.stage)]
+        self.rect = self.image.get_rect(midbottom=self.soil.rect.midbottom + Vector(0, self.offset_y))
+
+        # If plant started to grow, change its depth
+        if int(self.stage) > 0:
+            self.grown = True
+            self.pos_z = settings.DEPTHS["main"]
+            # Set its hitboxes from the new stage's rectangle, so they don't depend on the stages it went through
+            self.hitbox = self.rect.copy().inflate(-25, -self.rect.height * 0.4)
+
+        # If plant is already fully grown, indicate that it's ready to harvest
+        if self.stage >= self.max_stage:
+            self.harvestable = True
+
+    def update(self, delta_time):
+        """Wait for the damage cooldown, fall asleep once it's over"""
+        self.damage_cooldown.update()
+        if not self.damage_cooldown.active:
+            self.groups()[0].sleep(self)
+
+    def check(self, player):
         """Update the plant"""
         # If there isn't active cooldown
-        if not self.damage_cooldown.active and not hasattr(self, "hitbox"):
+        if not self.damage_cooldown.active and not self.grown:
             # Check if player stepped on non-grown plant
-            if player_hitbox.hitbox.colliderect(self.rect):
+            if player.hitbox.colliderect(self.rect):
                 # Damage the plant
                 self.health -= 1
-                # Start the damage cooldown
+                # Start the damage cooldown, wake the plant up to wait for it
                 self.damage_cooldown.start()
+                self.groups()[0].wake(self)
 
                 # If plant was stepped on too much, kill it
                 if self.health == 0:
@@ -1,4 +1,3 @@
-import random
 from os.path import join as path_join
 
 import pygame
@@ -6,10 +5,19 @@ import pygame
 from src.settings import settings
 from src.utilities import utilities
 from src.timer import Timer
+from src.rng import rng
+from src.pool import Pool
+from src.tiles import Tile
+from src.quality import quality
+from src.tasks import tasks
+from src.memory import memory
 
 
 class Sprite(pygame.sprite.Sprite):
     """Regular sprite"""
+    # Sprites with per-frame work are awake, camera group updates only them
+    awake = False
+
     def __init__(self, pos, surface, group, pos_z=settings.DEPTHS["main"]):
         """Initialize the sprite"""
         super().__init__(group)
@@ -72,33 +80,34 @@ class Water(Sprite):
     """Water sprite class"""
     def __init__(self, pos, frames, group):
         """Create the water"""
+        # Initialize the parent sprite with the first frame, water animation changes it
+        super().__init__(pos, frames[0], group, settings.DEPTHS["water"])
+
+
+class WaterAnimation:
+    """Animation shared by all the water sprites, changing their images only when the frame changes"""
+    def __init__(self, frames):
+        """Prepare the water animation"""
         # Save the frames, set the current one
         self.frames = frames
         self.frame = 0
 
-        # Initialize the parent sprite with the current frame
-        super().__init__(pos, self.frames[self.frame], group, settings.DEPTHS["water"])
+        # Animated water sprites
+        self.sprites = []
 
     def update(self, delta_time):
-        """Update water"""
-        self._animate(delta_time)
-
-    def _animate(self, delta_time):
-        """Animate the water"""
-        # Increase the frame
-        self.frame += (settings.ANIMATION_SPEED + 1) * delta_time
-        # Set current frame as the image
-        self.image = self.frames[int(self.frame) % len(self.frames)]
-
+        """Update the water animation"""
+        # Get the currently shown frame
+        current_frame = int(self.frame) % len(self.frames)
 
-class Flower(Sprite):
-    """Single flower"""
-    def __init__(self, pos, surface, group):
-        """Initialize the flower"""
-        super().__init__(pos, surface, group)
+        # Increase the frame, as fast as the current quality allows
+        self.frame += (settings.ANIMATION_SPEED + 1) * delta_time * quality.water_rate
 
-        # Get flower's hitboxes
-        self.hitbox = self.rect.copy().inflate(-20, -self.rect.height * 0.9)
+        # If the shown frame changed, set it as the image of every water sprite
+        if int(self.frame) % len(self.frames) != current_frame:
+            image = self.frames[int(self.frame) % len(self.frames)]
+            for water in self.sprites:
+                water.image = image
 
 
 class Tree(Sprite):
@@ -112,69 +121,135 @@ class Tree(Sprite):
         self.apple_pos = settings.APPLE_POS[name]
 
         # Tree's health and alive flag
-        self.health = 5
+        self.health = settings.TREE_HEALTH
         self.alive = True
 
         # Get stump's image name depending on the tree size
         stump_name = "small" if name == "Small" else "large"
         # Tree stump surface
         self.stump = utilities.load(f"../graphics/stumps/{stump_name}.png")
+        # Standing tree surface
+        self.tree_surface = surface
 
-        # Sprite group of apples of this tree
-        self.apple_sprites = pygame.sprite.Group()
-        # Create them
-        self.create_apples()
+        # Apple tile at each of the apple positions (None if there isn't one)
+        self.apples = [None] * len(self.apple_pos)
+        # Occupancy of the apple positions, set by the level to a row of its occupancy array
+        self.apple_occupancy = [False] * len(self.apple_pos)
+        # Task growing and removing the apple tiles to match the occupancy
+        self.apple_task = None
 
         # Allow player to obtain items
         self.obtain_item = obtain_item
 
-        # Time of invincibility
-        self.dodge_time = Timer(200)
-
         # Axe hit sound
         self.axe_sound = pygame.mixer.Sound(path_join(settings.BASE_PATH, "../audio/axe.mp3"))
         self.axe_sound.set_volume(0.5)
 
-    def update(self, delta_time):
-        """Update the tree"""
-        # Check and handle tree's death if it's still alive
-        if self.alive:
-            self._check_destroy()
-
     def handle_damage(self):
         """Handle tree getting damaged"""
         # Decrease the health
         self.health -= 1
 
+        # Check and handle tree's death if it's still alive
+        if self.alive:
+            self._check_destroy()
+
         # Play the sound effect
         self.axe_sound.play()
 
+        # Finish growing the apples first, so there are the same ones to pick from however fast they were growing
+        if self.apple_task:
+            tasks.finish(self.apple_task)
+
+        # Get positions of the current apples
+        apple_indexes = [index for index, apple in enumerate(self.apples) if apple]
+
         # If there are any apples, try to remove a random one
-        if len(self.apple_sprites.sprites()) > 0:
+        if apple_indexes:
             # Choose a random apple
-            apple = random.choice(self.apple_sprites.sprites())
+            index = rng.stream("trees").choice(apple_indexes)
+            apple = self.apples[index]
 
             # Generate a particle
-            Particle(apple.rect.topleft, apple.image, self.groups()[0], settings.DEPTHS["fruit"])
+            spawn_particle(apple.rect.topleft, apple.image, self.groups()[0], settings.DEPTHS["fruit"])
 
             # Add apple to the player's items
             self.obtain_item("apple")
-            # Destroy the apple
-            apple.kill()
-
-    def create_apples(self):
-        """Create apples on the tree"""
-        # Go through each apple position possible
-        for pos in self.apple_pos:
-            # Generate the apple randomly
-            if random.randint(0, 11) < 2:
-                Sprite((pos[0] + self.rect.left, pos[1] + self.rect.top),
-                       self.apple_surface, [self.groups()[0], self.apple_sprites], settings.DEPTHS["fruit"])
-
-    def destroy_apples(self):
-        """Destroy all the current apples"""
-        for apple in self.apple_sprites:
-            apple.kill()
+            # Destroy the apple, free its position
+            self.groups()[0].tiles.remove(apple)
+            apple_tiles.release(apple)
+            self.apples[index] = None
+            self.apple_occupancy[index] = False
+
+    def set_apples(self, occupancy):
+        """Grow or remove apples right away, so that only the given positions have one"""
+        # Stop growing the previous apples
+        if self.apple_task:
+            tasks.cancel(self.apple_task)
+            self.apple_task = None
+
+        # Save the occupancy and update every apple position, going through plain booleans (indexing the array one
+        # element at a time is several times slower)
+        self.apple_occupancy[:] = occupancy
+        for index, occupied in enumerate(occupancy.tolist()[:len(self.apple_pos)]):
+            self._place_apple(index, occupied)
+
+    def grow_apples(self, occupancy):
+        """Grow or remove apples in the background, so that only the given positions have one"""
+        # Without tasks spread over frames (headless simulations) there's nothing to wait for, skip the task
+        if not tasks.enabled:
+            self.set_apples(occupancy)
+            return
+
+        # Stop growing the previous apples
+        if self.apple_task:
+            tasks.cancel(self.apple_task)
+
+        # Save the occupancy right away, only the apple tiles follow it later
+        self.apple_occupancy[:] = occupancy
+        self.apple_task = tasks.add(self._place_apples(occupancy.tolist()), settings.TASK_PRIORITIES["apples"],
+                                    name="apples")
+
+    def _place_apples(self, occupancy):
+        """Create and destroy the apple tiles to match the occupancy, one apple per step"""
+        for index in range(len(self.apple_pos)):
+            if self._place_apple(index, occupancy[index]):
+                yield
+
+    def _place_apple(self, index, occupied):
+        """Create or destroy the apple tile at the position to match its occupancy, return whether it changed"""
+        # If there should be an apple and there isn't one, create it
+        if occupied and not self.apples[index]:
+            pos = self.apple_pos[index]
+            self.apples[index] = apple_tiles.acquire((pos[0] + self.rect.left, pos[1] + self.rect.top),
+                                                     self.apple_surface, settings.DEPTHS["fruit"], None)
+            self.groups()[0].tiles.insert(self.apples[index])
+            return True
+        # If there shouldn't be one, but there is, destroy it
+        if not occupied and self.apples[index]:
+            self.groups()[0].tiles.remove(self.apples[index])
+            apple_tiles.release(self.apples[index])
+            self.apples[index] = None
+            return True
+
+        return False
+
+    def restore(self, health):
+        """Set the tree's health, turning it into a stump or back into a tree without any rewards"""
+        self.health = health
+
+        # If the tree is destroyed, but still standing, replace it with a stump
+        if self.health <= 0 and self.alive:
+            self.alive = False
+            self.image = self.stump
+            self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
+            self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+        # If it's alive, but a stump, grow it back
+        elif self.health > 0 and not self.alive:
+            self.alive = True
+            self.image = self.tree_surface
+            self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
+            self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
 
     def _check_destroy(self):
         """Check if tree is destroyed, handle it"""
@@ -185,7 +260,7 @@ class Tree(Sprite):
             self.obtain_item("wood")
 
             # Create a particle
-            Particle(self.rect.topleft, self.image, self.groups()[0], self.pos_z)
+            spawn_particle(self.rect.topleft, self.image, self.groups()[0], self.pos_z)
 
             # Replace the tree's image with a stump one, get its rect and hitboxes
             self.image = self.stump
@@ -195,6 +270,12 @@ class Tree(Sprite):
 
 class Particle(Sprite):
     """Class representing a single particle type mask"""
+    # Particles wait for their alive timer every frame
+    awake = True
+
+    # White masks of the surfaces particles were made from
+    masks = {}
+
     def __init__(self, pos, surface, group, pos_z, duration=150):
         """Initialize the particle mask"""
         super().__init__(pos, surface, group, pos_z)
@@ -202,19 +283,54 @@ class Particle(Sprite):
         # Particle alive timer
         self.timer = Timer(duration)
 
-        # White mask created from the image surface
-        self.image = pygame.mask.from_surface(self.image).to_surface()
-        # Set the color key, to get rid of the black part of mask
-        self.image.set_colorkey("black")
+        # Set the particle up
+        self.reset(pos, surface, group, pos_z, duration)
+
+    def reset(self, pos, surface, group, pos_z, duration=150):
+        """Set the particle up, reusing it for a new mask"""
+        # Set the surface's mask as the image, place it in the given position
+        self.image = self.mask(surface)
+        self.rect = self.image.get_rect(topleft=pos)
+        # Set its depth position
+        self.pos_z = pos_z
 
         # Start the alive timer
+        self.timer.duration = duration
         self.timer.start()
 
+        # Show it
+        self.add(group)
+
+    @classmethod
+    def mask(cls, surface):
+        """Get the white mask of the surface, creating it only the first time"""
+        if surface not in cls.masks:
+            # White mask created from the image surface
+            mask = pygame.mask.from_surface(surface).to_surface()
+            # Set the color key, to get rid of the black part of mask
+            mask.set_colorkey("black")
+
+            cls.masks[surface] = memory.track(mask, "particles")
+
+        return cls.masks[surface]
+
     def update(self, delta_time):
         """Update the particle mask"""
         # Update timer
         self.timer.update()
 
-        # If the particle duration ended, destroy the particle mask
+        # If the particle duration ended, destroy the particle mask and give it back for reuse
         if not self.timer.active:
             self.kill()
+            particles.release(self)
+
+
+# Pools of particles and apple tiles
+particles = Pool(Particle, settings.POOL_SIZES["particle"])
+apple_tiles = Pool(Tile, settings.POOL_SIZES["apple"])
+
+
+def spawn_particle(pos, surface, group, pos_z):
+    """Spawn a particle, unless the current quality turns them off"""
+    if quality.particles:
+        particles.acquire(pos, surface, group, pos_z)
@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import time
+
+from src.settings import settings
+from src.profiler import profiler
+
+
+class Task:
+    """Piece of work written as a generator, resumed a step at a time until it returns"""
+    def __init__(self, generator, priority, callback, name):
+        """Create the task"""
+        # Generator of the work, its priority (lower ones are resumed first) and its name
+        self.generator = generator
+        self.priority = priority
+        self.name = name
+        # Function called with the task's result once it finishes
+        self.callback = callback
+
+        # Finished and cancelled flags, value the generator returned
+        self.done = False
+        self.cancelled = False
+        self.result = None
+
+    @property
+    def pending(self):
+        """Check if the task still has work to do"""
+        return not self.done and not self.cancelled
+
+    def step(self):
+        """Resume the task once, return True if it finished"""
+        try:
+            next(self.generator)
+        except StopIteration as stop:
+            # Save the result and report it
+            self.done = True
+            self.result = stop.value
+            if self.callback:
+                self.callback(self.result)
+            return True
+
+        return False
+
+
+def complete(generator):
+    """Run a generator task to its end at once, get the value it returned"""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
+
+
+class Scheduler:
+    """Cooperative scheduler, resuming background tasks only while the frame's time budget has time left"""
+    def __init__(self):
+        """Create the scheduler, it's disabled until the game's loop enables it"""
+        # Flag of spreading the tasks over frames, while it's off tasks run at once (headless simulations)
+        self.enabled = False
+
+        # Waiting tasks ordered by their priority, then by the order they were added in
+        self.queue = []
+        self.counter = itertools.count()
+
+        # Frames in a row that no task could be resumed in
+        self.starved = 0
+        # Time spent on the tasks in the last frame (in milliseconds)
+        self.spent = 0
+
+    def add(self, generator, priority=0, callback=None, name="task"):
+        """Add a task running the generator, the callback gets its result"""
+        task = Task(generator, priority, callback, name)
+
+        # Run it right away if the tasks aren't spread over frames
+        if not self.enabled:
+            self.finish(task)
+        # Otherwise queue it
+        else:
+            heapq.heappush(self.queue, (priority, next(self.counter), task))
+
+        return task
+
+    def cancel(self, task):
+        """Cancel the task, it won't be resumed anymore"""
+        if task.pending:
+            task.cancelled = True
+            task.generator.close()
+
+    def finish(self, task):
+        """Run the task to its end right now, when its result is needed before its turn, and get the result"""
+        while task.pending:
+            task.step()
+
+        return task.result
+
+    def finish_all(self):
+        """Run all the waiting tasks to their ends"""
+        while self.queue:
+            self.finish(heapq.heappop(self.queue)[2])
+
+    def run(self, frame_start):
+        """Resume the tasks until the budget of the frame started at the given time runs out"""
+        start = time.perf_counter()
+        # End of the frame's budget, minus a bit of time left for the loop itself
+        deadline = frame_start + 1 / (settings.MAX_FPS or settings.UPDATE_RATE) - settings.TASK_BUDGET_MARGIN / 1000
+
+        # Resume the most important task while there is time left
+        steps = 0
+        while self.queue:
+            # Forget the tasks that were finished or cancelled outside the scheduler
+            task = self.queue[0][2]
+            if not task.pending:
+                heapq.heappop(self.queue)
+                continue
+
+            # Stop without time left, unless no task could be resumed for too many frames
+            if time.perf_counter() >= deadline and (steps or self.starved < settings.TASK_STARVATION_FRAMES):
+                break
+
+            # Resume it, forget it if it finished
+            if task.step():
+                heapq.heappop(self.queue)
+            steps += 1
+
+        # Count the frames the waiting tasks were starved in
+        self.starved = self.starved + 1 if self.queue and not steps else 0
+
+        # Remember the time spent and count the steps
+        self.spent = (time.perf_counter() - start) * 1000
+        profiler.count("task_steps", steps)
+
+
+# Create the game's task scheduler
+tasks = Scheduler()
@@ -0,0 +1,136 @@
+from src.settings import settings
+
+
+class Tile:
+    """Static tile of the world, a lightweight record instead of a full sprite"""
+    __slots__ = ("image", "rect", "pos_z", "hitbox")
+
+    def __init__(self, pos, surface, pos_z, hitbox):
+        """Create the tile"""
+        self.reset(pos, surface, pos_z, hitbox)
+
+    def reset(self, pos, surface, pos_z, hitbox):
+        """Set the tile up, reusing it for a new one"""
+        # Set the image and its rectangle, place it in the given position
+        self.image = surface
+        self.rect = surface.get_rect(topleft=pos)
+
+        # Depth position of the tile
+        self.pos_z = pos_z
+
+        # Hitbox as an inflation of the rectangle (None if the tile doesn't collide)
+        self.hitbox = self.rect.inflate(hitbox) if hitbox else None
+
+
+class TileStore:
+    """Store of static tiles split into chunks, read directly by the camera and by the player's collisions"""
+    def __init__(self):
+        """Create the tile store"""
+        # Visible tiles of every chunk, sorted into depth layers
+        self.chunks = {}
+        # Tiles that have hitboxes in every chunk
+        self.colliders = {}
+
+        # Depth layers filled with the tiles in view, reused by every call
+        self.layers = {layer: [] for layer in settings.DEPTHS.values()}
+
+    def add(self, pos, surface, pos_z=settings.DEPTHS["main"], hitbox=None, visible=True):
+        """Add a tile, hitbox is its rectangle's inflation or True for the one sprites use"""
+        # If the hitbox is the default one, make it a lot smaller vertically, so player can go behind the tile
+        if hitbox is True:
+            hitbox = (-surface.get_width() * 0.2, -surface.get_height() * 0.75)
+
+        # Create the tile and store it
+        tile = Tile(pos, surface, pos_z, hitbox)
+        self.insert(tile, visible)
+
+        return tile
+
+    def insert(self, tile, visible=True):
+        """Store an already created tile"""
+        # Get the chunk that the tile is in
+        chunk = self._chunk(tile)
+
+        # Save it to be drawn if it's visible
+        if visible:
+            # Create the chunk's layers if they don't exist yet
+            if chunk not in self.chunks:
+                self.chunks[chunk] = {layer: [] for layer in settings.DEPTHS.values()}
+
+            self.chunks[chunk][tile.pos_z].append(tile)
+
+        # Save it to be collided with if it has a hitbox
+        if tile.hitbox:
+            self.colliders.setdefault(chunk, []).append(tile)
+
+    def remove(self, tile):
+        """Remove the given tile"""
+        # Get the tile's chunk
+        chunk = self._chunk(tile)
+
+        # Stop drawing it
+        if chunk in self.chunks and tile in self.chunks[chunk][tile.pos_z]:
+            self.chunks[chunk][tile.pos_z].remove(tile)
+        # Stop colliding with it
+        if tile.hitbox:
+            self.colliders[chunk].remove(tile)
+
+    def remove_all(self, tiles):
+        """Remove all the given tiles at once"""
+        # Get identities of the tiles and chunks they are in
+        removed = {id(tile) for tile in tiles}
+        chunks = {self._chunk(tile) for tile in tiles}
+
+        # Keep only the other tiles in the layers and colliders of these chunks
+        for chunk in chunks:
+            for layer, layer_tiles in self.chunks.get(chunk, {}).items():
+                self.chunks[chunk][layer] = [tile for tile in layer_tiles if id(tile) not in removed]
+            if chunk in self.colliders:
+                self.colliders[chunk] = [tile for tile in self.colliders[chunk] if id(tile) not in removed]
+
+    def layers_in(self, rect):
+        """Get visible tiles of every depth layer from the chunks that the rectangle touches (until the next call)"""
+        # Empty the layers of the last call
+        layers = self.layers
+        for tiles in layers.values():
+            tiles.clear()
+
+        # Gather the tiles of every touched chunk
+        for chunk in self._chunks_in(rect):
+            if chunk in self.chunks:
+                for layer, tiles in self.chunks[chunk].items():
+                    layers[layer].extend(tiles)
+
+        return layers
+
+    def colliders_near(self, rect):
+        """Go through the tiles with hitboxes from the chunks that the rectangle touches, without building a list"""
+        left, top, right, bottom = self._chunk_bounds(rect)
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                yield from self.colliders.get((column, row), ())
+
+    def _chunk(self, tile):
+        """Get the chunk (column and row) that the tile belongs to"""
+        return tile.rect.x // settings.CHUNK_PIXELS, tile.rect.y // settings.CHUNK_PIXELS
+
+    def _chunks_in(self, rect):
+        """Get the chunks touched by the rectangle, including ones whose tiles can reach into it"""
+        left, top, right, bottom = self._chunk_bounds(rect)
+        return [(column, row) for row in range(top, bottom + 1) for column in range(left, right + 1)]
+
+    @staticmethod
+    def _chunk_bounds(rect):
+        """Get the first and last chunk columns and rows touched by the rectangle, including ones whose tiles can
+        reach into it"""
+        # Tiles belong to the chunk of their top left corner, but can reach a bit past it
+        left = (rect.left - settings.TILE_SIZE * 2) // settings.CHUNK_PIXELS
+        top = (rect.top - settings.TILE_SIZE * 2) // settings.CHUNK_PIXELS
+        right = rect.right // settings.CHUNK_PIXELS
+        bottom = rect.bottom // settings.CHUNK_PIXELS
+
+        return left, top, right, bottom
+
+    def __len__(self):
+        """Get the amount of visible tiles"""
+        return sum(len(tiles) for layers in self.chunks.values() for tiles in layers.values())
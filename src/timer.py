@@ -1,4 +1,20 @@
-import pygame
+from src.profiler import profiler
+
+
+class Clock:
+    """Simulation clock, advanced by the fixed time steps of the game's updates"""
+    def __init__(self):
+        """Create the clock"""
+        # Simulated time in milliseconds
+        self.ticks = 0
+
+    def advance(self, delta_time):
+        """Advance the clock by the given delta time (in seconds)"""
+        self.ticks += delta_time * 1000
+
+    def get_ticks(self):
+        """Get the simulated time in milliseconds"""
+        return self.ticks
 
 
 class Timer:
@@ -21,7 +37,7 @@ class Timer:
         # Set the flag
         self.active = True
         # Save the start time
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = clock.get_ticks()
 
     def stop(self):
         """Stop the timer"""
@@ -32,14 +48,21 @@ class Timer:
 
     def update(self):
         """Update the timer"""
-        # Get the current time
-        current_time = pygame.time.get_ticks()
+        # Count the polled timers
+        profiler.count("timers_polled")
+
+        # Get the current simulated time
+        current_time = clock.get_ticks()
 
         # If duration from the start time passed
         if current_time - self.start_time >= self.duration:
             # If there was a given function and the timer started, call it
-            if self.func and self.start_time != 0:
+            if self.func and self.active:
                 self.func()
 
             # Deactivate the timer
             self.stop()
+
+
+# Create the simulation clock that all timers use
+clock = Clock()
@@ -1,29 +1,22 @@
-import pygame
-
-from src.settings import settings
+from src.display import display
 
 
 class Transition:
     """Transition that indicates time-skip through player's sleep"""
     def __init__(self, reset_day, player):
         """Prepare the transition"""
-        # Get game's surface
-        self.surface = pygame.display.get_surface()
-
         # Get player's reference
         self.player = player
         # Save the function to reset day
         self.reset_day = reset_day
 
-        # Create a basic surface that fills the entire screen
-        self.image = pygame.Surface((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
         # Transition color in RGB value
         self.color = 255
         # Its speed
         self.speed = -2
 
-    def display(self):
-        """Display the transition effect"""
+    def update(self):
+        """Update the transition effect"""
         # Update color based off speed
         self.color += self.speed
 
@@ -44,7 +37,7 @@ class Transition:
             # Reset the transition
             self.speed = -2
 
-        # Fill the screen with current color in hex
-        self.image.fill((self.color, self.color, self.color))
-        # Blit the transition (RGBA MULT makes lighter colors less visible)
-        self.surface.blit(self.image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    def display(self):
+        """Display the transition effect"""
+        # Multiply the screen by the current color (lighter colors are less visible)
+        display.tint((self.color, self.color, self.color))
@@ -1,19 +1,16 @@
-import random
-
 import pygame
 
 from src.utilities import utilities
 from src.settings import settings
 from src.sprites import AnimatedSprite
+from src.rng import rng
+from src.display import display
 
 
 class UI:
     """User's interface of the game"""
     def __init__(self, player):
         """Initialize the user's interface"""
-        # Get main surface
-        self.surface = pygame.display.get_surface()
-
         # Save reference to the player
         self.player = player
 
@@ -37,28 +34,31 @@ class UI:
         # Create first hearts
         self.create_hearts(self.player.health)
 
-    def display(self, delta_time):
-        """Display the UI"""
+    def update(self, delta_time):
+        """Update the UI"""
         # Update hearts
         self.sprites.update(delta_time)
 
+    def display(self):
+        """Display the UI"""
         # Get the current tool surface
         tool_surface = self.tool_surfaces[self.player.tool]
         # Get its rectangle
         tool_rect = tool_surface.get_rect(midbottom=settings.ICON_POSITIONS["tool"])
 
         # Draw it
-        self.surface.blit(tool_surface, tool_rect)
+        display.blit(tool_surface, tool_rect)
 
         # Get the current seed surface and its rectangle
         seed_surface = self.seed_surfaces[self.player.seed]
         seed_rect = seed_surface.get_rect(midbottom=settings.ICON_POSITIONS["seed"])
 
         # Draw the seed icon
-        self.surface.blit(seed_surface, seed_rect)
+        display.blit(seed_surface, seed_rect)
 
         # Draw the hearts
-        self.sprites.draw(self.surface)
+        for heart in self.sprites:
+            display.blit(heart.image, heart.rect)
 
     def create_hearts(self, amount):
         """Create heart sprites"""
@@ -93,7 +93,7 @@ class Heart(AnimatedSprite):
 
         # Otherwise, active it at random times
         else:
-            if random.randint(0, 400) == 1:
+            if rng.stream("effects").randint(0, 400) == 1:
                 self.active = True
 
     def _animate(self, delta_time):
@@ -4,6 +4,7 @@ from os.path import join as path_join
 import pygame
 
 from src.settings import settings
+from src.memory import memory
 
 
 class Utilities:
@@ -14,11 +15,11 @@ class Utilities:
         self.BASE_PATH = settings.BASE_PATH
 
     def load(self, path):
-        """Load the given image"""
-        return pygame.image.load(path_join(self.BASE_PATH, path)).convert_alpha()
+        """Load the given image, sharing an already loaded one with the same pixels"""
+        return memory.intern(pygame.image.load(path_join(self.BASE_PATH, path)).convert_alpha(), self.owner(path))
 
     def load_folder(self, path):
-        """Load an entire folder from the given path"""
+        """Load an entire folder from the given path, sharing already loaded images with the same pixels"""
         surfaces = []
 
         # Go through each entry in the given path (convert path join to string, path walk requires it)
@@ -31,7 +32,7 @@ class Utilities:
                 # Load the image
                 image_surface = pygame.image.load(os.path.join(self.BASE_PATH, full_path))
                 # Append it to the list
-                surfaces.append(image_surface)
+                surfaces.append(memory.intern(image_surface, self.owner(path)))
         # Return the loaded images
         return surfaces
 
@@ -55,6 +56,12 @@ class Utilities:
         # Return the dictionary
         return surfaces
 
+    @staticmethod
+    def owner(path):
+        """Get the subsystem owning the images of the path, the graphics folder they are in"""
+        parts = os.path.normpath(path).split(os.sep)
+        return parts[parts.index("graphics") + 1] if "graphics" in parts[:-1] else "other"
+
 
 # Create an instance of utilities
 utilities = Utilities()
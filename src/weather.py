@@ -1,5 +1,3 @@
-import random
-
 import pygame
 from pygame.math import Vector2 as Vector
 
@@ -7,20 +5,23 @@ from src.utilities import utilities
 from src.sprites import Sprite
 from src.timer import Timer
 from src.settings import settings
+from src.rng import rng
+from src.pool import Pool
+from src.quality import quality
 
 
 class Rain:
     """The rain weather class"""
-    def __init__(self, sprites):
-        """Prepare the rain"""
+    def __init__(self, sprites, map_size):
+        """Prepare the rain over the map of the given size"""
         # Save the sprites group
         self.sprites = sprites
 
-        # Get the ground map to grab its size
-        map_ground = utilities.load("../graphics/world/ground.png")
-        # Get its size
-        self.map_width = map_ground.width
-        self.map_height = map_ground.height
+        # Save the map's size
+        self.map_width, self.map_height = map_size
+
+        # Drops and puddles waiting to be created
+        self.density = 0
 
         # Load surfaces
         self.puddle_surfaces = utilities.load_folder("../graphics/rain/floor")
@@ -28,55 +29,87 @@ class Rain:
 
     def update(self):
         """Update the rain weather"""
-        # Create some puddles
-        self._create_puddles()
-        # Make some rain drops
-        self._create_drops()
+        # Gather the drops allowed by the current quality, a whole one is created at once
+        self.density += quality.rain_density
+
+        # Create as many puddles and drops as there are whole ones
+        while self.density >= 1:
+            self.density -= 1
+
+            # Create some puddles
+            self._create_puddles()
+            # Make some rain drops
+            self._create_drops()
 
     def _create_drops(self):
         """Create rain drops"""
         # Get a random drop position within the map
-        pos = (random.randint(0, self.map_width), random.randint(0, self.map_height))
+        pos = (rng.stream("rain").randint(0, self.map_width), rng.stream("rain").randint(0, self.map_height))
         # Choose a random surface
-        surface = random.choice(self.drops_surfaces)
+        surface = rng.stream("rain").choice(self.drops_surfaces)
 
         # Create the rain drop
-        RainDrop(pos, surface, self.sprites, settings.DEPTHS["rain_drops"], True)
+        rain_drops.acquire(pos, surface, self.sprites, settings.DEPTHS["rain_drops"], True)
 
     def _create_puddles(self):
         """Create puddles when its raining"""
         # Random position within the map
-        pos = (random.randint(0, self.map_width), random.randint(0, self.map_height))
+        pos = (rng.stream("rain").randint(0, self.map_width), rng.stream("rain").randint(0, self.map_height))
         # Random puddle surface
-        surface = random.choice(self.puddle_surfaces)
+        surface = rng.stream("rain").choice(self.puddle_surfaces)
 
         # Create the puddle (as not moving rain drop)
-        RainDrop(pos, surface, self.sprites, settings.DEPTHS["rain_floor"], False)
+        rain_drops.acquire(pos, surface, self.sprites, settings.DEPTHS["rain_floor"], False)
 
 
 class RainDrop(Sprite):
     """A single rain drop"""
+    # Rain drops move and wait for their lifetime timer every frame
+    awake = True
+
     def __init__(self, pos, surface, group, pos_z, move):
         """Create the raindrop"""
         # Initialize the parent Sprite
         super().__init__(pos, surface, group, pos_z)
 
+        # Position, position from the previous update (used to interpolate the drawing) and direction
+        self.pos = Vector()
+        self.previous_pos = Vector()
+        self.direction = Vector(-2, 4)
+
+        # Lifetime timer
+        self.timer = Timer(0)
+
+        # Set the drop up
+        self.reset(pos, surface, group, pos_z, move)
+
+    def reset(self, pos, surface, group, pos_z, move):
+        """Set the rain drop up, reusing it for a new one"""
+        # Set the image, its rectangle and depth
+        self.image = surface
+        self.rect = self.image.get_rect(topleft=pos)
+        self.pos_z = pos_z
+
         # Duration of the rain drop
-        self.duration = random.randint(350, 550)
+        self.duration = rng.stream("rain").randint(350, 550)
 
         # Move flag
         self.move = move
-        # If the drop is moving, set its movement parameters
+        # If the drop is moving, set its speed
         if self.move:
-            self.speed = random.randint(220, 270)
-            self.pos = Vector(self.rect.topleft)
-            self.direction = Vector(-2, 4)
+            self.speed = rng.stream("rain").randint(220, 270)
 
-        # Lifetime timer
-        self.timer = Timer(self.duration)
-        # Start it
+        # Set its position (puddles keep it, so they are never interpolated)
+        self.pos.update(self.rect.topleft)
+        self.previous_pos.update(self.pos)
+
+        # Start the lifetime timer
+        self.timer.duration = self.duration
         self.timer.start()
 
+        # Show it
+        self.add(group)
+
     def update(self, delta_time):
         """Update the rain drop's position and lifetime"""
         # Update the timer
@@ -84,9 +117,15 @@ class RainDrop(Sprite):
 
         # If the drop is moving, change its position
         if self.move:
+            self.previous_pos.update(self.pos)
             self.pos += self.direction * self.speed * delta_time
             self.rect.topleft = (round(self.pos.x), round(self.pos.y))
 
-        # If the drop's lifetime ended, destroy it
+        # If the drop's lifetime ended, destroy it and give it back for reuse
         if not self.timer.active:
             self.kill()
+            rain_drops.release(self)
+
+
+# Pool of rain drops and puddles
+rain_drops = Pool(RainDrop, settings.POOL_SIZES["rain_drop"])
@@ -0,0 +1,239 @@
+import os
+import json
+import zlib
+
+import pygame
+
+from src.settings import settings
+from src.tasks import tasks
+from src.memory import memory
+
+
+# Version of the ground cache's files, a different one rebuilds them
+CACHE_VERSION = 1
+
+
+class Chunk:
+    """Square piece of the world's ground, read from its cached file only when it comes near the camera"""
+    def __init__(self, key, size, path, data=None):
+        """Create the chunk from the size and the file of its piece of the ground"""
+        # Column and row of the chunk
+        self.key = key
+        # Size of the piece
+        self.size = size
+
+        # File of the piece's compressed pixels, and the pixels themselves if the file couldn't be written
+        self.path = path
+        self.data = data
+
+        # Ground tile of the chunk (None if the chunk isn't loaded) and the task baking it
+        self.tile = None
+        self.task = None
+
+    def bake(self):
+        """Get the ground surface of the chunk from its compressed pixels, decompressing a piece of them per step"""
+        # Read the compressed pixels, unless they are kept in memory
+        data = self.data
+        if data is None:
+            with open(self.path, "rb") as file:
+                data = file.read()
+            yield
+
+        # Decompress the pixels piece by piece
+        decompressor = zlib.decompressobj()
+        pieces = []
+        while data:
+            pieces.append(decompressor.decompress(data, settings.CHUNK_BAKE_STEP))
+            data = decompressor.unconsumed_tail
+            yield
+
+        # Create the surface from them
+        return memory.track(pygame.image.frombytes(b"".join(pieces), self.size, "RGBA").convert_alpha(), "world")
+
+
+class World:
+    """Ground and static map tiles of the world split into chunks, keeping only the ones around the camera"""
+    def __init__(self, tiles, path="../graphics/world/ground.png", cache=settings.WORLD_CACHE_PATH):
+        """Prepare the chunks of the ground from its cache, cutting the ground into it first if it's outdated"""
+        # Static tiles that the loaded ground and map tiles are drawn with
+        self.tiles = tiles
+
+        # Size of the world in pixels and its ground chunks, read from the cache
+        self.width = self.height = 0
+        self.chunks = {}
+        self._open_cache(os.path.join(settings.BASE_PATH, path), cache)
+
+        # Static map tiles of every chunk, placed only while it's near, and the placed ones
+        self.records = {}
+        self.placed = {}
+
+        # Ground chunks that are loaded right now and the chunks they and the map tiles were loaded around
+        self.loaded = set()
+        self.center = None
+        self.tiles_center = None
+
+    def add(self, pos, surface, pos_z=settings.DEPTHS["main"], hitbox=None, visible=True):
+        """Add a static map tile, it's only placed into the tiles while its chunk is near (same arguments as theirs)"""
+        key = (int(pos[0]) // settings.CHUNK_PIXELS, int(pos[1]) // settings.CHUNK_PIXELS)
+        self.records.setdefault(key, []).append((pos, surface, pos_z, hitbox, visible))
+
+    def place(self, center):
+        """Place the static map tiles of the chunks around the given center and drop the ones that are too far"""
+        # Chunk the center is in, if it stays in the same one, the placed chunks don't change
+        key = self._key(center)
+        if key == self.tiles_center:
+            return
+        self.tiles_center = key
+
+        # Chunks that should be placed
+        wanted = self._around(key, self.records)
+
+        # Drop the map tiles of the chunks that fell out of range, place the ones of the new chunks
+        for key in self.placed.keys() - wanted:
+            self.tiles.remove_all(self.placed.pop(key))
+        for key in sorted(wanted - self.placed.keys()):
+            self.placed[key] = [self.tiles.add(*record) for record in self.records[key]]
+
+    def update(self, center):
+        """Load the chunks around the given camera center and unload the ones that are too far"""
+        # Place the map tiles around the camera as well
+        self.place(center)
+
+        # Chunk the camera is in, if it stays in the same one, the loaded chunks don't change
+        key = self._key(center)
+        if key == self.center:
+            return
+        self.center = key
+
+        # Chunks that should be loaded
+        wanted = self._around(key, self.chunks)
+
+        # Unload the chunks that fell out of range
+        for chunk in self.loaded - wanted:
+            self._unload(self.chunks[chunk])
+        # Load the ones that aren't loaded yet, the ones the screen can reach right away, the rest in the background
+        screen_x, screen_y = self._screen_range()
+        for chunk in wanted:
+            if not self.chunks[chunk].tile:
+                now = abs(chunk[0] - key[0]) <= screen_x and abs(chunk[1] - key[1]) <= screen_y
+                self._load(self.chunks[chunk], now)
+
+        self.loaded = wanted
+
+    @staticmethod
+    def _key(center):
+        """Get the chunk (column and row) that the given position is in"""
+        return int(center[0]) // settings.CHUNK_PIXELS, int(center[1]) // settings.CHUNK_PIXELS
+
+    @staticmethod
+    def _screen_range():
+        """Get the amount of chunks that cover half of the screen horizontally and vertically"""
+        return (settings.SCREEN_WIDTH // 2 // settings.CHUNK_PIXELS + 1,
+                settings.SCREEN_HEIGHT // 2 // settings.CHUNK_PIXELS + 1)
+
+    def _around(self, key, chunks):
+        """Get the existing chunks that cover the screen around the given chunk, plus the ones loaded ahead"""
+        screen_x, screen_y = self._screen_range()
+        range_x = screen_x + settings.CHUNK_LOAD_RANGE
+        range_y = screen_y + settings.CHUNK_LOAD_RANGE
+
+        return {(key[0] + offset_x, key[1] + offset_y)
+                for offset_x in range(-range_x, range_x + 1) for offset_y in range(-range_y, range_y + 1)
+                if (key[0] + offset_x, key[1] + offset_y) in chunks}
+
+    def _open_cache(self, source, cache):
+        """Read the ground's chunks from the cache, cutting the ground into it if it's missing or outdated"""
+        # Describe the ground the cache has to be made from
+        status = os.stat(source)
+        expected = {"version": CACHE_VERSION, "source": [status.st_size, status.st_mtime_ns],
+                    "chunk": settings.CHUNK_PIXELS}
+
+        # Read the cache's manifest, if it was made from the same ground
+        manifest_path = os.path.join(cache, "manifest.json")
+        try:
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            manifest = None
+
+        # Cut the ground into the cache again if it isn't
+        if not manifest or any(manifest.get(name) != value for name, value in expected.items()):
+            manifest = self._build_cache(source, cache, expected, manifest_path)
+            if manifest is None:
+                return
+
+        # Prepare the chunks from it
+        self.width, self.height = manifest["size"]
+        for column, row, width, height in manifest["chunks"]:
+            self.chunks[(column, row)] = Chunk((column, row), (width, height), self._chunk_path(cache, column, row))
+
+    def _build_cache(self, source, cache, manifest, manifest_path):
+        """Cut the ground into the cache's chunk files, keep them in memory if they can't be written"""
+        # Load the ground once, only to cut it into pieces
+        ground = pygame.image.load(source)
+        self.width, self.height = ground.get_size()
+        manifest.update(size=[self.width, self.height], chunks=[])
+
+        # Compress the pixels of every chunk
+        pieces = {}
+        for top in range(0, self.height, settings.CHUNK_PIXELS):
+            for left in range(0, self.width, settings.CHUNK_PIXELS):
+                # Rectangle of the chunk, clipped to the world
+                rect = pygame.Rect(left, top, settings.CHUNK_PIXELS, settings.CHUNK_PIXELS).clip(ground.get_rect())
+                column, row = left // settings.CHUNK_PIXELS, top // settings.CHUNK_PIXELS
+                pieces[(column, row)] = zlib.compress(pygame.image.tobytes(ground.subsurface(rect), "RGBA"), 1)
+                manifest["chunks"].append([column, row, rect.width, rect.height])
+
+        # Write them, each file is replaced at once and the manifest is written last, so other processes building
+        # the same cache at the same time never read a half-written one
+        try:
+            os.makedirs(cache, exist_ok=True)
+            for (column, row), data in pieces.items():
+                self._write(self._chunk_path(cache, column, row), data)
+            self._write(manifest_path, json.dumps(manifest).encode())
+        # If the cache can't be written (like in a read-only install), keep the compressed chunks in memory instead
+        except OSError:
+            for column, row, width, height in manifest["chunks"]:
+                self.chunks[(column, row)] = Chunk((column, row), (width, height), None, pieces[(column, row)])
+            return None
+
+        return manifest
+
+    @staticmethod
+    def _write(path, data):
+        """Write the file through a temporary one, replacing it at once"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    @staticmethod
+    def _chunk_path(cache, column, row):
+        """Get the path of the chunk's file in the cache"""
+        return os.path.join(cache, f"ground_{column}_{row}.bin")
+
+    def _load(self, chunk, now):
+        """Bake the chunk's ground in the background (or right now) and start drawing it once it's baked"""
+        # Start baking it if it isn't being baked already
+        if not chunk.task:
+            chunk.task = tasks.add(chunk.bake(), settings.TASK_PRIORITIES["chunk"],
+                                   lambda surface: self._show(chunk, surface), "chunk baking")
+
+        # Finish it if it's needed now
+        if now:
+            tasks.finish(chunk.task)
+
+    def _show(self, chunk, surface):
+        """Start drawing the chunk's baked ground"""
+        chunk.tile = self.tiles.add((chunk.key[0] * settings.CHUNK_PIXELS, chunk.key[1] * settings.CHUNK_PIXELS),
+                                    surface, settings.DEPTHS["ground"])
+        chunk.task = None
+
+    def _unload(self, chunk):
+        """Stop drawing the chunk's ground and drop its surface, or stop baking it"""
+        if chunk.task:
+            tasks.cancel(chunk.task)
+            chunk.task = None
+        if chunk.tile:
+            self.tiles.remove(chunk.tile)
+            chunk.tile = None
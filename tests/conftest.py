@@ -0,0 +1,69 @@
+import os
+
+# Use SDL dummy drivers, so the tests need no display or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pytest
+
+from src.controls import controls
+from src.timer import clock
+from src.tasks import tasks
+
+
+@pytest.fixture(autouse=True)
+def fresh_singletons():
+    """Start every test with the game's shared input, clock and scheduler in their initial states"""
+    yield
+
+    # Stop recording, replaying and scripting the input
+    controls.recording = None
+    controls.replay = None
+    controls.replay_index = 0
+    controls.script = None
+
+    # Rewind the simulation clock
+    clock.ticks = 0
+
+    # Drop the waiting tasks and run the next ones at once again
+    tasks.enabled = False
+    tasks.queue.clear()
+
+
+@pytest.fixture
+def simulation():
+    """Get a fresh headless simulation seeded with a fixed seed"""
+    # Import it only here, so the environment above is set first
+    from src.headless import Simulation
+    return Simulation(seed=7)
+
+
+@pytest.fixture
+def farmed(simulation):
+    """Get a fresh headless simulation with some tiles hoed, planted and watered, and a changed player"""
+    # Import the soil only after pygame is ready, like the level
+    from src.soil import FARMABLE, HIT
+    from src.settings import settings
+    level = simulation.level
+    soil = level.soil
+
+    # Hoe the first farmable tiles, a single hit creates the soil tiles of all of them
+    for row, column in np.argwhere(soil.grid & FARMABLE)[:6]:
+        soil.grid[row, column] |= HIT
+    soil.handle_hit(soil.farmable_rects[0].center)
+
+    # Plant both seeds in turns on them, water every other one
+    hoed = [rect for rect in soil.farmable_rects
+            if soil.grid[rect.y // settings.TILE_SIZE, rect.x // settings.TILE_SIZE] & HIT]
+    for index, rect in enumerate(hoed):
+        soil.plant(("corn", "tomato")[index % 2], rect.center)
+        if index % 2 == 0:
+            soil.water(rect.center)
+
+    # Change the player's state too, then let the level run a bit
+    level.player.money += 17
+    level.player.items["wood"] += 3
+    simulation.step(30)
+
+    return simulation
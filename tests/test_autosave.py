@@ -0,0 +1,73 @@
+import zlib
+
+import numpy as np
+
+from src.autosave import Autosave, DELTA_HEADER, DELTA_COUNT
+from src.headless import Simulation
+from src.save import Snapshot
+
+
+def delta_chunks(path):
+    """Get the amount of soil chunks written into the delta file"""
+    with open(path, "rb") as file:
+        data = zlib.decompress(file.read()[DELTA_HEADER.size:])
+
+    # The amount follows the packed state
+    offset = Snapshot.unpack_state(data, path)[2]
+    return DELTA_COUNT.unpack_from(data, offset)[0]
+
+
+def test_base_then_delta_round_trip(farmed, tmp_path):
+    """The first autosave writes a base, a small change only a delta, and loading both restores the level"""
+    # Import the soil only after pygame is ready, like the level
+    from src.soil import FARMABLE, HIT
+    path = str(tmp_path / "autosave.bin")
+    autosave = Autosave(farmed.level, path)
+
+    # Write the base
+    autosave.request()
+    assert autosave.close()
+    with open(path, "rb") as file:
+        base = file.read()
+    assert delta_chunks(autosave.delta_path) == 0
+
+    # Hoe one more tile and move on, then write the change
+    soil = farmed.level.soil
+    row, column = np.argwhere((soil.grid & (FARMABLE | HIT)) == FARMABLE)[0]
+    soil.grid[row, column] |= HIT
+    farmed.level.player.money += 5
+    farmed.step(10)
+    autosave.request()
+    assert autosave.close()
+
+    # Only the delta of the changed chunk was written, the base stayed
+    with open(path, "rb") as file:
+        assert file.read() == base
+    assert delta_chunks(autosave.delta_path) == 1
+
+    # Load both into a fresh level
+    loaded = Simulation(seed=7)
+    Autosave(loaded.level, path).load()
+
+    assert loaded.digest() == farmed.digest()
+    assert np.array_equal(loaded.level.soil.grid, soil.grid)
+
+
+def test_big_change_rewrites_base(farmed, tmp_path):
+    """Changing more than the compacting share of the soil chunks writes a new base instead of a delta"""
+    from src.soil import HIT
+    path = str(tmp_path / "autosave.bin")
+    autosave = Autosave(farmed.level, path)
+    autosave.request()
+    assert autosave.close()
+    with open(path, "rb") as file:
+        base = file.read()
+
+    # Change every cell of the soil
+    farmed.level.soil.grid |= HIT
+    autosave.request()
+    assert autosave.close()
+
+    with open(path, "rb") as file:
+        assert file.read() != base
+    assert delta_chunks(autosave.delta_path) == 0
@@ -0,0 +1,47 @@
+from src.pool import Pool
+
+
+class Thing:
+    """Pooled object remembering the arguments it was set up with"""
+    def __init__(self, value):
+        """Create the thing"""
+        self.resets = 0
+        self.value = value
+
+    def reset(self, value):
+        """Set the thing up again"""
+        self.resets += 1
+        self.value = value
+
+
+def test_acquire_creates_when_empty():
+    """An empty pool creates a new object from the arguments"""
+    pool = Pool(Thing, 2)
+
+    thing = pool.acquire(1)
+
+    assert thing.value == 1 and thing.resets == 0
+
+
+def test_release_then_acquire_reuses():
+    """A released object is reset and handed out again instead of a new one"""
+    pool = Pool(Thing, 2)
+    thing = pool.acquire(1)
+
+    pool.release(thing)
+    again = pool.acquire(2)
+
+    assert again is thing
+    assert again.value == 2 and again.resets == 1
+    assert not pool.free
+
+
+def test_release_drops_past_size():
+    """Objects released into a full pool are dropped"""
+    pool = Pool(Thing, 1)
+    first, second = pool.acquire(1), pool.acquire(2)
+
+    pool.release(first)
+    pool.release(second)
+
+    assert pool.free == [first]
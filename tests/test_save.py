@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.headless import Simulation
+from src.save import saves
+
+
+def test_pack_unpack_round_trip(farmed, tmp_path):
+    """A written snapshot is read back with the same state and arrays"""
+    path = str(tmp_path / "save.bin")
+    snapshot = saves.snapshot(farmed.level)
+
+    saves.write(snapshot, path)
+    read = saves.read(path)
+
+    assert tuple(read.state) == tuple(snapshot.state)
+    assert np.array_equal(read.values, snapshot.values)
+    assert np.array_equal(read.tree_health, snapshot.tree_health)
+    assert np.array_equal(read.apple_occupancy, snapshot.apple_occupancy)
+    for read_array, array in zip(read.soil, snapshot.soil):
+        assert read_array.dtype == array.dtype and np.array_equal(read_array, array)
+
+
+def test_load_restores_digest(farmed, tmp_path):
+    """Loading a save into a fresh level restores the state the digest covers"""
+    path = str(tmp_path / "save.bin")
+    saves.save(farmed.level, path)
+
+    loaded = Simulation(seed=7, load=path)
+
+    assert loaded.digest() == farmed.digest()
+
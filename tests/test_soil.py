@@ -0,0 +1,42 @@
+def grow_one_by_one(plants, watered):
+    """Grow the plants one by one like the old per-plant loop did, get their stages and harvestable flags"""
+    grown = {}
+    for tile, (stage, speed, max_stage, harvestable) in plants.items():
+        # Only watered plants that aren't ready to harvest grow, never past their maximum stage
+        if watered[tile] and not harvestable:
+            stage += speed
+            if stage >= max_stage:
+                stage = max_stage
+                harvestable = True
+        grown[tile] = (stage, speed, max_stage, harvestable)
+
+    return grown
+
+
+def test_update_plants_matches_per_plant_loop(farmed):
+    """Growing all the plants at once gives the same stages, images and flags as growing them one by one"""
+    # Import the soil only after pygame is ready, like the level
+    from src.soil import WATERED
+    soil = farmed.level.soil
+    assert soil.plants
+
+    # State of every plant before the growth
+    plants = {tile: (plant.stage, plant.growth_speed, plant.max_stage, plant.harvestable)
+              for tile, plant in soil.plants.items()}
+    watered = {tile: bool(soil.grid[tile] & WATERED) for tile in plants}
+    assert any(watered.values()) and not all(watered.values())
+
+    # Grow them for enough days that some are fully grown
+    for _ in range(10):
+        soil.update_plants()
+        plants = grow_one_by_one(plants, watered)
+
+        for tile, (stage, speed, max_stage, harvestable) in plants.items():
+            plant = soil.plants[tile]
+            assert soil.plant_stages[tile] == stage
+            assert plant.harvestable == harvestable
+            assert plant.image is plant.frames[int(stage)]
+            assert (tile in soil.harvestable_plants) == harvestable
+
+    # Some of them were ready to harvest by the end
+    assert any(harvestable for *_, harvestable in plants.values())
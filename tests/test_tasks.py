@@ -0,0 +1,74 @@
+import time
+
+from src.tasks import tasks, complete
+
+
+def steps(log, name, count):
+    """Task appending its name to the log every step, returning the amount of steps"""
+    for _ in range(count):
+        log.append(name)
+        yield
+    return count
+
+
+def test_disabled_runs_at_once():
+    """While the scheduler is disabled, tasks run to their ends as they are added"""
+    log, results = [], []
+    tasks.enabled = False
+
+    task = tasks.add(steps(log, "a", 3), callback=results.append)
+
+    assert log == ["a", "a", "a"]
+    assert task.done and task.result == 3 and results == [3]
+    assert not tasks.queue
+
+
+def test_enabled_waits_for_run():
+    """While the scheduler is enabled, tasks wait for the frames' spare time"""
+    log = []
+    tasks.enabled = True
+
+    task = tasks.add(steps(log, "a", 3))
+    assert task.pending and not log
+
+    # Give it a whole frame's budget
+    tasks.run(time.perf_counter())
+
+    assert log == ["a", "a", "a"] and task.done
+
+
+def test_enabled_priority_order():
+    """Tasks with lower priorities are resumed first, the same ones in the order they were added in"""
+    log = []
+    tasks.enabled = True
+
+    tasks.add(steps(log, "late", 1), priority=2)
+    tasks.add(steps(log, "first", 1), priority=0)
+    tasks.add(steps(log, "second", 1), priority=0)
+    tasks.finish_all()
+
+    assert log == ["first", "second", "late"]
+
+
+def test_enabled_finish_and_cancel():
+    """Finished tasks run to their end right away, cancelled ones never run again"""
+    log = []
+    tasks.enabled = True
+
+    finished = tasks.add(steps(log, "finished", 2))
+    cancelled = tasks.add(steps(log, "cancelled", 2))
+
+    assert tasks.finish(finished) == 2
+    tasks.cancel(cancelled)
+    tasks.run(time.perf_counter())
+
+    assert log == ["finished", "finished"]
+    assert cancelled.cancelled and not cancelled.pending
+
+
+def test_complete():
+    """Generators complete at once outside the scheduler"""
+    log = []
+
+    assert complete(steps(log, "a", 2)) == 2
+    assert log == ["a", "a"]